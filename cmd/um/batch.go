@@ -8,11 +8,13 @@ import (
 	"fmt"
 	"io"
 	"os"
+	"os/signal"
 	"path/filepath"
 	"runtime"
 	"sort"
 	"strings"
 	"sync"
+	"syscall"
 	"time"
 
 	"go.uber.org/zap"
@@ -32,6 +34,7 @@ const (
 type BatchRequest struct {
 	Files   []FileTask     `json:"files"`
 	Options ProcessOptions `json:"options"`
+	Stream  bool           `json:"stream,omitempty"` // 以NDJSON逐行输出每个文件的结果，最后输出汇总
 }
 
 // FileTask 单个文件处理任务
@@ -58,6 +61,7 @@ type ProcessResult struct {
 	OutputPath  string `json:"output_path,omitempty"`
 	Success     bool   `json:"success"`
 	Error       string `json:"error,omitempty"`
+	Decoder     string `json:"decoder,omitempty"`
 	ProcessTime int64  `json:"process_time_ms"`
 }
 
@@ -84,11 +88,13 @@ type resultWithIndex struct {
 
 // pipelineData 流水线数据结构
 type pipelineData struct {
-	index int
-	task  FileTask
+	index     int
+	task      FileTask
+	startTime time.Time // 开始解密的时间，用于统计单个文件的处理耗时
 
 	// 解密相关数据
 	audioExt      string
+	decoder       string // 使用的解码器（对应的加密格式后缀）
 	audioData     []byte // 解密后的音频数据
 	tempAudioFile string // 临时音频文件路径，用于资源清理
 
@@ -119,6 +125,12 @@ type batchProcessor struct {
 	// 流水线并发控制
 	enablePipeline bool
 	pipelineStages int
+
+	// 单个文件处理完成时的回调（服务模式用于推送进度）
+	onResult func(ProcessResult)
+
+	// 单个文件开始处理时的回调（调用方据此监控单个文件的处理时间）
+	onStart func(FileTask)
 }
 
 // newBatchProcessor 创建批处理器
@@ -147,12 +159,13 @@ func newBatchProcessor(options ProcessOptions, logger *zap.Logger) *batchProcess
 }
 
 // processBatch 处理批量任务（统一使用流水线模式）
-func (bp *batchProcessor) processBatch(request *BatchRequest) *BatchResponse {
+// ctx取消后不再开始新的文件，已开始的文件处理完成后返回，未开始的文件没有结果
+func (bp *batchProcessor) processBatch(ctx context.Context, request *BatchRequest) *BatchResponse {
 	// 根据实际文件信息动态调整worker数量
 	bp.optimizeWorkerCount(request.Files)
 
 	// 统一使用流水线模式
-	return bp.processBatchPipeline(request)
+	return bp.processBatchPipeline(ctx, request)
 }
 
 // processFileTask 处理单个文件任务
@@ -218,6 +231,70 @@ func readBatchRequest() (*BatchRequest, error) {
 	return &request, nil
 }
 
+// streamLine 流式输出的一行，type为result（单个文件结果）或summary（汇总）
+type streamLine struct {
+	Type string `json:"type"`
+	*ProcessResult
+	*streamSummary
+}
+
+// streamStart 流式输出中某个文件开始处理的通知
+type streamStart struct {
+	Type      string `json:"type"`
+	InputPath string `json:"input_path"`
+}
+
+// streamSummary 流式输出的汇总信息（不含逐个文件的结果）
+type streamSummary struct {
+	TotalFiles   int   `json:"total_files"`
+	SuccessCount int   `json:"success_count"`
+	FailedCount  int   `json:"failed_count"`
+	TotalTime    int64 `json:"total_time_ms"`
+}
+
+// resultStream 把批处理结果逐行写入stdout，每完成一个文件输出一行
+type resultStream struct {
+	mutex   sync.Mutex
+	encoder *json.Encoder
+	logger  *zap.Logger
+}
+
+// newResultStream 创建流式输出
+func newResultStream(w io.Writer, logger *zap.Logger) *resultStream {
+	return &resultStream{encoder: json.NewEncoder(w), logger: logger}
+}
+
+// write 写入一行
+func (s *resultStream) write(line interface{}) error {
+	s.mutex.Lock()
+	defer s.mutex.Unlock()
+	return s.encoder.Encode(line)
+}
+
+// writeResult 输出单个文件的结果
+func (s *resultStream) writeResult(result ProcessResult) {
+	if err := s.write(&streamLine{Type: "result", ProcessResult: &result}); err != nil {
+		s.logger.Error("输出文件结果失败", zap.String("文件", result.InputPath), zap.Error(err))
+	}
+}
+
+// writeStart 输出文件开始处理的通知
+func (s *resultStream) writeStart(task FileTask) {
+	if err := s.write(&streamStart{Type: "start", InputPath: task.InputPath}); err != nil {
+		s.logger.Error("输出开始处理通知失败", zap.String("文件", task.InputPath), zap.Error(err))
+	}
+}
+
+// writeSummary 输出汇总
+func (s *resultStream) writeSummary(response *BatchResponse) error {
+	return s.write(&streamLine{Type: "summary", streamSummary: &streamSummary{
+		TotalFiles:   response.TotalFiles,
+		SuccessCount: response.SuccessCount,
+		FailedCount:  response.FailedCount,
+		TotalTime:    response.TotalTime,
+	}})
+}
+
 // writeBatchResponse 输出批处理响应
 func writeBatchResponse(response *BatchResponse) error {
 	data, err := json.MarshalIndent(response, "", "  ")
@@ -246,8 +323,27 @@ func runBatchMode(logger *zap.Logger) error {
 	// 创建批处理器
 	batchProc := newBatchProcessor(request.Options, logger)
 
+	// 流式模式下每个文件完成时立即输出
+	var stream *resultStream
+	if request.Stream {
+		stream = newResultStream(os.Stdout, logger)
+		batchProc.onResult = stream.writeResult
+		batchProc.onStart = stream.writeStart
+	}
+
+	// 收到中断或终止信号时停止开始新的文件，已开始的文件写完后正常输出汇总退出
+	ctx, stop := signal.NotifyContext(context.Background(), os.Interrupt, syscall.SIGTERM)
+	defer stop()
+
 	// 处理批量任务
-	response := batchProc.processBatch(request)
+	response := batchProc.processBatch(ctx, request)
+
+	if stream != nil {
+		if err := stream.writeSummary(response); err != nil {
+			return fmt.Errorf("输出批处理汇总失败: %w", err)
+		}
+		return nil
+	}
 
 	// 输出结果
 	if err := writeBatchResponse(response); err != nil {
@@ -329,7 +425,11 @@ func (bp *batchProcessor) optimizeWorkerCount(files []FileTask) {
 	validFiles := 0
 
 	for _, file := range files {
-		if stat, err := os.Stat(file.InputPath); err == nil {
+		// 调用方已提供文件大小时不再重复stat
+		if file.FileSize > 0 {
+			totalSize += file.FileSize
+			validFiles++
+		} else if stat, err := os.Stat(file.InputPath); err == nil {
 			totalSize += stat.Size()
 			validFiles++
 		}
@@ -391,7 +491,7 @@ func (bp *batchProcessor) sortTasksByPriority(tasks []FileTask) {
 }
 
 // processBatchPipeline 流水线并发处理批量任务
-func (bp *batchProcessor) processBatchPipeline(request *BatchRequest) *BatchResponse {
+func (bp *batchProcessor) processBatchPipeline(ctx context.Context, request *BatchRequest) *BatchResponse {
 	startTime := time.Now()
 
 	response := &BatchResponse{
@@ -417,7 +517,7 @@ func (bp *batchProcessor) processBatchPipeline(request *BatchRequest) *BatchResp
 	var decryptWg sync.WaitGroup
 	for i := 0; i < bp.maxWorkers/2; i++ { // 一半worker用于解密
 		decryptWg.Add(1)
-		go bp.decryptWorker(&decryptWg, decryptChan, writeChan)
+		go bp.decryptWorker(ctx, &decryptWg, decryptChan, writeChan)
 	}
 
 	// 启动写入worker
@@ -427,12 +527,16 @@ func (bp *batchProcessor) processBatchPipeline(request *BatchRequest) *BatchResp
 		go bp.writeWorker(&writeWg, writeChan, resultChan)
 	}
 
-	// 发送解密任务
+	// 发送解密任务（取消后停止发送）
 	go func() {
+		defer close(decryptChan)
 		for i, task := range request.Files {
-			decryptChan <- taskWithIndex{index: i, task: task}
+			select {
+			case decryptChan <- taskWithIndex{index: i, task: task}:
+			case <-ctx.Done():
+				return
+			}
 		}
-		close(decryptChan)
 	}()
 
 	// 等待解密完成并关闭写入通道
@@ -455,6 +559,23 @@ func (bp *batchProcessor) processBatchPipeline(request *BatchRequest) *BatchResp
 		} else {
 			response.FailedCount++
 		}
+		if bp.onResult != nil {
+			bp.onResult(result.result)
+		}
+	}
+
+	// 取消时去掉未开始处理的文件留下的空结果
+	if ctx.Err() != nil {
+		results := response.Results[:0]
+		for _, result := range response.Results {
+			if result.InputPath != "" {
+				results = append(results, result)
+			}
+		}
+		response.Results = results
+		bp.logger.Info("批处理已取消",
+			zap.Int("已处理", len(results)),
+			zap.Int("总数", response.TotalFiles))
 	}
 
 	response.TotalTime = time.Since(startTime).Milliseconds()
@@ -467,16 +588,25 @@ func (bp *batchProcessor) processBatchPipeline(request *BatchRequest) *BatchResp
 }
 
 // decryptWorker 解密worker
-func (bp *batchProcessor) decryptWorker(wg *sync.WaitGroup, taskChan <-chan taskWithIndex, writeChan chan<- pipelineData) {
+func (bp *batchProcessor) decryptWorker(ctx context.Context, wg *sync.WaitGroup, taskChan <-chan taskWithIndex, writeChan chan<- pipelineData) {
 	defer wg.Done()
 
 	for taskWithIdx := range taskChan {
+		// 已取消时丢弃排队中的任务，不产生结果
+		if ctx.Err() != nil {
+			continue
+		}
+
 		data := pipelineData{
-			index: taskWithIdx.index,
-			task:  taskWithIdx.task,
+			index:     taskWithIdx.index,
+			task:      taskWithIdx.task,
+			startTime: time.Now(),
 		}
 
 		bp.logger.Debug("开始解密", zap.String("文件", taskWithIdx.task.InputPath))
+		if bp.onStart != nil {
+			bp.onStart(taskWithIdx.task)
+		}
 
 		// 执行解密操作
 		data.error = bp.performDecryption(&data)
@@ -509,12 +639,15 @@ func (bp *batchProcessor) writeWorker(wg *sync.WaitGroup, writeChan <-chan pipel
 			} else {
 				result.Success = true
 				result.OutputPath = data.outputPath
+				result.Decoder = data.decoder
 				bp.logger.Debug("写入文件成功",
 					zap.String("输入", data.task.InputPath),
 					zap.String("输出", data.outputPath))
 			}
 		}
 
+		result.ProcessTime = time.Since(data.startTime).Milliseconds()
+
 		resultChan <- resultWithIndex{
 			index:  data.index,
 			result: result,
@@ -554,6 +687,7 @@ func (bp *batchProcessor) performDecryption(data *pipelineData) error {
 		return fmt.Errorf("查找解码器失败: %w", err)
 	}
 	dec := *pDec
+	data.decoder = decoderFactory.Suffix
 
 	// 读取音频头部用于格式识别
 	// 修复问题：创建独立的header缓冲区，避免内存池生命周期问题
@@ -80,7 +80,8 @@ func main() {
 	}
 }
 
-func printSupportedExtensions() {
+// supportedExtensions 返回已注册解码器支持的扩展名（不含点，已排序）及对应的解码器数量
+func supportedExtensions() ([]string, map[string]int) {
 	var exts []string
 	extSet := make(map[string]int)
 	for _, factory := range common.DecoderRegistry {
@@ -95,6 +96,11 @@ func printSupportedExtensions() {
 		exts = append(exts, ext)
 	}
 	sort.Strings(exts)
+	return exts, extSet
+}
+
+func printSupportedExtensions() {
+	exts, extSet := supportedExtensions()
 	for _, ext := range exts {
 		fmt.Printf("%s: %d\n", ext, extSet[ext])
 	}
@@ -17,6 +17,24 @@ import (
 	"go.uber.org/zap"
 )
 
+// 服务通信相关常量
+const (
+	initialMessageBufferSize = 64 * 1024        // 读取消息的初始缓冲区大小
+	maxMessageSize           = 64 * 1024 * 1024 // 单条消息的最大长度（大批量add_files）
+	maxInflightRequests      = 32               // 单个连接上同时处理的最大请求数
+	defaultResultsPageSize   = 500              // get_results默认每页结果数
+	maxResultsPageSize       = 5000             // get_results单页最大结果数
+)
+
+// serviceCapabilities 服务支持的协议能力，通过hello握手告知客户端
+var serviceCapabilities = []string{
+	"ping",
+	"pipelining",
+	"subscribe",
+	"get_results",
+	"shutdown",
+}
+
 // ServiceMessage 服务消息结构
 type ServiceMessage struct {
 	ID        string      `json:"id"`
@@ -45,27 +63,79 @@ type Session struct {
 	Status     string          `json:"status"`
 	Options    ProcessOptions  `json:"options"`
 	mutex      sync.RWMutex    `json:"-"`
+	cancel     context.CancelFunc
+
+	// 处理进度统计
+	StartedAt      time.Time `json:"started_at"`
+	ProcessedFiles int       `json:"processed_files"`
+	SuccessCount   int       `json:"success_count"`
+	FailedCount    int       `json:"failed_count"`
+
+	// 每个文件的处理结果，按完成顺序排列，通过get_results分页读取
+	Results []ProcessResult `json:"-"`
+
+	// 进度订阅者，每个文件完成时主动推送事件
+	Subscribers []*subscription `json:"-"`
+}
+
+// subscription 进度订阅
+// 推送的事件使用订阅请求的消息ID，客户端据此把事件路由到对应的订阅
+type subscription struct {
+	id     string
+	writer *responseWriter
 }
 
 // UMService 音乐解密服务
 type UMService struct {
-	logger   *zap.Logger
-	sessions map[string]*Session
-	mutex    sync.RWMutex
-	ctx      context.Context
-	cancel   context.CancelFunc
-	listener net.Listener
+	logger    *zap.Logger
+	sessions  map[string]*Session
+	mutex     sync.RWMutex
+	ctx       context.Context
+	cancel    context.CancelFunc
+	listener  net.Listener
+	startedAt time.Time
+	binary    binaryIdentity
+}
+
+// binaryIdentity 服务进程启动时的可执行文件信息
+// 客户端与自己要使用的um可执行文件比较，判断正在运行的服务是否为同一版本
+type binaryIdentity struct {
+	Path    string `json:"path"`
+	Size    int64  `json:"size"`
+	ModTime int64  `json:"mod_time"`
 }
 
 // NewUMService 创建新的服务实例
 func NewUMService(logger *zap.Logger) *UMService {
 	ctx, cancel := context.WithCancel(context.Background())
 	return &UMService{
-		logger:   logger,
-		sessions: make(map[string]*Session),
-		ctx:      ctx,
-		cancel:   cancel,
+		logger:    logger,
+		sessions:  make(map[string]*Session),
+		ctx:       ctx,
+		cancel:    cancel,
+		startedAt: time.Now(),
+		binary:    currentBinaryIdentity(logger),
+	}
+}
+
+// currentBinaryIdentity 获取当前可执行文件的路径、大小和修改时间
+// 必须在启动时获取：可执行文件被替换后再读取得到的是新文件的信息
+func currentBinaryIdentity(logger *zap.Logger) binaryIdentity {
+	path, err := os.Executable()
+	if err != nil {
+		logger.Warn("获取可执行文件路径失败", zap.Error(err))
+		return binaryIdentity{}
 	}
+	if resolved, err := filepath.EvalSymlinks(path); err == nil {
+		path = resolved
+	}
+
+	identity := binaryIdentity{Path: path}
+	if info, err := os.Stat(path); err == nil {
+		identity.Size = info.Size()
+		identity.ModTime = info.ModTime().Unix()
+	}
+	return identity
 }
 
 // Start 启动服务
@@ -79,8 +149,12 @@ func (s *UMService) Start(pipeName string) error {
 		s.listener, err = winio.ListenPipe(addr, nil)
 	} else {
 		// Unix域套接字
-		// 清理可能存在的旧套接字文件
+		// 清理可能存在的旧套接字文件，但不能抢占仍在运行的服务
 		if _, err := os.Stat(addr); err == nil {
+			if conn, dialErr := net.DialTimeout("unix", addr, time.Second); dialErr == nil {
+				conn.Close()
+				return fmt.Errorf("服务已在运行: %s", addr)
+			}
 			os.Remove(addr)
 		}
 		s.listener, err = net.Listen("unix", addr)
@@ -97,18 +171,20 @@ func (s *UMService) Start(pipeName string) error {
 
 	// 接受连接
 	for {
-		select {
-		case <-s.ctx.Done():
-			return nil
-		default:
-			conn, err := s.listener.Accept()
-			if err != nil {
-				s.logger.Error("接受连接失败", zap.Error(err))
-				continue
+		conn, err := s.listener.Accept()
+		if err != nil {
+			// Stop关闭监听器后Accept返回错误，此时正常退出
+			select {
+			case <-s.ctx.Done():
+				s.logger.Info("服务已停止")
+				return nil
+			default:
 			}
-
-			go s.handleConnection(conn)
+			s.logger.Error("接受连接失败", zap.Error(err))
+			continue
 		}
+
+		go s.handleConnection(conn)
 	}
 }
 
@@ -133,37 +209,77 @@ func (s *UMService) getListenAddress(pipeName string) string {
 	return "/tmp/um_service.sock"
 }
 
+// responseWriter 串行化同一连接上的响应写入
+type responseWriter struct {
+	mutex   sync.Mutex
+	encoder *json.Encoder
+}
+
+// Write 写入一条响应
+func (w *responseWriter) Write(response *ServiceResponse) error {
+	w.mutex.Lock()
+	defer w.mutex.Unlock()
+	return w.encoder.Encode(response)
+}
+
 // handleConnection 处理客户端连接
+// 同一连接上的请求并发处理，响应按完成顺序写回，客户端通过消息ID匹配
 func (s *UMService) handleConnection(conn net.Conn) {
 	defer conn.Close()
 
 	s.logger.Info("新客户端连接", zap.String("远程地址", conn.RemoteAddr().String()))
 
 	scanner := bufio.NewScanner(conn)
-	encoder := json.NewEncoder(conn)
+	// 默认64KB的单行上限不足以容纳大批量文件列表
+	scanner.Buffer(make([]byte, 0, initialMessageBufferSize), maxMessageSize)
+	writer := &responseWriter{encoder: json.NewEncoder(conn)}
+
+	var wg sync.WaitGroup
+	inflight := make(chan struct{}, maxInflightRequests)
 
 	for scanner.Scan() {
 		var msg ServiceMessage
 		if err := json.Unmarshal(scanner.Bytes(), &msg); err != nil {
-			s.sendError(encoder, "", "解析消息失败", err)
+			writer.Write(s.createErrorResponse("", "解析消息失败", err))
 			continue
 		}
 
-		response := s.handleMessage(&msg)
-		if err := encoder.Encode(response); err != nil {
-			s.logger.Error("发送响应失败", zap.Error(err))
-			break
-		}
+		inflight <- struct{}{}
+		wg.Add(1)
+		go func(msg *ServiceMessage) {
+			defer wg.Done()
+			defer func() { <-inflight }()
+
+			response := s.handleMessage(msg, writer)
+			if err := writer.Write(response); err != nil {
+				s.logger.Error("发送响应失败", zap.Error(err))
+			}
+
+			// 确认响应已发出后再停止服务
+			if msg.Type == "shutdown" && response.Success {
+				s.Stop()
+			}
+		}(&msg)
 	}
 
 	if err := scanner.Err(); err != nil {
 		s.logger.Error("读取连接数据失败", zap.Error(err))
 	}
+
+	wg.Wait()
 }
 
 // handleMessage 处理消息
-func (s *UMService) handleMessage(msg *ServiceMessage) *ServiceResponse {
+func (s *UMService) handleMessage(msg *ServiceMessage, writer *responseWriter) *ServiceResponse {
 	switch msg.Type {
+	case "ping":
+		return s.createSuccessResponse(msg.ID, "pong", map[string]interface{}{
+			"timestamp": time.Now().UnixMilli(),
+		})
+	case "hello":
+		return s.handleHello(msg)
+	case "shutdown":
+		return s.handleShutdown(msg)
 	case "start_session":
 		return s.handleStartSession(msg)
 	case "add_files":
@@ -176,11 +292,73 @@ func (s *UMService) handleMessage(msg *ServiceMessage) *ServiceResponse {
 		return s.handleStopProcessing(msg)
 	case "end_session":
 		return s.handleEndSession(msg)
+	case "subscribe":
+		return s.handleSubscribe(msg, writer)
+	case "unsubscribe":
+		return s.handleUnsubscribe(msg)
+	case "get_results":
+		return s.handleGetResults(msg)
 	default:
 		return s.createErrorResponse(msg.ID, "未知消息类型", nil)
 	}
 }
 
+// handleHello 处理握手，返回服务版本、可执行文件信息、支持的扩展名和协议能力
+func (s *UMService) handleHello(msg *ServiceMessage) *ServiceResponse {
+	exts, _ := supportedExtensions()
+	extensions := make([]string, 0, len(exts))
+	for _, ext := range exts {
+		extensions = append(extensions, "."+ext)
+	}
+
+	s.mutex.RLock()
+	sessionCount := len(s.sessions)
+	s.mutex.RUnlock()
+
+	return s.createSuccessResponse(msg.ID, "hello", map[string]interface{}{
+		"version":              AppVersion,
+		"go_version":           runtime.Version(),
+		"pid":                  os.Getpid(),
+		"binary":               s.binary,
+		"started_at":           s.startedAt.Unix(),
+		"sessions":             sessionCount,
+		"supported_extensions": extensions,
+		"capabilities":         serviceCapabilities,
+	})
+}
+
+// handleShutdown 处理停止服务请求
+// 有会话正在处理时拒绝停止，除非指定force
+func (s *UMService) handleShutdown(msg *ServiceMessage) *ServiceResponse {
+	force := false
+	if data, ok := msg.Data.(map[string]interface{}); ok {
+		force, _ = data["force"].(bool)
+	}
+
+	if !force {
+		s.mutex.RLock()
+		busy := 0
+		for _, session := range s.sessions {
+			session.mutex.RLock()
+			if session.Status == "processing" {
+				busy++
+			}
+			session.mutex.RUnlock()
+		}
+		s.mutex.RUnlock()
+
+		if busy > 0 {
+			return s.createErrorResponse(msg.ID, fmt.Sprintf("有 %d 个会话正在处理，拒绝停止服务", busy), nil)
+		}
+	}
+
+	s.logger.Info("收到停止服务请求", zap.Bool("强制", force))
+
+	return s.createSuccessResponse(msg.ID, "shutting_down", map[string]interface{}{
+		"pid": os.Getpid(),
+	})
+}
+
 // handleStartSession 处理启动会话
 func (s *UMService) handleStartSession(msg *ServiceMessage) *ServiceResponse {
 	sessionID := fmt.Sprintf("session_%d", time.Now().UnixNano())
@@ -255,6 +433,12 @@ func (s *UMService) handleAddFiles(msg *ServiceMessage) *ServiceResponse {
 		if outputPath, ok := fileMap["output_path"].(string); ok {
 			task.OutputPath = outputPath
 		}
+		if priority, ok := fileMap["priority"].(float64); ok {
+			task.Priority = int(priority)
+		}
+		if fileSize, ok := fileMap["file_size"].(float64); ok {
+			task.FileSize = int64(fileSize)
+		}
 
 		files = append(files, task)
 	}
@@ -267,12 +451,11 @@ func (s *UMService) handleAddFiles(msg *ServiceMessage) *ServiceResponse {
 			continue
 		}
 
-		// 检查文件格式（简单检查扩展名）
-		ext := strings.ToLower(filepath.Ext(file.InputPath))
-		if s.isSupportedFormat(ext) {
+		// 检查文件格式（支持.kgm.flac这类多段扩展名）
+		if s.isSupportedFormat(file.InputPath) {
 			validFiles = append(validFiles, file)
 		} else {
-			s.logger.Warn("不支持的文件格式", zap.String("路径", file.InputPath), zap.String("扩展名", ext))
+			s.logger.Warn("不支持的文件格式", zap.String("路径", file.InputPath), zap.String("扩展名", filepath.Ext(file.InputPath)))
 		}
 	}
 
@@ -357,12 +540,19 @@ func (s *UMService) handleStartProcessing(msg *ServiceMessage) *ServiceResponse
 	session.Status = "processing"
 	session.Options = options
 	session.LastActive = time.Now()
+	session.StartedAt = time.Now()
+	session.ProcessedFiles = 0
+	session.SuccessCount = 0
+	session.FailedCount = 0
+	session.Results = nil
 
 	// 创建批处理器
 	session.Processor = newBatchProcessor(options, s.logger)
 
-	// 启动异步处理
-	go s.processSessionFiles(sessionID)
+	// 启动异步处理，stop_processing或end_session时通过context取消
+	ctx, cancel := context.WithCancel(context.Background())
+	session.cancel = cancel
+	go s.processSessionFiles(ctx, sessionID)
 
 	s.logger.Info("开始处理会话文件",
 		zap.String("会话ID", sessionID),
@@ -399,27 +589,17 @@ func (s *UMService) handleGetProgress(msg *ServiceMessage) *ServiceResponse {
 	session.mutex.RLock()
 	status := session.Status
 	totalFiles := len(session.Files)
+	processedFiles := session.ProcessedFiles
+	successCount := session.SuccessCount
+	failedCount := session.FailedCount
 	session.mutex.RUnlock()
 
 	// 计算进度
 	progress := 0.0
-	processedFiles := 0
-	currentFile := ""
-
-	if session.Processor != nil {
-		// 这里需要从批处理器获取实际进度
-		// 暂时使用简单的状态判断
-		switch status {
-		case "processing":
-			progress = 50.0 // 处理中
-		case "completed":
-			progress = 100.0
-			processedFiles = totalFiles
-		case "error":
-			progress = 0.0
-		default:
-			progress = 0.0
-		}
+	if status == "completed" {
+		progress = 100.0
+	} else if totalFiles > 0 {
+		progress = float64(processedFiles) * 100.0 / float64(totalFiles)
 	}
 
 	return s.createSuccessResponse(msg.ID, "progress_update", map[string]interface{}{
@@ -428,7 +608,9 @@ func (s *UMService) handleGetProgress(msg *ServiceMessage) *ServiceResponse {
 		"status":          status,
 		"total_files":     totalFiles,
 		"processed_files": processedFiles,
-		"current_file":    currentFile,
+		"success_count":   successCount,
+		"failed_count":    failedCount,
+		"current_file":    "",
 	})
 }
 
@@ -461,12 +643,12 @@ func (s *UMService) handleStopProcessing(msg *ServiceMessage) *ServiceResponse {
 		return s.createErrorResponse(msg.ID, "会话未在处理中", nil)
 	}
 
-	// 停止处理
+	// 停止处理：不再开始新的文件，正在处理的文件完成后推送session_finished
 	session.Status = "stopped"
 	session.LastActive = time.Now()
-
-	// 这里应该停止批处理器，但当前批处理器没有停止机制
-	// 可以通过context来实现，暂时只更新状态
+	if session.cancel != nil {
+		session.cancel()
+	}
 
 	s.logger.Info("停止处理会话", zap.String("会话ID", sessionID))
 
@@ -502,9 +684,14 @@ func (s *UMService) handleEndSession(msg *ServiceMessage) *ServiceResponse {
 
 	// 清理会话资源
 	session.mutex.Lock()
+	if session.cancel != nil {
+		session.cancel()
+	}
 	session.Status = "ended"
 	session.Files = nil
+	session.Results = nil
 	session.Processor = nil
+	session.Subscribers = nil
 	session.mutex.Unlock()
 
 	s.logger.Info("结束会话", zap.String("会话ID", sessionID))
@@ -515,6 +702,246 @@ func (s *UMService) handleEndSession(msg *ServiceMessage) *ServiceResponse {
 	})
 }
 
+// handleSubscribe 处理进度订阅
+// 订阅成功后，该连接会收到每个文件的file_started、file_completed事件以及最终的session_finished事件
+func (s *UMService) handleSubscribe(msg *ServiceMessage, writer *responseWriter) *ServiceResponse {
+	data, ok := msg.Data.(map[string]interface{})
+	if !ok {
+		return s.createErrorResponse(msg.ID, "无效的消息数据格式", nil)
+	}
+
+	sessionID, ok := data["session_id"].(string)
+	if !ok {
+		return s.createErrorResponse(msg.ID, "缺少会话ID", nil)
+	}
+
+	// 获取会话
+	s.mutex.RLock()
+	session, exists := s.sessions[sessionID]
+	s.mutex.RUnlock()
+
+	if !exists {
+		return s.createErrorResponse(msg.ID, "会话不存在", nil)
+	}
+
+	session.mutex.Lock()
+	defer session.mutex.Unlock()
+
+	// 会话已结束时不再登记订阅，直接在响应中返回最终结果
+	result := s.sessionSummary(session)
+	if isTerminalStatus(session.Status) {
+		result["finished"] = true
+		return s.createSuccessResponse(msg.ID, "subscribed", result)
+	}
+
+	session.Subscribers = append(session.Subscribers, &subscription{id: msg.ID, writer: writer})
+	session.LastActive = time.Now()
+	result["finished"] = false
+
+	s.logger.Debug("新增进度订阅", zap.String("会话ID", sessionID), zap.String("订阅ID", msg.ID))
+
+	return s.createSuccessResponse(msg.ID, "subscribed", result)
+}
+
+// handleUnsubscribe 处理取消订阅
+func (s *UMService) handleUnsubscribe(msg *ServiceMessage) *ServiceResponse {
+	data, ok := msg.Data.(map[string]interface{})
+	if !ok {
+		return s.createErrorResponse(msg.ID, "无效的消息数据格式", nil)
+	}
+
+	sessionID, ok := data["session_id"].(string)
+	if !ok {
+		return s.createErrorResponse(msg.ID, "缺少会话ID", nil)
+	}
+
+	subscriptionID, ok := data["subscription_id"].(string)
+	if !ok {
+		return s.createErrorResponse(msg.ID, "缺少订阅ID", nil)
+	}
+
+	// 获取会话
+	s.mutex.RLock()
+	session, exists := s.sessions[sessionID]
+	s.mutex.RUnlock()
+
+	if !exists {
+		return s.createErrorResponse(msg.ID, "会话不存在", nil)
+	}
+
+	s.removeSubscriber(session, subscriptionID)
+
+	return s.createSuccessResponse(msg.ID, "unsubscribed", map[string]interface{}{
+		"session_id":      sessionID,
+		"subscription_id": subscriptionID,
+	})
+}
+
+// handleGetResults 分页获取会话中已完成文件的处理结果
+// 结果按完成顺序追加，处理进行中也可以读取，客户端用next_offset继续读取后续结果
+func (s *UMService) handleGetResults(msg *ServiceMessage) *ServiceResponse {
+	data, ok := msg.Data.(map[string]interface{})
+	if !ok {
+		return s.createErrorResponse(msg.ID, "无效的消息数据格式", nil)
+	}
+
+	sessionID, ok := data["session_id"].(string)
+	if !ok {
+		return s.createErrorResponse(msg.ID, "缺少会话ID", nil)
+	}
+
+	// JSON数字解析为float64
+	offset := 0
+	if value, ok := data["offset"].(float64); ok && value > 0 {
+		offset = int(value)
+	}
+	limit := defaultResultsPageSize
+	if value, ok := data["limit"].(float64); ok && value > 0 {
+		limit = int(value)
+	}
+	if limit > maxResultsPageSize {
+		limit = maxResultsPageSize
+	}
+
+	// 获取会话
+	s.mutex.RLock()
+	session, exists := s.sessions[sessionID]
+	s.mutex.RUnlock()
+
+	if !exists {
+		return s.createErrorResponse(msg.ID, "会话不存在", nil)
+	}
+
+	session.mutex.Lock()
+	defer session.mutex.Unlock()
+
+	total := len(session.Results)
+	if offset > total {
+		offset = total
+	}
+	end := offset + limit
+	if end > total {
+		end = total
+	}
+	page := make([]ProcessResult, end-offset)
+	copy(page, session.Results[offset:end])
+	session.LastActive = time.Now()
+
+	return s.createSuccessResponse(msg.ID, "results", map[string]interface{}{
+		"session_id":  sessionID,
+		"status":      session.Status,
+		"offset":      offset,
+		"next_offset": end,
+		"total":       total,
+		"has_more":    end < total,
+		"finished":    isTerminalStatus(session.Status),
+		"results":     page,
+	})
+}
+
+// publishResult 记录单个文件的处理结果并推送给订阅者
+func (s *UMService) publishResult(session *Session, result ProcessResult) {
+	session.mutex.Lock()
+	session.ProcessedFiles++
+	if result.Success {
+		session.SuccessCount++
+	} else {
+		session.FailedCount++
+	}
+	session.Results = append(session.Results, result)
+	session.LastActive = time.Now()
+	event := map[string]interface{}{
+		"session_id":      session.ID,
+		"input_path":      result.InputPath,
+		"output_path":     result.OutputPath,
+		"success":         result.Success,
+		"error":           result.Error,
+		"decoder":         result.Decoder,
+		"process_time_ms": result.ProcessTime,
+		"processed_files": session.ProcessedFiles,
+		"total_files":     len(session.Files),
+	}
+	subscribers := append([]*subscription(nil), session.Subscribers...)
+	session.mutex.Unlock()
+
+	s.notifySubscribers(session, subscribers, "file_completed", event)
+}
+
+// publishStart 推送文件开始处理的事件，客户端据此监控单个文件的处理时间
+func (s *UMService) publishStart(session *Session, task FileTask) {
+	session.mutex.Lock()
+	event := map[string]interface{}{
+		"session_id": session.ID,
+		"input_path": task.InputPath,
+	}
+	subscribers := append([]*subscription(nil), session.Subscribers...)
+	session.mutex.Unlock()
+
+	if len(subscribers) > 0 {
+		s.notifySubscribers(session, subscribers, "file_started", event)
+	}
+}
+
+// notifySubscribers 向订阅者推送事件，写入失败的订阅会被移除
+func (s *UMService) notifySubscribers(session *Session, subscribers []*subscription, eventType string, data interface{}) {
+	for _, sub := range subscribers {
+		event := &ServiceResponse{
+			ID:        sub.id,
+			Type:      eventType,
+			Success:   true,
+			Data:      data,
+			Timestamp: time.Now().Unix(),
+		}
+		if err := sub.writer.Write(event); err != nil {
+			s.logger.Warn("推送进度事件失败，移除订阅",
+				zap.String("会话ID", session.ID),
+				zap.String("订阅ID", sub.id),
+				zap.Error(err))
+			s.removeSubscriber(session, sub.id)
+		}
+	}
+}
+
+// removeSubscriber 移除指定订阅
+func (s *UMService) removeSubscriber(session *Session, subscriptionID string) {
+	session.mutex.Lock()
+	defer session.mutex.Unlock()
+
+	subscribers := session.Subscribers[:0]
+	for _, sub := range session.Subscribers {
+		if sub.id != subscriptionID {
+			subscribers = append(subscribers, sub)
+		}
+	}
+	session.Subscribers = subscribers
+}
+
+// sessionSummary 生成会话统计信息（调用方需持有session.mutex）
+func (s *UMService) sessionSummary(session *Session) map[string]interface{} {
+	var totalTime int64
+	if !session.StartedAt.IsZero() {
+		totalTime = time.Since(session.StartedAt).Milliseconds()
+	}
+	return map[string]interface{}{
+		"session_id":      session.ID,
+		"status":          session.Status,
+		"total_files":     len(session.Files),
+		"processed_files": session.ProcessedFiles,
+		"success_count":   session.SuccessCount,
+		"failed_count":    session.FailedCount,
+		"total_time_ms":   totalTime,
+	}
+}
+
+// isTerminalStatus 判断会话是否已处理结束
+func isTerminalStatus(status string) bool {
+	switch status {
+	case "completed", "partial_success", "error", "stopped":
+		return true
+	}
+	return false
+}
+
 // cleanupSessions 清理过期会话
 func (s *UMService) cleanupSessions() {
 	ticker := time.NewTicker(5 * time.Minute)
@@ -570,13 +997,8 @@ func (s *UMService) createErrorResponse(id, errorMsg string, err error) *Service
 	}
 }
 
-func (s *UMService) sendError(encoder *json.Encoder, id, msg string, err error) {
-	response := s.createErrorResponse(id, msg, err)
-	encoder.Encode(response)
-}
-
 // processSessionFiles 异步处理会话文件
-func (s *UMService) processSessionFiles(sessionID string) {
+func (s *UMService) processSessionFiles(ctx context.Context, sessionID string) {
 	// 获取会话
 	s.mutex.RLock()
 	session, exists := s.sessions[sessionID]
@@ -612,12 +1034,24 @@ func (s *UMService) processSessionFiles(sessionID string) {
 		zap.String("会话ID", sessionID),
 		zap.Int("文件数量", len(files)))
 
+	// 每个文件完成时更新统计并推送给订阅者
+	processor.onResult = func(result ProcessResult) {
+		s.publishResult(session, result)
+	}
+	processor.onStart = func(task FileTask) {
+		s.publishStart(session, task)
+	}
+
 	// 执行批处理
-	response := processor.processBatch(request)
+	response := processor.processBatch(ctx, request)
 
 	// 更新会话状态
 	session.mutex.Lock()
-	if response.SuccessCount == len(files) {
+	if ctx.Err() != nil {
+		if session.Status != "ended" {
+			session.Status = "stopped"
+		}
+	} else if response.SuccessCount == len(files) {
 		session.Status = "completed"
 	} else if response.SuccessCount > 0 {
 		session.Status = "partial_success"
@@ -625,8 +1059,12 @@ func (s *UMService) processSessionFiles(sessionID string) {
 		session.Status = "error"
 	}
 	session.LastActive = time.Now()
+	finished := s.sessionSummary(session)
+	subscribers := append([]*subscription(nil), session.Subscribers...)
 	session.mutex.Unlock()
 
+	s.notifySubscribers(session, subscribers, "session_finished", finished)
+
 	s.logger.Info("文件处理完成",
 		zap.String("会话ID", sessionID),
 		zap.String("状态", session.Status),
@@ -634,41 +1072,64 @@ func (s *UMService) processSessionFiles(sessionID string) {
 		zap.Int("失败", response.FailedCount))
 }
 
-// isSupportedFormat 检查文件格式是否支持
-func (s *UMService) isSupportedFormat(ext string) bool {
-	supportedFormats := map[string]bool{
-		// 网易云音乐
-		".ncm": true,
+// supportedFormats 支持的加密格式扩展名（小写），包含.kgm.flac这类多段扩展名
+var supportedFormats = map[string]bool{
+	// 网易云音乐
+	".ncm": true,
+
+	// QQ音乐
+	".qmc0": true, ".qmc2": true, ".qmc3": true, ".qmc4": true, ".qmc6": true, ".qmc8": true,
+	".qmcflac": true, ".qmcogg": true, ".tkm": true,
+	".mflac": true, ".mflac0": true, ".mflac1": true, ".mflaca": true, ".mflach": true, ".mflacl": true, ".mflacm": true,
+	".mgg": true, ".mgg0": true, ".mgg1": true, ".mgga": true, ".mggh": true, ".mggl": true, ".mggm": true,
+	".mmp4": true,
 
-		// QQ音乐
-		".qmc0": true, ".qmc2": true, ".qmc3": true, ".qmc4": true, ".qmc6": true, ".qmc8": true,
-		".qmcflac": true, ".qmcogg": true, ".tkm": true,
-		".mflac": true, ".mflac0": true, ".mflac1": true, ".mflaca": true, ".mflach": true, ".mflacl": true, ".mflacm": true,
-		".mgg": true, ".mgg0": true, ".mgg1": true, ".mgga": true, ".mggh": true, ".mggl": true, ".mggm": true,
-		".mmp4": true,
+	// QQ音乐微云格式
+	".666c6163": true, ".6d3461": true, ".6d7033": true, ".6f6767": true, ".776176": true,
 
-		// QQ音乐微云格式
-		".666c6163": true, ".6d3461": true, ".6d7033": true, ".6f6767": true, ".776176": true,
+	// 酷狗音乐
+	".kgm": true, ".kgma": true, ".kgg": true, ".kgm.flac": true,
 
-		// 酷狗音乐
-		".kgm": true, ".kgma": true, ".kgg": true, ".kgm.flac": true,
+	// 酷我音乐
+	".kwm": true,
 
-		// 酷我音乐
-		".kwm": true,
+	// 太合音乐
+	".tm0": true, ".tm2": true, ".tm3": true, ".tm6": true,
 
-		// 太合音乐
-		".tm0": true, ".tm2": true, ".tm3": true, ".tm6": true,
+	// 虾米音乐
+	".xm": true, ".x2m": true, ".x3m": true,
 
-		// 虾米音乐
-		".xm": true, ".x2m": true, ".x3m": true,
+	// Moo Music
+	".bkcmp3": true, ".bkcm4a": true, ".bkcflac": true, ".bkcwav": true, ".bkcape": true, ".bkcogg": true, ".bkcwma": true,
 
-		// Moo Music
-		".bkcmp3": true, ".bkcm4a": true, ".bkcflac": true, ".bkcwav": true, ".bkcape": true, ".bkcogg": true, ".bkcwma": true,
+	// 其他
+	".vpr": true, ".vpr.flac": true,
+}
 
-		// 其他
-		".vpr": true, ".vpr.flac": true,
+// supportedFormatMaxDots 支持的扩展名最多包含的点数
+const supportedFormatMaxDots = 2
+
+// supportedExtension 返回文件名匹配的支持扩展名（优先匹配最长的多段扩展名），不支持时返回空字符串
+func supportedExtension(path string) string {
+	name := strings.ToLower(filepath.Base(path))
+	end := len(name)
+	candidate := ""
+	for i := 0; i < supportedFormatMaxDots; i++ {
+		dot := strings.LastIndexByte(name[:end], '.')
+		if dot < 0 {
+			break
+		}
+		if supportedFormats[name[dot:]] {
+			candidate = name[dot:]
+		}
+		end = dot
 	}
-	return supportedFormats[ext]
+	return candidate
+}
+
+// isSupportedFormat 检查文件格式是否支持
+func (s *UMService) isSupportedFormat(path string) bool {
+	return supportedExtension(path) != ""
 }
 
 // runServiceMode 运行服务模式
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+应用数据目录 - 存放转换记录等需要跨次运行保留的数据
+"""
+
+import os
+import platform
+
+from .constants import APP_DATA_DIR_NAME
+
+
+def get_app_data_dir() -> str:
+    """
+    获取应用数据目录，不存在时自动创建
+
+    Windows使用%LOCALAPPDATA%，macOS使用~/Library/Application Support，
+    其他系统使用$XDG_DATA_HOME（默认~/.local/share）。
+
+    Returns:
+        str: 应用数据目录的绝对路径
+    """
+    system = platform.system()
+    if system == "Windows":
+        base_dir = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    elif system == "Darwin":
+        base_dir = os.path.join(os.path.expanduser("~"), "Library", "Application Support")
+    else:
+        base_dir = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+
+    app_dir = os.path.join(base_dir, APP_DATA_DIR_NAME)
+    os.makedirs(app_dir, exist_ok=True)
+    return app_dir
+
+
+def get_app_data_path(filename: str) -> str:
+    """
+    获取应用数据目录下的文件路径
+
+    Args:
+        filename: 文件名
+
+    Returns:
+        str: 文件的绝对路径
+    """
+    return os.path.join(get_app_data_dir(), filename)
@@ -0,0 +1,724 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音乐解密服务异步客户端
+基于asyncio实现与Go服务端的IPC通信，适合在单个事件循环中驱动大量并发会话
+"""
+
+import asyncio
+import json
+import logging
+import platform
+import time
+import uuid
+from typing import Dict, List, Optional, Any, AsyncIterator
+
+from .constants import (
+    SERVICE_ADD_FILES_CHUNK_SIZE,
+    SERVICE_REQUEST_TIMEOUT,
+    SERVICE_MAX_MESSAGE_SIZE,
+    SERVICE_PROGRESS_INTERVAL,
+    SERVICE_TERMINAL_STATUSES,
+    SERVICE_EVENT_TYPES,
+    SERVICE_RESULTS_PAGE_SIZE
+)
+
+
+class AsyncServiceClient:
+    """
+    音乐解密服务异步客户端
+
+    与ServiceClient使用相同的换行分隔JSON协议，一个连接上可以并发多个请求，
+    后台读取任务按消息ID把响应分发给对应的等待者。
+    """
+
+    def __init__(self, service_path: str = None):
+        """
+        初始化异步服务客户端
+
+        Args:
+            service_path: 服务路径（Windows命名管道或Unix套接字）
+        """
+        self.logger = self._setup_logger()
+        self.is_windows = platform.system() == "Windows"
+        self.service_path = service_path or self._get_default_service_path()
+        self.connected = False
+        self.session_id = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, asyncio.Future] = {}
+        # 进度订阅：订阅消息ID -> 事件队列
+        self._subscriptions: Dict[str, asyncio.Queue] = {}
+
+    def _setup_logger(self) -> logging.Logger:
+        """设置日志记录器"""
+        logger = logging.getLogger(f"{__name__}.AsyncServiceClient")
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        return logger
+
+    def _get_default_service_path(self) -> str:
+        """获取默认服务路径"""
+        if self.is_windows:
+            return r'\\.\pipe\um_service'
+        else:
+            return '/tmp/um_service.sock'
+
+    async def connect(self, timeout: float = 10.0) -> bool:
+        """
+        连接到服务
+
+        Args:
+            timeout: 连接超时时间（秒）
+
+        Returns:
+            bool: 是否连接成功
+        """
+        if self.connected:
+            return True
+
+        try:
+            if self.is_windows:
+                # Windows命名管道（需要ProactorEventLoop，Python 3.8起为默认事件循环）
+                loop = asyncio.get_running_loop()
+                reader = asyncio.StreamReader(limit=SERVICE_MAX_MESSAGE_SIZE, loop=loop)
+                protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+                transport, _ = await asyncio.wait_for(
+                    loop.create_pipe_connection(lambda: protocol, self.service_path),
+                    timeout
+                )
+                writer = asyncio.StreamWriter(transport, protocol, reader, loop)
+            else:
+                # Unix域套接字
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_unix_connection(self.service_path, limit=SERVICE_MAX_MESSAGE_SIZE),
+                    timeout
+                )
+
+            self._reader = reader
+            self._writer = writer
+            self.connected = True
+            self._reader_task = asyncio.ensure_future(self._reader_loop())
+
+            self.logger.info(f"成功连接到服务: {self.service_path}")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"连接服务失败: {e}")
+            self._reader = None
+            self._writer = None
+            self.connected = False
+            return False
+
+    async def disconnect(self):
+        """断开连接"""
+        if self._writer is None:
+            return
+
+        writer = self._writer
+        self._writer = None
+        self.connected = False
+        self.session_id = None
+
+        try:
+            writer.close()
+            await writer.wait_closed()
+        except Exception as e:
+            self.logger.error(f"断开连接时出错: {e}")
+
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader_task = None
+
+        self._fail_pending(ConnectionError("连接已断开"))
+        self.logger.info("已断开服务连接")
+
+    async def _reader_loop(self):
+        """后台读取任务：按消息ID把响应分发给等待中的请求"""
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    response = json.loads(line.decode('utf-8'))
+                except ValueError as e:
+                    self.logger.error(f"解析响应失败: {e}")
+                    continue
+
+                self._dispatch_response(response)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.connected:
+                self.logger.error(f"读取响应失败: {e}")
+        finally:
+            if self.connected:
+                self.logger.warning("服务连接已关闭")
+                self.connected = False
+            self._fail_pending(ConnectionError("服务连接已关闭"))
+
+    def _dispatch_response(self, response: Dict[str, Any]):
+        """
+        将响应交给对应的在途请求
+
+        Args:
+            response: 服务端响应
+        """
+        response_id = response.get("id", "")
+        if response.get("type") in SERVICE_EVENT_TYPES:
+            events = self._subscriptions.get(response_id)
+            if events is not None:
+                events.put_nowait(response)
+                return
+
+        future = self._pending.pop(response_id, None)
+        if future is None:
+            self.logger.warning(f"收到无法匹配的响应: {response.get('error') or response.get('type')}")
+            return
+
+        self.logger.debug(f"收到响应: {response.get('type', 'unknown')}")
+        if not future.done():
+            future.set_result(response)
+
+    def _fail_pending(self, error: Exception):
+        """
+        使所有在途请求以异常结束
+
+        Args:
+            error: 要设置的异常
+        """
+        pending = list(self._pending.values())
+        self._pending.clear()
+        # 通知所有订阅连接已断开
+        for events in self._subscriptions.values():
+            events.put_nowait(None)
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _send_messages(self, messages: List[tuple],
+                             ids: List[str] = None) -> List[Optional[Dict[str, Any]]]:
+        """
+        一次写入多条消息并等待全部响应
+
+        Args:
+            messages: (消息类型, 消息数据) 列表
+            ids: 预先生成的消息ID（订阅需要在发送前登记ID），默认自动生成
+
+        Returns:
+            List[Dict]: 与messages顺序一致的响应列表，失败的位置为None
+        """
+        if not self.connected:
+            self.logger.error("未连接到服务")
+            return [None] * len(messages)
+
+        loop = asyncio.get_running_loop()
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in messages]
+        frames = []
+        for message_id, (msg_type, data) in zip(ids, messages):
+            message = {
+                "id": message_id,
+                "type": msg_type,
+                "data": data,
+                "timestamp": int(time.time())
+            }
+            frames.append((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+            self._pending[message_id] = loop.create_future()
+
+        futures = [self._pending[message_id] for message_id in ids]
+
+        try:
+            self._writer.write(b''.join(frames))
+            await self._writer.drain()
+            self.logger.debug(f"发送消息: {[msg_type for msg_type, _ in messages]}")
+        except asyncio.CancelledError:
+            self._discard_pending(ids, futures)
+            raise
+        except Exception as e:
+            self.logger.error(f"发送消息失败: {e}")
+            self._discard_pending(ids, futures)
+            return [None] * len(messages)
+
+        try:
+            done, _ = await asyncio.wait(futures, timeout=SERVICE_REQUEST_TIMEOUT)
+        except asyncio.CancelledError:
+            # 调用方被取消时撤销在途请求，迟到的响应按无法匹配处理
+            self._discard_pending(ids, futures)
+            raise
+
+        responses = []
+        for message_id, future in zip(ids, futures):
+            self._pending.pop(message_id, None)
+            if future in done and not future.cancelled() and future.exception() is None:
+                responses.append(future.result())
+            else:
+                if not future.done():
+                    future.cancel()
+                    self.logger.error(f"等待响应超时（{SERVICE_REQUEST_TIMEOUT}秒）")
+                elif not future.cancelled() and future.exception() is not None:
+                    self.logger.error(f"发送消息失败: {future.exception()}")
+                responses.append(None)
+        return responses
+
+    def _discard_pending(self, ids: List[str], futures: List[asyncio.Future]):
+        """
+        从在途表中移除一组请求并撤销其等待
+
+        Args:
+            ids: 消息ID列表
+            futures: 与ids对应的等待对象
+        """
+        for message_id, future in zip(ids, futures):
+            self._pending.pop(message_id, None)
+            if not future.done():
+                future.cancel()
+            elif not future.cancelled():
+                future.exception()  # 连接断开时已被设置异常，标记为已处理
+
+    async def _send_message(self, msg_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        发送消息到服务端
+
+        Args:
+            msg_type: 消息类型
+            data: 消息数据
+
+        Returns:
+            Dict: 服务端响应，失败时返回None
+        """
+        return (await self._send_messages([(msg_type, data)]))[0]
+
+    async def ping(self) -> bool:
+        """
+        发送轻量级ping请求，确认服务能够正常处理消息
+
+        Returns:
+            bool: 服务是否响应
+        """
+        response = await self._send_message("ping", {})
+        return bool(response and response.get("success"))
+
+    async def hello(self) -> Optional[Dict[str, Any]]:
+        """
+        握手，获取服务版本、可执行文件信息、支持的扩展名和协议能力
+
+        Returns:
+            Dict: 服务信息，服务不支持握手或请求失败时返回None
+        """
+        response = await self._send_message("hello", {})
+
+        if response and response.get("success"):
+            return response.get("data", {})
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.warning(f"服务握手失败: {error}")
+            return None
+
+    async def create_session(self) -> Optional[str]:
+        """
+        创建新的处理会话（不影响当前会话）
+
+        Returns:
+            str: 会话ID，失败时返回None
+        """
+        response = await self._send_message("start_session", {})
+
+        if response and response.get("success"):
+            session_id = response.get("data", {}).get("session_id")
+            self.logger.info(f"启动会话成功: {session_id}")
+            return session_id
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.error(f"启动会话失败: {error}")
+            return None
+
+    async def start_session(self) -> bool:
+        """
+        启动处理会话并设为当前会话
+
+        Returns:
+            bool: 是否成功启动会话
+        """
+        session_id = await self.create_session()
+        if session_id:
+            self.session_id = session_id
+            return True
+        return False
+
+    async def add_files(self, files: List[Dict[str, str]], session_id: str = None) -> bool:
+        """
+        添加文件到处理队列
+
+        Args:
+            files: 文件列表，每个文件包含input_path和可选的output_path
+            session_id: 会话ID，默认使用当前会话
+
+        Returns:
+            bool: 是否成功添加文件
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return False
+
+        messages = [
+            ("add_files", {
+                "session_id": session_id,
+                "files": files[i:i + SERVICE_ADD_FILES_CHUNK_SIZE]
+            })
+            for i in range(0, len(files), SERVICE_ADD_FILES_CHUNK_SIZE)
+        ]
+        if not messages:
+            return True
+
+        added_count = 0
+        for response in await self._send_messages(messages):
+            if response and response.get("success"):
+                added_count += response.get("data", {}).get("added_count", 0)
+            else:
+                error = response.get("error", "未知错误") if response else "无响应"
+                self.logger.error(f"添加文件失败: {error}")
+                return False
+
+        self.logger.info(f"成功添加 {added_count} 个文件")
+        return True
+
+    async def start_processing(self, options: Dict[str, Any] = None, session_id: str = None) -> bool:
+        """
+        开始处理文件
+
+        Args:
+            options: 处理选项
+            session_id: 会话ID，默认使用当前会话
+
+        Returns:
+            bool: 是否成功开始处理
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return False
+
+        if options is None:
+            options = {
+                "remove_source": False,
+                "update_metadata": True,
+                "overwrite_output": True,
+                "skip_noop": True,
+                "naming_format": "auto"
+            }
+
+        response = await self._send_message("start_processing", {
+            "session_id": session_id,
+            "options": options
+        })
+
+        if response and response.get("success"):
+            self.logger.info("开始处理文件")
+            return True
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.error(f"开始处理失败: {error}")
+            return False
+
+    async def get_progress(self, session_id: str = None) -> Optional[Dict[str, Any]]:
+        """
+        获取处理进度
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
+        Returns:
+            Dict: 进度信息，失败时返回None
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return None
+
+        response = await self._send_message("get_progress", {"session_id": session_id})
+
+        if response and response.get("success"):
+            return response.get("data", {})
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.error(f"获取进度失败: {error}")
+            return None
+
+    async def iter_progress(self, session_id: str = None,
+                            interval: float = SERVICE_PROGRESS_INTERVAL) -> AsyncIterator[Dict[str, Any]]:
+        """
+        异步迭代会话进度，直到会话进入结束状态
+
+        用法：async for progress in client.iter_progress(): ...
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+            interval: 两次查询之间的间隔（秒）
+
+        Yields:
+            Dict: 进度信息
+        """
+        session_id = session_id or self.session_id
+        while True:
+            progress = await self.get_progress(session_id)
+            if progress is None:
+                return
+
+            yield progress
+
+            if progress.get("status") in SERVICE_TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(interval)
+
+    async def get_results(self, session_id: str = None, offset: int = 0,
+                          limit: int = SERVICE_RESULTS_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        分页获取会话中已完成文件的处理结果
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+            offset: 起始位置
+            limit: 本页最多返回的结果数
+
+        Returns:
+            Dict: 包含results、next_offset、has_more、finished等字段，失败时返回None
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return None
+
+        data = {"session_id": session_id, "offset": offset, "limit": limit}
+        response = await self._send_message("get_results", data)
+
+        if response and response.get("success"):
+            return response.get("data", {})
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.error(f"获取处理结果失败: {error}")
+            return None
+
+    async def iter_results(self, session_id: str = None, offset: int = 0,
+                           page_size: int = SERVICE_RESULTS_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        逐页异步读取会话的处理结果，每次只在内存中保留一页
+
+        用法：async for result in client.iter_results(): ...
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+            offset: 起始位置
+            page_size: 每页结果数
+
+        Yields:
+            Dict: 单个文件的处理结果
+
+        Raises:
+            ConnectionError: 读取某一页失败
+        """
+        while True:
+            page = await self.get_results(session_id, offset, page_size)
+            if page is None:
+                raise ConnectionError("获取处理结果失败")
+
+            for result in page.get("results") or []:
+                yield result
+
+            next_offset = page.get("next_offset", offset)
+            if not page.get("has_more") or next_offset <= offset:
+                return
+            offset = next_offset
+
+    async def subscribe_progress(self, session_id: str = None) -> Optional['AsyncProgressSubscription']:
+        """
+        订阅会话进度，服务端会在每个文件完成时主动推送事件
+
+        应在start_processing之前订阅，以免错过最早完成的文件。
+        用法：async for event in subscription: ...
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
+        Returns:
+            AsyncProgressSubscription: 订阅对象，失败时返回None
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return None
+
+        message_id = str(uuid.uuid4())
+        events = asyncio.Queue()
+        self._subscriptions[message_id] = events
+
+        try:
+            response = (await self._send_messages([("subscribe", {"session_id": session_id})], ids=[message_id]))[0]
+        except asyncio.CancelledError:
+            self._subscriptions.pop(message_id, None)
+            raise
+
+        if response and response.get("success"):
+            self.logger.debug(f"订阅会话进度成功: {session_id}")
+            return AsyncProgressSubscription(self, session_id, message_id, events, response.get("data", {}))
+
+        self._subscriptions.pop(message_id, None)
+        error = response.get("error", "未知错误") if response else "无响应"
+        self.logger.error(f"订阅会话进度失败: {error}")
+        return None
+
+    async def stop_processing(self, session_id: str = None) -> bool:
+        """
+        停止处理
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
+        Returns:
+            bool: 是否成功停止处理
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return False
+
+        response = await self._send_message("stop_processing", {"session_id": session_id})
+
+        if response and response.get("success"):
+            self.logger.info("停止处理成功")
+            return True
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.error(f"停止处理失败: {error}")
+            return False
+
+    async def end_session(self, session_id: str = None) -> bool:
+        """
+        结束会话
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
+        Returns:
+            bool: 是否成功结束会话
+        """
+        is_current = session_id is None or session_id == self.session_id
+        session_id = session_id or self.session_id
+        if not session_id:
+            return True  # 没有会话，认为已结束
+
+        response = await self._send_message("end_session", {"session_id": session_id})
+
+        if is_current:
+            self.session_id = None  # 失败时也强制清除会话ID
+
+        if response and response.get("success"):
+            self.logger.info("结束会话成功")
+            return True
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.error(f"结束会话失败: {error}")
+            return False
+
+    async def __aenter__(self):
+        """异步上下文管理器入口"""
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """异步上下文管理器出口"""
+        if self.session_id:
+            await self.end_session()
+        await self.disconnect()
+
+
+class AsyncProgressSubscription:
+    """
+    会话进度订阅（异步版本）
+
+    async for迭代得到服务端推送的事件字典，事件格式与ProgressSubscription相同，
+    收到session_finished或连接断开后迭代结束。
+    """
+
+    def __init__(self, client: AsyncServiceClient, session_id: str, subscription_id: str,
+                 events: asyncio.Queue, initial: Dict[str, Any]):
+        """
+        初始化订阅
+
+        Args:
+            client: 所属的服务客户端
+            session_id: 会话ID
+            subscription_id: 订阅消息ID
+            events: 读取任务投递事件的队列
+            initial: 订阅响应中的会话状态
+        """
+        self.client = client
+        self.session_id = session_id
+        self.subscription_id = subscription_id
+        self.finished = bool(initial.get("finished"))
+        self._events = events
+        self._initial = initial
+        self._closed = False
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self.events()
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        迭代推送事件
+
+        Yields:
+            Dict: 事件数据
+        """
+        try:
+            if self.finished:
+                # 订阅时会话已结束，直接给出最终结果
+                event = dict(self._initial)
+                event["type"] = "session_finished"
+                yield event
+                return
+
+            while True:
+                message = await self._events.get()
+                if message is None:
+                    self.client.logger.warning("订阅过程中服务连接已断开")
+                    return
+
+                event = dict(message.get("data") or {})
+                event["type"] = message.get("type")
+                yield event
+
+                if event["type"] == "session_finished":
+                    self.finished = True
+                    return
+        finally:
+            await self.close()
+
+    async def close(self):
+        """取消订阅"""
+        if self._closed:
+            return
+        self._closed = True
+        self.client._subscriptions.pop(self.subscription_id, None)
+
+        # 会话未结束时通知服务端停止推送
+        if not self.finished and self.client.connected:
+            await self.client._send_message("unsubscribe", {
+                "session_id": self.session_id,
+                "subscription_id": self.subscription_id
+            })
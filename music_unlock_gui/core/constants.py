@@ -126,8 +126,75 @@ DELETE_TOOL_WINDOW_MIN_SIZE = (700, 500)
 
 # 处理相关常量
 DEFAULT_MAX_WORKERS = 6
-PROCESS_TIMEOUT_SECONDS = 300  # 5分钟
+BATCH_TIMEOUT_MAX_SECONDS = 24 * 3600  # 批处理总超时上限（按文件数累加的超时过大会被subprocess拒绝）
+BATCH_MAX_SHARDS = 8  # 批处理最多拆分的um --batch进程数
+BATCH_SHARD_MIN_BYTES = 256 * 1024 * 1024  # 按总字节数拆分时每个分片的字节数
+BATCH_SHARD_TARGET_FILES = 500  # 按文件数拆分时每个分片的文件数
+BATCH_STDERR_TAIL_LINES = 50  # 批处理失败时保留的um错误输出行数
+BATCH_SCANDIR_MIN_FILES = 8  # 同一目录下文件数达到该值时遍历目录获取文件大小，而不是逐个stat
+SCAN_MAX_WORKERS = 8  # 并行扫描目录的线程数（网络盘上延迟占主导，多线程可以重叠等待）
+SCAN_CHUNK_SIZE = 500  # 扫描结果每批最多的文件数
+SCAN_CHUNK_INTERVAL = 0.2  # 扫描结果最长的发送间隔（秒），文件较少时也能及时显示
+SCAN_CACHE_RACY_SECONDS = 2.0  # 修改时间距读取时不到该时间的目录不缓存（FAT的时间精度为2秒，同一时刻的后续修改可能不改变时间）
+DELETE_MAX_WORKERS = 8  # 并行删除文件的线程数（网络盘上每次删除都要等待往返，多线程可以重叠等待）
+DELETE_BATCH_SIZE = 500  # 同一目录下每个删除任务最多的文件数（大目录拆成多个任务并行删除）
+DELETE_PROGRESS_INTERVAL = 0.1  # 删除进度的最短回调间隔（秒）
 UM_COMMAND_TIMEOUT = 10  # um.exe命令超时时间
+THROUGHPUT_DEFAULT_BYTES_PER_SEC = 1024 * 1024  # 没有历史数据时假设的处理速度（保守估计）
+THROUGHPUT_EWMA_ALPHA = 0.2  # 处理速度移动平均中新样本的权重
+THROUGHPUT_MIN_SAMPLE_BYTES = 256 * 1024  # 小于该大小的文件耗时主要是固定开销，不参与速度统计
+THROUGHPUT_FILE_OVERHEAD_SECONDS = 0.05  # 估计整批耗时时每个文件的固定开销（秒）
+FILE_DEADLINE_SAFETY_FACTOR = 10.0  # 单个文件的截止时间为预计耗时的倍数
+FILE_DEADLINE_MIN_SECONDS = 60.0  # 单个文件截止时间的下限（秒）
+BATCH_DEADLINE_SAFETY_FACTOR = 4.0  # 整批文件的截止时间为预计耗时的倍数
+BATCH_DEADLINE_MIN_SECONDS = 300.0  # 整批文件截止时间的下限（秒）
+WATCHDOG_INTERVAL = 1.0  # 检查单个文件是否超时的间隔（秒）
+PROCESS_TERMINATE_GRACE_SECONDS = 3.0  # 停止时先请求um退出，超过该时间仍未退出则强制结束（秒）
+
+# 失败重试相关常量（只重试临时性I/O错误）
+RETRY_MAX_ATTEMPTS = 3  # 最多重试次数
+RETRY_BASE_DELAY_SECONDS = 2.0  # 第一次重试前的等待时间，之后每次翻倍（秒）
+RETRY_MAX_DELAY_SECONDS = 30.0  # 重试等待时间的上限（秒）
+
+# 服务模式相关常量
+SERVICE_RECV_CHUNK_SIZE = 64 * 1024  # 单次从套接字/管道读取的字节数
+SERVICE_ADD_FILES_CHUNK_SIZE = 2000  # add_files单条消息携带的最大文件数
+SERVICE_REQUEST_TIMEOUT = 60.0  # 单个服务请求等待响应的超时时间（秒）
+SERVICE_MAX_MESSAGE_SIZE = 64 * 1024 * 1024  # 单条响应的最大长度
+SERVICE_PROGRESS_INTERVAL = 0.1  # 轮询进度的间隔（秒）
+SERVICE_TERMINAL_STATUSES = ("completed", "partial_success", "error", "stopped")  # 会话结束状态
+SERVICE_EVENT_TYPES = ("file_started", "file_completed", "session_finished")  # 服务端主动推送的事件类型
+SERVICE_EVENT_HEARTBEAT = 1.0  # 等待推送事件时的心跳间隔（秒）
+SERVICE_BREAKER_THRESHOLD = 3  # 服务模式连续失败多少次后熔断
+SERVICE_BREAKER_COOLDOWN = 60.0  # 熔断后多久再尝试服务模式（秒）
+SERVICE_RESULTS_PAGE_SIZE = 500  # get_results每页结果数
+SERVICE_STARTUP_TIMEOUT = 15.0  # 等待服务启动就绪的最长时间（秒）
+SERVICE_PROBE_INITIAL_DELAY = 0.01  # 就绪探测的初始重试间隔（秒）
+SERVICE_PROBE_MAX_DELAY = 0.5  # 就绪探测的最大重试间隔（秒）
+SERVICE_PING_TIMEOUT = 2.0  # ping请求的超时时间（秒）
+SERVICE_SHUTDOWN_TIMEOUT = 5.0  # 等待旧服务退出的最长时间（秒）
+SERVICE_REQUIRED_CAPABILITIES = ("ping", "pipelining", "subscribe", "get_results")  # 复用服务所需的协议能力
+SERVICE_MAX_INSTANCES = 4  # 服务实例数量上限
+SERVICE_WORKERS_PER_INSTANCE = 20  # 单个服务实例的worker上限（与Go批处理器一致）
+SERVICE_MIN_FILES_PER_INSTANCE = 50  # 文件数不足时不拆分到多个实例
+SERVICE_HEALTH_INTERVAL = 5.0  # 服务实例健康检查间隔（秒）
+SERVICE_RESTART_BACKOFF_BASE = 1.0  # 服务实例重启失败后的初始退避时间（秒）
+SERVICE_RESTART_BACKOFF_MAX = 60.0  # 服务实例重启退避时间上限（秒）
+
+# 应用数据相关常量
+APP_DATA_DIR_NAME = "UnlockMusicGUI"  # 用户数据目录名
+MANIFEST_FILENAME = "manifest.db"  # 转换记录数据库文件名
+SCAN_CACHE_FILENAME = "scan_cache.db"  # 目录扫描缓存数据库文件名
+THROUGHPUT_FILENAME = "throughput.json"  # 处理速度模型文件名
+JOURNAL_FILENAME = "journal.jsonl"  # 批处理日志文件名
+JOURNAL_FILES_CHUNK_SIZE = 1000  # 批处理日志中每条文件列表记录的文件数
+JOURNAL_SYNC_RECORDS = 200  # 累积多少条结果记录后fsync一次
+JOURNAL_SYNC_INTERVAL = 1.0  # 距离上次fsync超过该时间（秒）时写入结果记录后立即fsync
+MANIFEST_HASH_BLOCK_SIZE = 64 * 1024  # 部分内容哈希读取的头部/尾部字节数
+MANIFEST_QUERY_CHUNK_SIZE = 500  # 每次查询的路径数（低于SQLite参数数量上限）
+MANIFEST_FLUSH_SIZE = 500  # 累积多少条转换记录后写入一次数据库
+DEDUPE_HASH_CHUNK_SIZE = 1024 * 1024  # 计算完整内容哈希时每次读取的字节数
+SNIFF_HEADER_SIZE = 256  # 预测输出格式时解密的音频头字节数（与Go批处理器识别格式时读取的长度一致）
 
 # 日志相关常量
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -138,11 +205,13 @@ ERROR_MESSAGES = {
     'unsupported_format': "不支持的文件格式: {}",
     'no_files_selected': "请先添加要转换的文件",
     'no_output_dir': "请先选择输出目录",
-    'processing_timeout': "处理超时（超过5分钟）",
+    'processing_timeout': "处理超时（超过{:.0f}秒）",
+    'processing_cancelled': "处理已取消",
     'processing_exception': "处理异常: {}",
     'um_exe_not_found': "um.exe not found at: {}",
     'conversion_failed': "转换失败: {}",
-    'already_processing': "正在处理文件，无法清除列表"
+    'already_processing': "正在处理文件，无法清除列表",
+    'scan_in_progress': "正在扫描文件夹，请等待扫描完成"
 }
 
 # 成功消息常量
@@ -151,5 +220,9 @@ SUCCESS_MESSAGES = {
     'files_added': "已添加 {} 个文件，总计 {} 个文件",
     'list_cleared': "文件列表已清除",
     'processing_started': "开始转换...",
-    'processing_stopped': "转换已停止"
+    'processing_stopped': "转换已停止",
+    'scan_started': "开始扫描文件夹...",
+    'scan_progress': "正在扫描... 已找到 {} 个文件（{:.0f} 个/秒）",
+    'scan_finished': "扫描完成：找到 {} 个文件，总计 {} 个文件",
+    'scan_cancelled': "扫描已取消：找到 {} 个文件，总计 {} 个文件"
 }
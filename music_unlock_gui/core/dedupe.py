@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复文件合并 - 内容完全相同的加密文件只解密一次，其余副本复用输出文件
+"""
+
+import hashlib
+import os
+import platform
+import shutil
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .constants import DEDUPE_HASH_CHUNK_SIZE
+from .manifest import partial_hash
+
+# Linux FICLONE ioctl，在btrfs/xfs等文件系统上创建写时复制的副本
+_FICLONE = 0x40049409
+
+
+def full_hash(file_path: str) -> str:
+    """
+    流式计算文件的完整内容哈希
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(DEDUPE_HASH_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _refine(groups: List[List[Tuple[str, int]]], key_func) -> List[List[Tuple[str, int]]]:
+    """
+    按新的键继续拆分候选分组，只保留仍有多个文件的分组
+
+    Args:
+        groups: 候选分组，元素为(文件路径, 文件大小)
+        key_func: 计算分组键的函数，参数为(文件路径, 文件大小)
+
+    Returns:
+        List[List[Tuple[str, int]]]: 拆分后的候选分组
+    """
+    refined = []
+    for group in groups:
+        buckets = defaultdict(list)
+        for file_path, size in group:
+            try:
+                buckets[key_func(file_path, size)].append((file_path, size))
+            except OSError:
+                continue
+        refined.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return refined
+
+
+def group_duplicates(file_list: List[str]) -> Tuple[List[str], Dict[str, List[str]]]:
+    """
+    找出内容完全相同的文件
+
+    依次按（文件大小、文件名）、部分内容哈希、完整内容哈希分组，只有前一步仍有重复的文件才进入下一步，
+    大部分文件只需要一次stat。文件名也作为分组条件，因为输出文件名由输入文件名决定。
+
+    Args:
+        file_list: 文件列表
+
+    Returns:
+        Tuple[List[str], Dict[str, List[str]]]: (需要解密的文件, 代表文件 -> 内容相同的其他副本)
+    """
+    buckets = defaultdict(list)
+    for file_path in file_list:
+        try:
+            size = os.stat(file_path).st_size
+        except OSError:
+            continue
+        if size > 0:
+            buckets[(size, os.path.normcase(os.path.basename(file_path)))].append((file_path, size))
+
+    groups = [bucket for bucket in buckets.values() if len(bucket) > 1]
+    groups = _refine(groups, partial_hash)
+    groups = _refine(groups, lambda file_path, size: full_hash(file_path))
+
+    duplicates = {}
+    copies = set()
+    for group in groups:
+        paths = list(dict.fromkeys(file_path for file_path, _ in group))
+        if len(paths) > 1:
+            duplicates[paths[0]] = paths[1:]
+            copies.update(paths[1:])
+
+    unique = [file_path for file_path in file_list if file_path not in copies]
+    return unique, duplicates
+
+
+def _reflink(source: str, target: str) -> bool:
+    """
+    尝试创建写时复制的副本（仅Linux）
+
+    Returns:
+        bool: 是否成功
+    """
+    if platform.system() != "Linux":
+        return False
+
+    import fcntl
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(target)
+        except OSError:
+            pass
+        return False
+
+
+def link_output(source: str, target: str) -> str:
+    """
+    把已转换的输出文件复用到另一个位置，依次尝试硬链接、写时复制、普通复制
+
+    Args:
+        source: 已存在的输出文件
+        target: 目标路径（已存在时覆盖）
+
+    Returns:
+        str: 使用的方式（same、hardlink、reflink、copy）
+
+    Raises:
+        OSError: 所有方式都失败
+    """
+    if os.path.normcase(os.path.abspath(source)) == os.path.normcase(os.path.abspath(target)):
+        return "same"
+
+    os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+    if os.path.lexists(target):
+        os.remove(target)
+
+    try:
+        os.link(source, target)
+        return "hardlink"
+    except OSError:
+        pass
+
+    if _reflink(source, target):
+        return "reflink"
+
+    shutil.copy2(source, target)
+    return "copy"
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扩展名匹配器 - 按文件名后缀匹配加密格式扩展名，支持.kgm.flac这类多段扩展名，不区分大小写
+"""
+
+from typing import Iterable
+
+
+class ExtensionMatcher:
+    """
+    多段扩展名匹配器
+
+    预先计算扩展名集合、最多包含的点数和最长长度。匹配时只取文件名末尾最长扩展名长度的部分转小写，
+    从后往前找最多max_dots个点，每个点对应的后缀做一次集合查找，不需要拆分路径或遍历扩展名列表。
+    """
+
+    def __init__(self, extensions: Iterable[str]):
+        """
+        初始化匹配器
+
+        Args:
+            extensions: 扩展名列表（可以带或不带开头的点，不区分大小写）
+        """
+        normalized = set()
+        for ext in extensions:
+            ext = ext.strip().lower()
+            if not ext:
+                continue
+            normalized.add(ext if ext.startswith('.') else '.' + ext)
+
+        self.extensions = frozenset(normalized)
+        self._max_dots = max((ext.count('.') for ext in normalized), default=0)
+        self._max_length = max((len(ext) for ext in normalized), default=0)
+
+    def match(self, file_name: str) -> str:
+        """
+        匹配文件名的扩展名（优先匹配最长的多段扩展名）
+
+        Args:
+            file_name: 文件名或文件路径
+
+        Returns:
+            str: 小写的扩展名，不支持时返回空字符串
+        """
+        # 扩展名不包含路径分隔符，含分隔符的后缀不会命中，直接传完整路径也不会匹配到目录名
+        tail = file_name[-self._max_length:].lower()
+        extensions = self.extensions
+        matched = ""
+        end = len(tail)
+        for _ in range(self._max_dots):
+            dot = tail.rfind('.', 0, end)
+            if dot < 0:
+                break
+            if tail[dot:] in extensions:
+                matched = tail[dot:]
+            end = dot
+        return matched
+
+    def matches(self, file_name: str) -> bool:
+        """
+        检查文件名是否为支持的格式
+
+        Args:
+            file_name: 文件名或文件路径
+
+        Returns:
+            bool: 是否支持
+        """
+        return bool(self.match(file_name))
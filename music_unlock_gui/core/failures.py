@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失败分类 - 根据um返回的错误信息判断失败原因，只有临时性的I/O错误值得自动重试
+"""
+
+# 失败类型
+FAILURE_TRANSIENT_IO = "transient_io"  # 网络盘/NAS读写中断等临时性I/O错误
+FAILURE_PERMISSION = "permission"  # 没有读取输入或写入输出的权限
+FAILURE_NOT_FOUND = "not_found"  # 输入文件不存在
+FAILURE_UNSUPPORTED = "unsupported"  # 不支持的文件格式
+FAILURE_DECODER = "decoder"  # 解码/解密失败（文件损坏或加密方式不支持）
+FAILURE_TIMEOUT = "timeout"  # 处理超时被终止
+FAILURE_UNKNOWN = "unknown"  # 无法识别的错误
+
+# 自动重试的失败类型：其余类型重试也不会成功
+RETRYABLE_FAILURES = frozenset({FAILURE_TRANSIENT_IO})
+
+# 失败类型的中文说明，用于单文件模式的错误信息
+FAILURE_DESCRIPTIONS = {
+    FAILURE_TRANSIENT_IO: "读写文件时发生I/O错误",
+    FAILURE_PERMISSION: "权限不足，无法处理文件",
+    FAILURE_NOT_FOUND: "文件未找到",
+    FAILURE_UNSUPPORTED: "不支持的文件格式",
+    FAILURE_DECODER: "未找到适合的解码器或解码失败",
+    FAILURE_TIMEOUT: "处理超时",
+    FAILURE_UNKNOWN: "未知错误",
+}
+
+# 按顺序匹配（小写）：临时性I/O错误在前，"network path was not found"之类不会被当成文件不存在
+_FAILURE_PATTERNS = (
+    (FAILURE_TRANSIENT_IO, (
+        "input/output error",
+        "i/o error",
+        "i/o timeout",
+        "resource temporarily unavailable",
+        "connection reset",
+        "connection timed out",
+        "broken pipe",
+        "stale file handle",
+        "stale nfs file handle",
+        "host is down",
+        "no route to host",
+        "interrupted system call",
+        "too many open files",
+        "network name",  # Windows: The specified network name is no longer available
+        "network path",  # Windows: The network path was not found
+        "semaphore timeout",  # Windows SMB: The semaphore timeout period has expired
+        "device is not ready",
+        "unexpected network error",
+    )),
+    (FAILURE_PERMISSION, (
+        "permission denied",
+        "access is denied",
+        "operation not permitted",
+        "read-only file system",
+        "权限不足",
+    )),
+    (FAILURE_NOT_FOUND, (
+        "no such file",
+        "cannot find the file",
+        "cannot find the path",
+        "file not found",
+        "不存在",
+        "文件未找到",
+    )),
+    (FAILURE_TIMEOUT, (
+        "超时",
+        "timed out",
+        "timeout",
+    )),
+    (FAILURE_UNSUPPORTED, (
+        "unsupported",
+        "不支持",
+    )),
+    (FAILURE_DECODER, (
+        "no suitable decoder",
+        "decoder",
+        "decrypt",
+        "解码器",
+        "解密",
+        "读取音频",
+        "unexpected eof",
+    )),
+)
+
+
+def classify_failure(error: str) -> str:
+    """
+    根据错误信息判断失败类型
+
+    Args:
+        error: um返回的错误信息（或stderr输出）
+
+    Returns:
+        str: 失败类型（FAILURE_*常量）
+    """
+    lower = (error or "").lower()
+    for kind, patterns in _FAILURE_PATTERNS:
+        if any(pattern in lower for pattern in patterns):
+            return kind
+    return FAILURE_UNKNOWN
+
+
+def is_retryable(kind: str) -> bool:
+    """
+    判断失败类型是否值得自动重试
+
+    Args:
+        kind: 失败类型
+
+    Returns:
+        bool: 是否重试
+    """
+    return kind in RETRYABLE_FAILURES
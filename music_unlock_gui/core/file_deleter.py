@@ -7,9 +7,14 @@
 import os
 import threading
 import queue
-from typing import List, Tuple, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Tuple, Callable, Optional
 import logging
 
+from .constants import DELETE_MAX_WORKERS, DELETE_BATCH_SIZE, DELETE_PROGRESS_INTERVAL
+from .ext_matcher import ExtensionMatcher
+from .scanner import DirectoryScanner
+
 
 class FileDeleter:
     """文件删除器类"""
@@ -20,6 +25,13 @@ class FileDeleter:
         self.is_scanning = False
         self.is_deleting = False
         self.cancel_requested = False
+        self._scanner: Optional[DirectoryScanner] = None
+        self.file_sizes: Dict[str, int] = {}  # 最近一次扫描找到的文件大小（扫描时从目录项读取）
+        # 删除统计，由删除线程在_delete_lock下更新
+        self._delete_lock = threading.Lock()
+        self._deleted_count = 0
+        self._processed_count = 0
+        self._failed_files = set()
     
     def _setup_logger(self) -> logging.Logger:
         """设置日志记录器"""
@@ -33,7 +45,9 @@ class FileDeleter:
         return logger
     
     def scan_files(self, folder_path: str, selected_extensions: List[str], 
-                   progress_callback: Optional[Callable] = None) -> Tuple[bool, List[str], str]:
+                   progress_callback: Optional[Callable] = None,
+                   files_callback: Optional[Callable[[List[str], List[Optional[int]]], None]] = None
+                   ) -> Tuple[bool, List[str], str]:
         """
         扫描指定文件夹中的文件
         
@@ -41,6 +55,7 @@ class FileDeleter:
             folder_path: 要扫描的文件夹路径
             selected_extensions: 选中的文件扩展名列表
             progress_callback: 进度回调函数
+            files_callback: 找到一批文件时的回调，参数为文件列表和对应的文件大小（扫描进行中就可以显示）
             
         Returns:
             Tuple[bool, List[str], str]: (是否成功, 文件列表, 错误信息)
@@ -56,39 +71,33 @@ class FileDeleter:
         
         self.is_scanning = True
         self.cancel_requested = False
+        self.file_sizes = {}
         found_files = []
         
         try:
-            # 将扩展名转换为小写集合以便快速查找
-            ext_set = {ext.lower() for ext in selected_extensions}
-            
-            total_dirs = sum(1 for _, dirs, _ in os.walk(folder_path))
-            processed_dirs = 0
+            # 预先构建扩展名匹配器（支持.kgm.flac这类多段扩展名）
+            matcher = ExtensionMatcher(selected_extensions)
             
             self.logger.info(f"开始扫描文件夹: {folder_path}")
             self.logger.info(f"目标格式: {selected_extensions}")
             
-            for root, dirs, files in os.walk(folder_path):
-                if self.cancel_requested:
-                    self.logger.info("扫描被取消")
-                    break
-                
+            # 一次并行扫描，找到的文件按批返回；进度按目录树分支估计，不再事先遍历统计目录数
+            scanner = DirectoryScanner(matcher.matches, collect_sizes=True)
+            self._scanner = scanner
+            if self.cancel_requested:
+                scanner.cancel()
+            for chunk in scanner.scan(folder_path):
+                found_files.extend(chunk)
+                if chunk and files_callback:
+                    files_callback(chunk, [scanner.sizes.get(file_path) for file_path in chunk])
+
                 # 更新进度
-                processed_dirs += 1
                 if progress_callback:
-                    progress = int((processed_dirs / total_dirs) * 100) if total_dirs > 0 else 100
-                    progress_callback(f"扫描中... ({processed_dirs}/{total_dirs})", progress)
-                
-                for file in files:
-                    if self.cancel_requested:
-                        break
-                    
-                    # 检查文件扩展名
-                    _, file_ext = os.path.splitext(file)
-                    if file_ext.lower() in ext_set:
-                        file_path = os.path.join(root, file)
-                        found_files.append(file_path)
-                        self.logger.debug(f"找到文件: {file_path}")
+                    progress_callback(f"扫描中... 已扫描 {scanner.dirs_scanned} 个目录", int(scanner.progress * 100))
+
+            self.file_sizes = scanner.sizes
+            if scanner.cancelled:
+                self.logger.info("扫描被取消")
             
             self.logger.info(f"扫描完成，找到 {len(found_files)} 个文件")
             return True, found_files, ""
@@ -98,12 +107,16 @@ class FileDeleter:
             self.logger.error(error_msg)
             return False, [], error_msg
         finally:
+            self._scanner = None
             self.is_scanning = False
     
     def delete_files(self, file_list: List[str], 
                      progress_callback: Optional[Callable] = None) -> Tuple[int, int, List[str]]:
         """
         删除文件列表中的文件
+
+        文件按所在目录分组，每组由线程池中的一个任务删除：支持dir_fd的系统上每组只打开一次目录，
+        按文件名相对目录删除，不必每个文件都重新解析完整路径。进度按DELETE_PROGRESS_INTERVAL合并回调。
         
         Args:
             file_list: 要删除的文件路径列表
@@ -118,53 +131,120 @@ class FileDeleter:
         self.is_deleting = True
         self.cancel_requested = False
         
-        deleted_count = 0
-        failed_count = 0
-        failed_files = []
         total_files = len(file_list)
+        self._deleted_count = 0
+        self._processed_count = 0
+        self._failed_files = set()
         
         try:
             self.logger.info(f"开始删除 {total_files} 个文件")
+
+            batches = self._group_by_directory(file_list)
+            workers = max(1, min(DELETE_MAX_WORKERS, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='delete') as executor:
+                pending = {executor.submit(self._delete_batch, directory, paths) for directory, paths in batches}
+                while pending:
+                    _, pending = wait(pending, timeout=DELETE_PROGRESS_INTERVAL)
+                    # 更新进度
+                    if progress_callback:
+                        processed = self._processed_count
+                        progress_callback(f"删除中... ({processed}/{total_files})", int(processed / total_files * 100))
+
+            if self.cancel_requested:
+                self.logger.info("删除操作被取消")
+
+            # 失败列表保持原来的顺序
+            failed_files = [file_path for file_path in file_list if file_path in self._failed_files]
+            deleted_count = self._deleted_count
+            self.logger.info(f"删除完成: 成功 {deleted_count}, 失败 {len(failed_files)}")
+            return deleted_count, len(failed_files), failed_files
             
-            for i, file_path in enumerate(file_list):
+        except Exception as e:
+            self.logger.error(f"删除操作出错: {str(e)}")
+            failed_files = [file_path for file_path in file_list if file_path in self._failed_files]
+            return self._deleted_count, len(failed_files), failed_files
+        finally:
+            self.is_deleting = False
+
+    @staticmethod
+    def _group_by_directory(file_list: List[str]) -> List[Tuple[str, List[str]]]:
+        """
+        按所在目录分组，文件很多的目录拆成多个批次
+
+        Args:
+            file_list: 文件路径列表
+
+        Returns:
+            List[Tuple[str, List[str]]]: (目录, 该目录下的文件路径列表)
+        """
+        groups: Dict[str, List[str]] = {}
+        for file_path in file_list:
+            groups.setdefault(os.path.dirname(file_path) or os.curdir, []).append(file_path)
+
+        batches = []
+        for directory, paths in groups.items():
+            for start in range(0, len(paths), DELETE_BATCH_SIZE):
+                batches.append((directory, paths[start:start + DELETE_BATCH_SIZE]))
+        return batches
+
+    def _delete_batch(self, directory: str, file_paths: List[str]):
+        """
+        删除同一目录下的一批文件（在线程池中运行）
+
+        Args:
+            directory: 目录路径
+            file_paths: 该目录下的文件路径列表
+        """
+        if self.cancel_requested:
+            return
+
+        dir_fd = None
+        if os.unlink in os.supports_dir_fd:
+            try:
+                dir_fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+            except OSError:
+                # 目录无法打开时逐个按完整路径删除，每个文件的错误分别记录
+                dir_fd = None
+
+        try:
+            for file_path in file_paths:
                 if self.cancel_requested:
-                    self.logger.info("删除操作被取消")
                     break
-                
-                # 更新进度
-                if progress_callback:
-                    progress = int(((i + 1) / total_files) * 100)
-                    progress_callback(f"删除中... ({i + 1}/{total_files})", progress)
-                
+
+                deleted = False
+                failed = False
                 try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        deleted_count += 1
-                        self.logger.debug(f"已删除: {file_path}")
+                    if dir_fd is not None:
+                        os.unlink(os.path.basename(file_path), dir_fd=dir_fd)
                     else:
-                        self.logger.warning(f"文件不存在，跳过: {file_path}")
-                        
+                        os.remove(file_path)
+                    deleted = True
+                    self.logger.debug(f"已删除: {file_path}")
+                except FileNotFoundError:
+                    self.logger.warning(f"文件不存在，跳过: {file_path}")
                 except OSError as e:
-                    failed_count += 1
-                    failed_files.append(file_path)
+                    failed = True
                     self.logger.error(f"删除失败: {file_path} - {e}")
                 except Exception as e:
-                    failed_count += 1
-                    failed_files.append(file_path)
+                    failed = True
                     self.logger.error(f"删除时发生未知错误: {file_path} - {e}")
-            
-            self.logger.info(f"删除完成: 成功 {deleted_count}, 失败 {failed_count}")
-            return deleted_count, failed_count, failed_files
-            
-        except Exception as e:
-            self.logger.error(f"删除操作出错: {str(e)}")
-            return deleted_count, failed_count, failed_files
+
+                with self._delete_lock:
+                    self._processed_count += 1
+                    if deleted:
+                        self._deleted_count += 1
+                    elif failed:
+                        self._failed_files.add(file_path)
         finally:
-            self.is_deleting = False
+            if dir_fd is not None:
+                os.close(dir_fd)
     
     def cancel_operation(self):
         """取消当前操作"""
         self.cancel_requested = True
+        scanner = self._scanner
+        if scanner is not None:
+            scanner.cancel()
         self.logger.info("请求取消操作")
     
     def is_busy(self) -> bool:
@@ -190,8 +270,13 @@ class ThreadedFileDeleter:
             def progress_callback(message, progress):
                 self.message_queue.put(('progress', message, progress))
             
-            success, files, error = self.deleter.scan_files(folder_path, selected_extensions, progress_callback)
-            self.message_queue.put(('scan_complete', success, files, error))
+            def files_callback(files, sizes):
+                self.message_queue.put(('scan_files', files, sizes))
+
+            success, files, error = self.deleter.scan_files(folder_path, selected_extensions, progress_callback,
+                                                            files_callback)
+            sizes = [self.deleter.file_sizes.get(file_path) for file_path in files]
+            self.message_queue.put(('scan_complete', success, files, error, sizes))
         
         self.current_thread = threading.Thread(target=scan_worker, daemon=True)
         self.current_thread.start()
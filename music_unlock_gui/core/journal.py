@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批处理日志 - 追加写入本次转换的文件列表和每个文件的结果，程序或系统中途崩溃后可以只继续处理未完成的文件
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+from .app_data import get_app_data_path
+from .constants import (
+    JOURNAL_FILENAME,
+    JOURNAL_FILES_CHUNK_SIZE,
+    JOURNAL_SYNC_RECORDS,
+    JOURNAL_SYNC_INTERVAL,
+    LOG_FORMAT
+)
+
+
+class BatchJournal:
+    """
+    只追加的批处理日志（每行一条JSON记录）
+
+    记录类型：
+    - run：一次转换开始，包含输出设置和文件总数
+    - files：本次转换的文件列表（按块写入）
+    - result：单个文件的处理结果（成功或失败都视为已完成）
+    - finished：本次转换正常结束
+
+    结果记录先写入缓冲区，累积一定条数或时间后才fsync，崩溃时最多丢失最近一批记录，
+    这些文件在继续转换时会被重新处理。
+    """
+
+    def __init__(self, journal_path: Optional[str] = None):
+        """
+        初始化批处理日志
+
+        Args:
+            journal_path: 日志文件路径，默认使用应用数据目录下的journal.jsonl
+        """
+        self.journal_path = journal_path or get_app_data_path(JOURNAL_FILENAME)
+        self.logger = self._setup_logger()
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = 0.0
+
+    def _setup_logger(self) -> logging.Logger:
+        """设置日志记录器"""
+        logger = logging.getLogger('BatchJournal')
+        logger.setLevel(logging.INFO)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(LOG_FORMAT)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        return logger
+
+    def begin(self, file_list: List[str], output_dir: Optional[str] = None,
+              use_source_dir: bool = False, naming_format: str = "auto"):
+        """
+        开始记录一次转换，覆盖上一次的日志
+
+        Args:
+            file_list: 本次转换的文件列表
+            output_dir: 输出目录
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+        """
+        with self._lock:
+            self._close_locked()
+            try:
+                self._file = open(self.journal_path, 'w', encoding='utf-8')
+                self._write_locked({
+                    "type": "run",
+                    "output_dir": output_dir,
+                    "use_source_dir": use_source_dir,
+                    "naming_format": naming_format,
+                    "total_files": len(file_list),
+                    "started_at": time.time()
+                })
+                for start in range(0, len(file_list), JOURNAL_FILES_CHUNK_SIZE):
+                    self._write_locked({"type": "files", "files": file_list[start:start + JOURNAL_FILES_CHUNK_SIZE]})
+                # 文件列表必须完整落盘，否则无法知道哪些文件还没处理
+                self._sync_locked()
+            except OSError as e:
+                self.logger.warning(f"创建批处理日志失败，本次转换中断后无法继续: {e}")
+                self._close_locked()
+
+    def record(self, result: dict):
+        """
+        记录单个文件的处理结果
+
+        Args:
+            result: 单个文件的处理结果
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._write_locked({
+                    "type": "result",
+                    "input_path": result.get("input_path", ""),
+                    "success": bool(result.get("success"))
+                })
+                if (self._unsynced >= JOURNAL_SYNC_RECORDS
+                        or time.monotonic() - self._last_sync >= JOURNAL_SYNC_INTERVAL):
+                    self._sync_locked()
+            except OSError as e:
+                self.logger.warning(f"写入批处理日志失败: {e}")
+                self._close_locked()
+
+    def finish(self):
+        """记录本次转换正常结束并关闭日志"""
+        with self._lock:
+            if self._file is None:
+                return
+            try:
+                self._write_locked({"type": "finished", "finished_at": time.time()})
+            except OSError as e:
+                self.logger.warning(f"写入批处理日志失败: {e}")
+            self._close_locked()
+
+    def close(self):
+        """关闭日志但不标记结束（转换被停止时保留未完成的文件，可以继续转换）"""
+        with self._lock:
+            self._close_locked()
+
+    def _write_locked(self, record: dict):
+        """写入一条记录（调用方需持有_lock）"""
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+
+    def _sync_locked(self):
+        """把缓冲区的记录写入磁盘（调用方需持有_lock）"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _close_locked(self):
+        """同步并关闭日志文件（调用方需持有_lock）"""
+        if self._file is None:
+            return
+        try:
+            self._sync_locked()
+        except OSError:
+            pass
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+
+    def load_unfinished(self) -> Optional[dict]:
+        """
+        读取上一次未正常结束的转换
+
+        崩溃时最后一行可能只写了一半，无法解析的行直接忽略。
+
+        Returns:
+            Optional[dict]: 包含files（没有结果的文件）、total_files、output_dir、use_source_dir、
+                naming_format；上一次转换已正常结束、日志不存在或没有未完成的文件时返回None
+        """
+        run = None
+        files = []
+        completed = set()
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    record_type = record.get("type")
+                    if record_type == "run":
+                        run = record
+                    elif record_type == "files":
+                        files.extend(record.get("files") or [])
+                    elif record_type == "result":
+                        completed.add(record.get("input_path"))
+                    elif record_type == "finished":
+                        return None
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            self.logger.warning(f"读取批处理日志失败: {e}")
+            return None
+
+        if run is None:
+            return None
+        remaining = [file_path for file_path in files if file_path not in completed]
+        if not remaining:
+            return None
+
+        return {
+            "files": remaining,
+            "total_files": run.get("total_files", len(files)),
+            "output_dir": run.get("output_dir"),
+            "use_source_dir": bool(run.get("use_source_dir")),
+            "naming_format": run.get("naming_format") or "auto"
+        }
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换记录 - 用SQLite记录已成功解密的文件，重复处理同一目录时跳过未变化的文件
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .app_data import get_app_data_path
+from .constants import (
+    MANIFEST_FILENAME,
+    MANIFEST_HASH_BLOCK_SIZE,
+    MANIFEST_QUERY_CHUNK_SIZE,
+    MANIFEST_FLUSH_SIZE,
+    LOG_FORMAT
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    input_path    TEXT PRIMARY KEY,
+    size          INTEGER NOT NULL,
+    mtime_ns      INTEGER NOT NULL,
+    content_hash  TEXT NOT NULL,
+    output_target TEXT NOT NULL,
+    output_path   TEXT,
+    naming_format TEXT NOT NULL,
+    decoder       TEXT,
+    converted_at  REAL NOT NULL
+)
+"""
+
+
+def partial_hash(file_path: str, size: int) -> str:
+    """
+    计算文件的部分内容哈希（头部和尾部各一块，加上文件大小）
+
+    Args:
+        file_path: 文件路径
+        size: 文件大小
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(size.to_bytes(8, 'little'))
+    with open(file_path, 'rb') as f:
+        digest.update(f.read(MANIFEST_HASH_BLOCK_SIZE))
+        if size > MANIFEST_HASH_BLOCK_SIZE * 2:
+            f.seek(-MANIFEST_HASH_BLOCK_SIZE, os.SEEK_END)
+            digest.update(f.read(MANIFEST_HASH_BLOCK_SIZE))
+        elif size > MANIFEST_HASH_BLOCK_SIZE:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _normalize_path(path: str) -> str:
+    """统一路径格式作为记录的键"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _output_target(output_dir: Optional[str], use_source_dir: bool) -> str:
+    """输出位置标识：源目录模式为空字符串，否则为规范化后的输出目录"""
+    if use_source_dir or not output_dir:
+        return ""
+    return _normalize_path(output_dir)
+
+
+class ConversionManifest:
+    """已转换文件记录"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        打开（或创建）转换记录数据库
+
+        Args:
+            db_path: 数据库路径，默认使用应用数据目录下的manifest.db
+        """
+        self.db_path = db_path or get_app_data_path(MANIFEST_FILENAME)
+        self.logger = self._setup_logger()
+        self._lock = threading.Lock()
+        # 结果回调可能来自不同线程，访问统一由_lock串行化
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def _setup_logger(self) -> logging.Logger:
+        """设置日志记录器"""
+        logger = logging.getLogger('ConversionManifest')
+        logger.setLevel(logging.INFO)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(LOG_FORMAT)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        return logger
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def partition(self, file_list: List[str], output_dir: Optional[str] = None,
+                  use_source_dir: bool = False, naming_format: str = "auto") -> Tuple[List[str], List[dict]]:
+        """
+        把文件列表分为需要转换的文件和可以跳过的文件
+
+        大小和修改时间都未变化时直接跳过；只有修改时间变化时再比较部分内容哈希。
+        输出位置、命名格式不同或输出文件已被删除的文件需要重新转换。
+
+        Args:
+            file_list: 文件列表
+            output_dir: 输出目录
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+
+        Returns:
+            Tuple[List[str], List[dict]]: (需要转换的文件, 跳过文件的处理结果)
+        """
+        target = _output_target(output_dir, use_source_dir)
+        pending = []
+        skipped = []
+        touched = []
+
+        for start in range(0, len(file_list), MANIFEST_QUERY_CHUNK_SIZE):
+            chunk = file_list[start:start + MANIFEST_QUERY_CHUNK_SIZE]
+            keys = [_normalize_path(file_path) for file_path in chunk]
+            records = self._load(keys)
+
+            for file_path, key in zip(chunk, keys):
+                record = records.get(key)
+                if record is None:
+                    pending.append(file_path)
+                    continue
+
+                size, mtime_ns, content_hash, record_target, output_path, record_format, decoder = record
+                if record_target != target or record_format != naming_format:
+                    pending.append(file_path)
+                    continue
+                if output_path and not os.path.exists(output_path):
+                    pending.append(file_path)
+                    continue
+
+                try:
+                    stat = os.stat(file_path)
+                    if stat.st_size != size:
+                        pending.append(file_path)
+                        continue
+                    if stat.st_mtime_ns != mtime_ns:
+                        # 修改时间变化（如复制、同步）但内容可能未变
+                        if partial_hash(file_path, stat.st_size) != content_hash:
+                            pending.append(file_path)
+                            continue
+                        touched.append((stat.st_mtime_ns, key))
+                except OSError:
+                    pending.append(file_path)
+                    continue
+
+                skipped.append({
+                    "input_path": file_path,
+                    "output_path": output_path or "",
+                    "success": True,
+                    "skipped": True,
+                    "message": "已转换且未变化，跳过",
+                    "decoder": decoder or "",
+                    "process_time_ms": 0
+                })
+
+        if touched:
+            with self._lock:
+                self._conn.executemany("UPDATE conversions SET mtime_ns = ? WHERE input_path = ?", touched)
+                self._conn.commit()
+
+        if skipped:
+            self.logger.info(f"跳过 {len(skipped)} 个已转换且未变化的文件，需要转换 {len(pending)} 个文件")
+        return pending, skipped
+
+    def _load(self, keys: List[str]) -> dict:
+        """
+        批量读取记录
+
+        Args:
+            keys: 规范化后的输入路径列表
+
+        Returns:
+            dict: 输入路径 -> 记录元组
+        """
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT input_path, size, mtime_ns, content_hash, output_target, output_path, naming_format, decoder "
+                f"FROM conversions WHERE input_path IN ({placeholders})", keys).fetchall()
+        return {row[0]: row[1:] for row in rows}
+
+    def recorder(self, output_dir: Optional[str] = None, use_source_dir: bool = False,
+                 naming_format: str = "auto") -> 'ManifestRecorder':
+        """
+        创建本次批处理的记录器
+
+        Args:
+            output_dir: 输出目录
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+
+        Returns:
+            ManifestRecorder: 记录器，处理结束后需调用close()
+        """
+        return ManifestRecorder(self, _output_target(output_dir, use_source_dir), naming_format)
+
+    def _write(self, rows: List[tuple]):
+        """写入一批转换记录"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO conversions (input_path, size, mtime_ns, content_hash, output_target, "
+                "output_path, naming_format, decoder, converted_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+    def forget(self, file_list: List[str]):
+        """
+        删除指定文件的转换记录（下次处理时重新转换）
+
+        Args:
+            file_list: 文件列表
+        """
+        with self._lock:
+            self._conn.executemany("DELETE FROM conversions WHERE input_path = ?",
+                                   [(_normalize_path(file_path),) for file_path in file_list])
+            self._conn.commit()
+
+    def clear(self):
+        """清空全部转换记录"""
+        with self._lock:
+            self._conn.execute("DELETE FROM conversions")
+            self._conn.commit()
+
+
+class ManifestRecorder:
+    """批处理过程中记录成功转换的文件，累积一定数量后批量写入"""
+
+    def __init__(self, manifest: ConversionManifest, output_target: str, naming_format: str):
+        """
+        初始化记录器
+
+        Args:
+            manifest: 转换记录
+            output_target: 输出位置标识
+            naming_format: 文件命名格式
+        """
+        self.manifest = manifest
+        self.output_target = output_target
+        self.naming_format = naming_format
+        self._rows = []
+        self._lock = threading.Lock()
+
+    def add(self, result: dict):
+        """
+        记录单个文件的处理结果（只记录成功转换的文件）
+
+        Args:
+            result: 文件处理结果
+        """
+        if not result.get('success') or result.get('skipped'):
+            return
+
+        file_path = result.get('input_path', '')
+        try:
+            stat = os.stat(file_path)
+            content_hash = partial_hash(file_path, stat.st_size)
+        except OSError:
+            return
+
+        row = (_normalize_path(file_path), stat.st_size, stat.st_mtime_ns, content_hash, self.output_target,
+               result.get('output_path') or None, self.naming_format, result.get('decoder') or None, time.time())
+        with self._lock:
+            self._rows.append(row)
+            if len(self._rows) < MANIFEST_FLUSH_SIZE:
+                return
+            rows, self._rows = self._rows, []
+        self.manifest._write(rows)
+
+    def close(self):
+        """写入剩余的记录"""
+        with self._lock:
+            rows, self._rows = self._rows, []
+        if rows:
+            self.manifest._write(rows)
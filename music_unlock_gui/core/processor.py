@@ -8,38 +8,88 @@ import os
 import subprocess
 import logging
 import platform
-from typing import Optional, Tuple, List, Dict, Any
+import heapq
+import math
+import sqlite3
+import threading
+from collections import deque
+import time
+from typing import Optional, Tuple, List, Dict, Any, Callable
+from concurrent.futures import ThreadPoolExecutor
 import tempfile
 import shutil
 
 from .constants import (
     DEFAULT_SUPPORTED_EXTENSIONS,
-    PROCESS_TIMEOUT_SECONDS,
+    BATCH_MAX_SHARDS,
+    BATCH_SHARD_MIN_BYTES,
+    BATCH_SHARD_TARGET_FILES,
+    BATCH_STDERR_TAIL_LINES,
+    BATCH_SCANDIR_MIN_FILES,
     UM_COMMAND_TIMEOUT,
+    WATCHDOG_INTERVAL,
+    PROCESS_TERMINATE_GRACE_SECONDS,
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY_SECONDS,
+    RETRY_MAX_DELAY_SECONDS,
+    SERVICE_EVENT_HEARTBEAT,
+    SERVICE_BREAKER_THRESHOLD,
+    SERVICE_BREAKER_COOLDOWN,
     LOG_FORMAT,
     ERROR_MESSAGES,
     SUCCESS_MESSAGES
 )
-from .service_client import ServiceClient
+from .service_supervisor import ServiceSupervisor, ServiceInstance
+from .manifest import ConversionManifest
+from .dedupe import group_duplicates, link_output
+from .sniff import predict_output_extension
+from .throughput import ThroughputModel, DeadlineTracker
+from .journal import BatchJournal
+from .ext_matcher import ExtensionMatcher
+from .failures import FAILURE_UNKNOWN, FAILURE_DESCRIPTIONS, classify_failure, is_retryable
+
+
+class ServiceBatchError(Exception):
+    """服务模式批处理失败，携带失败前已收到的文件结果"""
+
+    def __init__(self, message: str, results: List[dict]):
+        super().__init__(message)
+        self.results = results
 
 
 class FileProcessor:
     """文件处理器类"""
 
-    def __init__(self, um_exe_path: str, use_service_mode: bool = True):
+    def __init__(self, um_exe_path: str, use_service_mode: bool = True, use_manifest: bool = False,
+                 manifest_path: Optional[str] = None, use_dedupe: bool = True,
+                 throughput_path: Optional[str] = None):
         """
         初始化文件处理器
 
         Args:
             um_exe_path: um.exe的路径
             use_service_mode: 是否使用服务模式
+            use_manifest: 是否使用转换记录跳过已转换且未变化的文件
+            manifest_path: 转换记录数据库路径（默认位于应用数据目录）
+            use_dedupe: 是否合并内容相同的输入文件（只解密一次）
+            throughput_path: 处理速度模型文件路径（默认位于应用数据目录），用于计算超时时间
         """
         self.um_exe_path = um_exe_path
         self.use_service_mode = use_service_mode
-        self.service_client = None
-        self.service_available = False
+        self.use_dedupe = use_dedupe
+        self.service_supervisor: Optional[ServiceSupervisor] = None
+        self.manifest: Optional[ConversionManifest] = None
         self.logger = self._setup_logger()
 
+        # 服务模式熔断器状态
+        self._service_failures = 0
+        self._service_open_until = 0.0
+
+        # 正在运行的um子进程，停止处理时统一结束
+        self._cancel_event = threading.Event()
+        self._processes_lock = threading.Lock()
+        self._processes = set()
+
         # 验证um.exe是否存在
         if not os.path.exists(um_exe_path):
             raise FileNotFoundError(ERROR_MESSAGES['um_exe_not_found'].format(um_exe_path))
@@ -55,10 +105,21 @@ class FileProcessor:
 
         # 转换为集合以提高查找效率
         self.supported_extensions_set = {ext.lower() for ext in self.supported_extensions}
+        self.extension_matcher = ExtensionMatcher(self.supported_extensions_set)
 
         # 验证关键格式是否存在
         self._validate_critical_formats()
 
+        # 加载处理速度模型
+        self.throughput = ThroughputModel(throughput_path)
+
+        # 打开转换记录
+        if use_manifest:
+            try:
+                self.manifest = ConversionManifest(manifest_path)
+            except (sqlite3.Error, OSError) as e:
+                self.logger.warning(f"打开转换记录失败，将转换全部文件: {e}")
+
         # 初始化服务模式
         if self.use_service_mode:
             self._init_service_mode()
@@ -67,50 +128,42 @@ class FileProcessor:
         self._persistent_session = False
 
     def _init_service_mode(self):
-        """初始化服务模式"""
+        """
+        初始化服务模式
+
+        由服务监管器在后台线程中连接或启动服务实例，不阻塞调用方；
+        实例就绪前批处理使用传统模式，实例崩溃后由监管器自动重启。
+        """
         try:
-            self.service_client = ServiceClient()
-            # 尝试连接服务，如果失败则启动服务
-            if not self.service_client.connect(timeout=2.0):
-                self.logger.info("服务未运行，尝试启动服务")
-                if self._start_service():
-                    # 等待服务启动
-                    import time
-                    time.sleep(1)
-                    if self.service_client.connect(timeout=5.0):
-                        self.service_available = True
-                        self.logger.info("服务模式已启用")
-                    else:
-                        self.logger.warning("服务启动后仍无法连接，将使用传统模式")
-                        self.service_available = False
-                else:
-                    self.logger.warning("无法启动服务，将使用传统模式")
-                    self.service_available = False
-            else:
-                self.service_available = True
-                self.logger.info("服务模式已启用")
+            self.service_supervisor = ServiceSupervisor(self.um_exe_path)
+            self.service_supervisor.start()
         except Exception as e:
             self.logger.warning(f"初始化服务模式失败: {e}，将使用传统模式")
-            self.service_available = False
+            self.service_supervisor = None
 
-    def _start_service(self) -> bool:
-        """启动服务"""
-        try:
-            import subprocess
-            # 启动服务进程
-            cmd = [self.um_exe_path, "--service"]
-            subprocess.Popen(cmd,
-                           stdout=subprocess.DEVNULL,
-                           stderr=subprocess.DEVNULL,
-                           creationflags=subprocess.CREATE_NO_WINDOW if platform.system() == "Windows" else 0)
-            return True
-        except Exception as e:
-            self.logger.error(f"启动服务失败: {e}")
+    @property
+    def service_available(self) -> bool:
+        """是否至少有一个服务实例可用"""
+        return self.service_supervisor is not None and self.service_supervisor.is_available()
+
+    def wait_for_service(self, timeout: float = None) -> bool:
+        """
+        等待服务初始化结束
+
+        Args:
+            timeout: 最长等待时间（秒），None表示一直等待
+
+        Returns:
+            bool: 服务模式是否可用
+        """
+        if self.service_supervisor is None:
             return False
+        self.service_supervisor.ready.wait(timeout)
+        return self.is_service_available()
 
     def is_service_available(self) -> bool:
         """检查服务是否可用"""
-        return self.service_available and self.service_client is not None
+        return self.service_available
 
     def _setup_logger(self) -> logging.Logger:
         """设置日志记录器"""
@@ -138,6 +191,83 @@ class FileProcessor:
             kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW
         return kwargs
 
+    @property
+    def cancelled(self) -> bool:
+        """是否已请求停止处理"""
+        return self._cancel_event.is_set()
+
+    def reset_cancel(self):
+        """清除停止标志，开始新一轮处理前调用"""
+        self._cancel_event.clear()
+
+    def cancel(self):
+        """
+        停止正在进行的处理（可以在任意线程调用，不阻塞）
+
+        不再启动新的um进程；正在运行的um进程先请求退出（um不再开始新文件，
+        写完正在处理的文件后退出），超过PROCESS_TERMINATE_GRACE_SECONDS仍未退出的强制结束；
+        服务模式的会话在事件循环中发送stop_processing。
+        """
+        self._cancel_event.set()
+        with self._processes_lock:
+            processes = list(self._processes)
+        if not processes:
+            return
+
+        self.logger.info(f"正在停止 {len(processes)} 个um进程")
+        for process in processes:
+            try:
+                process.terminate()
+            except OSError:
+                pass
+        threading.Thread(target=self._kill_after_grace, args=(processes,), daemon=True).start()
+
+    def _kill_after_grace(self, processes: list):
+        """
+        等待进程退出，超过宽限时间仍未退出的强制结束
+
+        Args:
+            processes: 已请求退出的进程列表
+        """
+        deadline = time.monotonic() + PROCESS_TERMINATE_GRACE_SECONDS
+        for process in processes:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                self.logger.warning(f"um进程 {process.pid} 未在宽限时间内退出，强制结束")
+                process.kill()
+            except OSError:
+                pass
+
+    def _spawn_process(self, cmd: list, **kwargs) -> Optional[subprocess.Popen]:
+        """
+        启动um子进程并登记，停止处理时统一结束
+
+        Args:
+            cmd: 命令行参数
+            **kwargs: subprocess.Popen的其他参数
+
+        Returns:
+            Optional[subprocess.Popen]: 进程对象，已请求停止时不启动并返回None
+        """
+        # 持有锁启动，保证cancel()要么看到这个进程，要么本方法看到停止标志
+        with self._processes_lock:
+            if self._cancel_event.is_set():
+                return None
+            process = subprocess.Popen(cmd, **kwargs, **self._get_subprocess_kwargs())
+            self._processes.add(process)
+        return process
+
+    def _release_process(self, process: subprocess.Popen):
+        """
+        进程结束后取消登记
+
+        Args:
+            process: 进程对象
+        """
+        with self._processes_lock:
+            self._processes.discard(process)
+
     def is_supported_file(self, file_path: str) -> bool:
         """
         检查文件是否为支持的音乐格式
@@ -152,27 +282,8 @@ class FileProcessor:
             self.logger.warning("文件路径为空")
             return False
 
-        file_ext = os.path.splitext(file_path)[1].lower()
-
-        if not file_ext:
-            self.logger.warning(f"文件无扩展名: {file_path}")
-            return False
-
-        # 使用动态获取的支持格式列表
-        is_supported = file_ext in self.supported_extensions_set
-
-        # 调试日志：记录格式检查结果
-        if not is_supported:
-            self.logger.debug(f"不支持的格式: {file_ext}, 文件: {os.path.basename(file_path)}")
-            self.logger.debug(f"当前支持的格式数量: {len(self.supported_extensions_set)}")
-            # 检查是否是相似的格式
-            similar_formats = [ext for ext in self.supported_extensions_set if file_ext in ext or ext in file_ext]
-            if similar_formats:
-                self.logger.debug(f"相似的支持格式: {similar_formats}")
-        else:
-            self.logger.debug(f"支持的格式: {file_ext}, 文件: {os.path.basename(file_path)}")
-
-        return is_supported
+        # 扫描大目录时每个文件都会调用，这里只做一次后缀匹配，不输出逐个文件的日志
+        return self.extension_matcher.matches(file_path)
     
     def process_file(self, input_file: str, output_dir: str = None,
                     progress_callback=None, use_source_dir: bool = False,
@@ -228,18 +339,36 @@ class FileProcessor:
             if progress_callback:
                 progress_callback(10)  # 开始处理
 
-            # 执行um.exe
+            # 执行um.exe（超时时间按文件大小和历史处理速度计算）
+            file_ext = self._file_extension(input_file)
+            file_size = os.path.getsize(input_file)
+            timeout = self.throughput.file_deadline(file_ext, file_size)
+            start_time = time.monotonic()
 
-            result = subprocess.run(
+            process = self._spawn_process(
                 cmd,
-                capture_output=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
                 encoding='utf-8',
                 errors='ignore',
-                timeout=PROCESS_TIMEOUT_SECONDS,
-                cwd=um_exe_dir,  # 添加工作目录设置
-                **self._get_subprocess_kwargs()
+                cwd=um_exe_dir  # 添加工作目录设置
             )
+            if process is None:
+                return False, ERROR_MESSAGES['processing_cancelled']
+            try:
+                stdout, stderr = process.communicate(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.communicate()
+                raise
+            finally:
+                self._release_process(process)
+
+            # 被停止处理结束的进程不按转换失败报告
+            if process.returncode != 0 and self.cancelled:
+                return False, ERROR_MESSAGES['processing_cancelled']
+            result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
             
             # 调用进度回调
             if progress_callback:
@@ -247,6 +376,7 @@ class FileProcessor:
             
             # 检查执行结果
             if result.returncode == 0:
+                self.throughput.record(file_ext, file_size, time.monotonic() - start_time)
                 success_msg = SUCCESS_MESSAGES['conversion_success'].format(os.path.basename(input_file))
                 self.logger.info(success_msg)
 
@@ -262,21 +392,19 @@ class FileProcessor:
                 self.logger.error(f"执行命令: {' '.join(cmd)}")
                 self.logger.error(f"工作目录: {um_exe_dir}")
 
-                # 检查常见问题
-                if "no suitable decoder" in (result.stderr or result.stdout or "").lower():
-                    error_msg = f"未找到适合的解码器处理文件: {os.path.basename(input_file)}"
-                elif "permission denied" in (result.stderr or result.stdout or "").lower():
-                    error_msg = f"权限不足，无法处理文件: {os.path.basename(input_file)}"
-                elif "file not found" in (result.stderr or result.stdout or "").lower():
-                    error_msg = f"文件未找到: {os.path.basename(input_file)}"
+                # 按失败类型给出错误信息，无法识别时显示um的原始输出
+                output = result.stderr or result.stdout or ""
+                failure_kind = classify_failure(output)
+                if failure_kind == FAILURE_UNKNOWN:
+                    error_msg = ERROR_MESSAGES['conversion_failed'].format(output or '未知错误')
                 else:
-                    error_msg = ERROR_MESSAGES['conversion_failed'].format(result.stderr or result.stdout or '未知错误')
+                    error_msg = f"{FAILURE_DESCRIPTIONS[failure_kind]}: {os.path.basename(input_file)}"
 
                 self.logger.error(f"处理文件失败: {input_file}, 错误: {error_msg}")
                 return False, error_msg
 
         except subprocess.TimeoutExpired:
-            error_msg = ERROR_MESSAGES['processing_timeout']
+            error_msg = ERROR_MESSAGES['processing_timeout'].format(timeout)
             self.logger.error(f"处理文件超时: {input_file}")
             return False, error_msg
 
@@ -287,7 +415,10 @@ class FileProcessor:
     
     def get_output_filename(self, input_file: str) -> str:
         """
-        根据输入文件名推测输出文件名
+        预测输入文件解密后的输出文件名
+
+        读取并解密文件开头少量数据识别音频格式（与um相同的识别逻辑），
+        无法廉价解密的格式根据扩展名推测。不考虑命名格式对文件名的调整。
 
         Args:
             input_file: 输入文件路径
@@ -295,33 +426,29 @@ class FileProcessor:
         Returns:
             str: 预期的输出文件名（不含路径）
         """
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-
-        # 根据输入格式推测输出格式
-        input_ext = os.path.splitext(input_file)[1].lower()
-
-        if input_ext in ['.ncm']:
-            # 网易云音乐通常输出为mp3或flac
-            return f"{base_name}.mp3"  # 默认假设为mp3
-        elif input_ext in ['.qmcflac']:
-            return f"{base_name}.flac"
-        elif input_ext in ['.qmcogg']:
-            return f"{base_name}.ogg"
-        elif input_ext in ['.qmc', '.qmc0']:
-            return f"{base_name}.mp3"  # 默认假设为mp3
-        elif input_ext.startswith('.mflac'):
-            # mflac及其变体（mflac0, mflac1, mflaca等）输出为flac
-            return f"{base_name}.flac"
-        elif input_ext.startswith('.mgg'):
-            # mgg及其变体（mgg0, mgg1, mgga等）输出为ogg
-            return f"{base_name}.ogg"
-        elif input_ext in ['.kgm', '.kgma']:
-            return f"{base_name}.mp3"  # 默认假设为mp3
-        elif input_ext in ['.kwm']:
-            return f"{base_name}.mp3"  # 默认假设为mp3
+        file_name = os.path.basename(input_file)
+        encrypted_ext = self.extension_matcher.match(file_name)
+        if encrypted_ext:
+            base_name = file_name[:-len(encrypted_ext)]
         else:
-            return f"{base_name}.mp3"  # 默认输出格式
-    
+            base_name, encrypted_ext = os.path.splitext(file_name)
+            encrypted_ext = encrypted_ext.lower()
+
+        return base_name + predict_output_extension(input_file, encrypted_ext)
+
+    def _file_extension(self, file_path: str) -> str:
+        """
+        获取文件的加密格式扩展名，用于按格式统计处理速度
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            str: 小写的扩展名
+        """
+        file_name = os.path.basename(file_path)
+        return self.extension_matcher.match(file_name) or os.path.splitext(file_name)[1].lower()
+
     def validate_um_exe(self) -> Tuple[bool, str]:
         """
         验证um.exe是否可用
@@ -457,12 +584,12 @@ class FileProcessor:
         Returns:
             dict: 调试信息
         """
-        file_ext = os.path.splitext(file_path)[1].lower()
+        file_ext = self._file_extension(file_path)
 
         debug_info = {
             'file_path': file_path,
             'file_ext': file_ext,
-            'is_supported': file_ext in self.supported_extensions_set,
+            'is_supported': self.is_supported_file(file_path),
             'total_supported_formats': len(self.supported_extensions_set),
             'supported_formats': sorted(list(self.supported_extensions_set)),
             'similar_formats': [ext for ext in self.supported_extensions_set
@@ -492,46 +619,587 @@ class FileProcessor:
             return output_dir
 
     def process_files_batch(self, file_list: list, output_dir: str = None,
-                           use_source_dir: bool = False, naming_format: str = "auto") -> dict:
+                           use_source_dir: bool = False, naming_format: str = "auto",
+                           result_callback: Optional[Callable[[dict], None]] = None,
+                           journal: Optional[BatchJournal] = None) -> dict:
         """
         批量处理多个音乐文件
 
+        服务可用时优先使用常驻服务（免去进程启动和缓存预热开销），
+        服务出错时回退到批处理子进程，连续失败后熔断一段时间。
+
         Args:
             file_list: 要处理的文件列表
             output_dir: 输出目录路径（可选）
             use_source_dir: 是否使用源文件目录作为输出目录
             naming_format: 文件命名格式 (auto, title-artist, artist-title, original)
+            result_callback: 单个文件处理完成时的回调，参数为该文件的处理结果
+            journal: 批处理日志，每个文件完成时记录其结果，用于中断后继续转换
+
+        Returns:
+            dict: 批处理结果（提供result_callback时不保留results列表）
+        """
+        # 调用方未提供回调时由这里收集结果，保持返回值中的results完整
+        collected = None
+        if result_callback is None:
+            collected = []
+            result_callback = collected.append
+
+        if journal is not None:
+            forward = result_callback
+
+            def journal_and_forward(result: dict):
+                journal.record(result)
+                forward(result)
+
+            result_callback = journal_and_forward
+
+        response = self._process_files_with_retry(file_list, output_dir, use_source_dir, naming_format,
+                                                  result_callback)
+        self.throughput.save()
+        response["results"] = collected if collected is not None else []
+        return response
+
+    def _process_files_with_retry(self, file_list: list, output_dir: str, use_source_dir: bool,
+                                  naming_format: str, result_callback: Callable[[dict], None]) -> dict:
+        """
+        处理文件列表，因临时性I/O错误失败的文件在整批结束后单独重试
+
+        每个失败结果标注failure_kind。可重试的失败结果先不回调，整批结束后等待一段时间
+        （指数退避，有上限）只重试这些文件，最后一次重试仍失败才回调失败结果。
+        停止处理时不再重试，这些文件没有结果，也不计入失败数（记为cancelled_count），可以通过继续转换重新处理。
+
+        Args:
+            file_list: 要处理的文件列表
+            output_dir: 输出目录路径
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+            result_callback: 单个文件处理完成时的回调
+
+        Returns:
+            dict: 批处理结果，重试过的文件按最后一次的结果统计
+        """
+        held = []
+        hold_retryable = True
+        lock = threading.Lock()
+
+        def classify_and_forward(result: dict):
+            if not result.get('success'):
+                failure_kind = classify_failure(result.get('error', ''))
+                result['failure_kind'] = failure_kind
+                if hold_retryable and is_retryable(failure_kind):
+                    with lock:
+                        held.append(result)
+                    return
+            result_callback(result)
+
+        response = self._process_files_incremental(file_list, output_dir, use_source_dir, naming_format,
+                                                   classify_and_forward)
+
+        for attempt in range(1, RETRY_MAX_ATTEMPTS + 1):
+            if not held:
+                break
+            delay = min(RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1), RETRY_MAX_DELAY_SECONDS)
+            self.logger.info(f"{len(held)} 个文件因临时性I/O错误失败，{delay:.0f}秒后第 {attempt} 次重试")
+            if self._cancel_event.wait(delay):
+                # 等待重试时停止处理：这些文件的失败结果没有回调，不计入统计，继续转换时重新处理
+                with lock:
+                    cancelled = len(held)
+                    held.clear()
+                self.logger.info(f"处理已停止，{cancelled} 个等待重试的文件未处理")
+                response["failed_count"] = response.get("failed_count", 0) - cancelled
+                response["total_files"] = response.get("total_files", 0) - cancelled
+                response["cancelled_count"] = cancelled
+                response["success"] = False
+                response["error"] = ERROR_MESSAGES['processing_cancelled']
+                break
+
+            with lock:
+                retry_files = [result.get('input_path') for result in held]
+                held.clear()
+            hold_retryable = attempt < RETRY_MAX_ATTEMPTS
+            retry_response = self._process_files_incremental(retry_files, output_dir, use_source_dir,
+                                                             naming_format, classify_and_forward)
+
+            # 重试的文件在之前的统计中算作失败，改为按本次结果统计
+            response["success_count"] = response.get("success_count", 0) + retry_response.get("success_count", 0)
+            response["failed_count"] = (response.get("failed_count", 0) - len(retry_files)
+                                        + retry_response.get("failed_count", 0))
+            response["total_time_ms"] = response.get("total_time_ms", 0) + retry_response.get("total_time_ms", 0)
+            response["retried_count"] = response.get("retried_count", 0) + len(retry_files)
+
+        return response
+
+    def _process_files_incremental(self, file_list: list, output_dir: str, use_source_dir: bool,
+                                   naming_format: str, result_callback: Callable[[dict], None]) -> dict:
+        """
+        根据转换记录跳过已转换且未变化的文件，只处理新增或变化的文件
+
+        Args:
+            file_list: 要处理的文件列表
+            output_dir: 输出目录路径
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+            result_callback: 单个文件处理完成时的回调
 
         Returns:
             dict: 批处理结果
         """
-        # 直接使用批处理模式
-        return self._process_files_batch_subprocess(file_list, output_dir, use_source_dir, naming_format)
+        if self.manifest is None:
+            return self._process_files_deduplicated(file_list, output_dir, use_source_dir, naming_format,
+                                                    result_callback)
+
+        try:
+            pending, skipped = self.manifest.partition(file_list, output_dir, use_source_dir, naming_format)
+        except sqlite3.Error as e:
+            self.logger.warning(f"读取转换记录失败，将转换全部文件: {e}")
+            return self._process_files_deduplicated(file_list, output_dir, use_source_dir, naming_format,
+                                                    result_callback)
+
+        for result in skipped:
+            result_callback(result)
+
+        skipped_response = self._summarize_results(skipped, 0)
+        skipped_response["skipped_count"] = len(skipped)
+        if not pending:
+            return skipped_response
+
+        recorder = self.manifest.recorder(output_dir, use_source_dir, naming_format)
+
+        def record_and_forward(result: dict):
+            try:
+                recorder.add(result)
+            except sqlite3.Error as e:
+                self.logger.warning(f"写入转换记录失败: {e}")
+            result_callback(result)
+
+        try:
+            response = self._process_files_deduplicated(pending, output_dir, use_source_dir, naming_format,
+                                                        record_and_forward)
+        finally:
+            try:
+                recorder.close()
+            except sqlite3.Error as e:
+                self.logger.warning(f"写入转换记录失败: {e}")
+
+        merged = self._merge_batch_responses([skipped_response, response])
+        merged["skipped_count"] = len(skipped)
+        return merged
+
+    def _process_files_deduplicated(self, file_list: list, output_dir: str, use_source_dir: bool,
+                                    naming_format: str, result_callback: Callable[[dict], None]) -> dict:
+        """
+        内容相同的文件只解密一次，其余副本通过硬链接/写时复制/复制复用输出文件
+
+        代表文件转换失败或输出无法复用时，对应副本再单独处理一次。
+
+        Args:
+            file_list: 要处理的文件列表
+            output_dir: 输出目录路径
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+            result_callback: 单个文件处理完成时的回调
+
+        Returns:
+            dict: 批处理结果
+        """
+        if not self.use_dedupe:
+            return self._dispatch_files_batch(file_list, output_dir, use_source_dir, naming_format,
+                                              result_callback)
+
+        unique, duplicates = group_duplicates(file_list)
+        if not duplicates:
+            return self._dispatch_files_batch(file_list, output_dir, use_source_dir, naming_format,
+                                              result_callback)
+
+        copy_count = len(file_list) - len(unique)
+        self.logger.info(f"发现 {copy_count} 个重复文件，只需解密 {len(unique)} 个文件")
+
+        linked = []
+        retry = []
+        lock = threading.Lock()
+
+        def forward_and_link(result: dict):
+            result_callback(result)
+            copies = duplicates.get(result.get('input_path'))
+            if not copies:
+                return
+
+            source = result.get('output_path') or ''
+            if not result.get('success') or not os.path.isfile(source):
+                with lock:
+                    retry.extend(copies)
+                return
+
+            for copy_path in copies:
+                target_dir = output_dir if output_dir and not use_source_dir else os.path.dirname(copy_path)
+                target = os.path.join(target_dir, os.path.basename(source))
+                try:
+                    method = link_output(source, target)
+                except OSError as e:
+                    self.logger.warning(f"复用输出文件失败: {copy_path}, {e}")
+                    with lock:
+                        retry.append(copy_path)
+                    continue
+
+                copy_result = dict(result, input_path=copy_path, output_path=target, process_time_ms=0,
+                                   deduplicated_from=result.get('input_path'),
+                                   message=f"与 {os.path.basename(result.get('input_path'))} 内容相同，已复用输出（{method}）")
+                with lock:
+                    linked.append(copy_result)
+                result_callback(copy_result)
+
+        response = self._dispatch_files_batch(unique, output_dir, use_source_dir, naming_format,
+                                              forward_and_link)
+        responses = [response, self._summarize_results(linked, 0)]
+
+        if retry:
+            self.logger.info(f"{len(retry)} 个重复文件无法复用输出，单独处理")
+            responses.append(self._dispatch_files_batch(retry, output_dir, use_source_dir, naming_format,
+                                                        result_callback))
+
+        merged = self._merge_batch_responses(responses)
+        merged["deduplicated_count"] = len(linked)
+        return merged
+
+    def _dispatch_files_batch(self, file_list: list, output_dir: str = None,
+                              use_source_dir: bool = False, naming_format: str = "auto",
+                              result_callback: Optional[Callable[[dict], None]] = None) -> dict:
+        """
+        选择服务模式或批处理子进程处理文件列表
+
+        Args:
+            file_list: 要处理的文件列表
+            output_dir: 输出目录路径（可选）
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+            result_callback: 单个文件处理完成时的回调
+
+        Returns:
+            dict: 批处理结果
+        """
+        # 一次性获取文件大小，用于任务优先级和分片/会话均衡
+        file_sizes = self._stat_file_sizes(file_list)
+
+        if self._service_breaker_allows() and self.is_service_available():
+            try:
+                response = self._process_files_batch_service(file_list, output_dir, use_source_dir,
+                                                             naming_format, result_callback, file_sizes)
+                self._record_service_success()
+                return response
+            except ServiceBatchError as e:
+                if self.cancelled:
+                    # 停止处理过程中的通信错误不计入熔断，也不回退到传统模式
+                    partial = self._summarize_results(e.results, 0)
+                    partial["success"] = False
+                    partial["error"] = ERROR_MESSAGES['processing_cancelled']
+                    return partial
+
+                self._record_service_failure(str(e))
+
+                # 已经收到结果的文件不再重复处理
+                finished = {result.get('input_path') for result in e.results}
+                remaining = [file_path for file_path in file_list if file_path not in finished]
+                self.logger.warning(f"服务模式处理失败: {e}，剩余 {len(remaining)} 个文件回退到传统模式")
+
+                partial = self._summarize_results(e.results, 0)
+                if not remaining:
+                    return partial
+                fallback = self._process_files_batch_subprocess(remaining, output_dir, use_source_dir,
+                                                                naming_format, result_callback, file_sizes)
+                return self._merge_batch_responses([partial, fallback])
+
+        return self._process_files_batch_subprocess(file_list, output_dir, use_source_dir, naming_format,
+                                                    result_callback, file_sizes)
+
+    def _stat_file_sizes(self, file_list: list) -> Dict[str, int]:
+        """
+        批量获取文件大小
+
+        同一目录下的文件较多时用os.scandir遍历一次目录（Windows上目录项自带大小，无需逐个stat），
+        否则逐个stat。无法访问的文件不在结果中。
+
+        Args:
+            file_list: 文件列表
+
+        Returns:
+            Dict[str, int]: 文件路径 -> 文件大小
+        """
+        by_dir: Dict[str, Dict[str, str]] = {}
+        for file_path in file_list:
+            directory, name = os.path.split(file_path)
+            by_dir.setdefault(directory, {})[name] = file_path
+
+        sizes = {}
+        for directory, names in by_dir.items():
+            if len(names) >= BATCH_SCANDIR_MIN_FILES:
+                try:
+                    with os.scandir(directory or '.') as entries:
+                        for entry in entries:
+                            file_path = names.get(entry.name)
+                            if file_path is None:
+                                continue
+                            try:
+                                sizes[file_path] = entry.stat().st_size
+                            except OSError:
+                                pass
+                    continue
+                except OSError:
+                    pass
+
+            for file_path in names.values():
+                try:
+                    sizes[file_path] = os.stat(file_path).st_size
+                except OSError:
+                    pass
+        return sizes
+
+    def _build_file_tasks(self, file_list: list, output_dir: Optional[str], use_source_dir: bool,
+                          file_sizes: Dict[str, int]) -> List[dict]:
+        """
+        生成FileTask列表：按文件大小从大到小设置优先级
+
+        um按优先级数值从小到大处理，最大的文件最先开始，避免大文件落在最后拉长总耗时。
+
+        Args:
+            file_list: 文件列表
+            output_dir: 输出目录
+            use_source_dir: 是否使用源文件目录作为输出目录
+            file_sizes: 文件路径 -> 文件大小
+
+        Returns:
+            List[dict]: FileTask字典列表（已按优先级排序）
+        """
+        ordered = sorted(file_list, key=lambda file_path: file_sizes.get(file_path, 0), reverse=True)
+        tasks = []
+        for priority, file_path in enumerate(ordered, start=1):
+            task = {"input_path": file_path, "priority": priority}
+            if not use_source_dir and output_dir:
+                task["output_path"] = output_dir
+            size = file_sizes.get(file_path)
+            if size:
+                task["file_size"] = size
+            tasks.append(task)
+        return tasks
+
+    def _batch_timeout(self, file_list: list, file_sizes: Dict[str, int]) -> float:
+        """
+        按文件大小和历史处理速度计算整批文件的超时时间
+
+        Args:
+            file_list: 文件列表
+            file_sizes: 文件路径 -> 文件大小
+
+        Returns:
+            float: 超时时间（秒）
+        """
+        # um的解密worker数不少于CPU核心数的一半，按该并发度估计（偏保守）
+        parallelism = max(1, (os.cpu_count() or 1) // 2)
+        files = ((self._file_extension(file_path), file_sizes.get(file_path, 0)) for file_path in file_list)
+        return self.throughput.batch_deadline(files, parallelism)
+
+    def _straggler_result(self, file_path: str, limit: float) -> dict:
+        """
+        生成超过截止时间被终止的文件的处理结果
+
+        Args:
+            file_path: 文件路径
+            limit: 允许的处理时间（秒）
+
+        Returns:
+            dict: 失败的处理结果
+        """
+        self.logger.warning(f"文件处理超时（超过{limit:.0f}秒），已终止: {file_path}")
+        return {
+            "input_path": file_path,
+            "success": False,
+            "error": f"处理超时（超过{limit:.0f}秒），已终止",
+            "process_time_ms": int(limit * 1000)
+        }
+
+    def _service_breaker_allows(self) -> bool:
+        """
+        熔断器：连续失败达到阈值后在冷却时间内不再尝试服务模式
+
+        Returns:
+            bool: 是否允许使用服务模式
+        """
+        if self._service_failures < SERVICE_BREAKER_THRESHOLD:
+            return True
+        if time.monotonic() >= self._service_open_until:
+            # 冷却结束，放行一次试探请求
+            self.logger.info("服务熔断冷却结束，尝试恢复服务模式")
+            return True
+        return False
+
+    def _record_service_success(self):
+        """记录一次服务模式成功，重置熔断器"""
+        if self._service_failures:
+            self.logger.info("服务模式已恢复")
+        self._service_failures = 0
+
+    def _record_service_failure(self, reason: str):
+        """
+        记录一次服务模式失败
+
+        Args:
+            reason: 失败原因
+        """
+        self._service_failures += 1
+        if self._service_failures >= SERVICE_BREAKER_THRESHOLD:
+            self._service_open_until = time.monotonic() + SERVICE_BREAKER_COOLDOWN
+            self.logger.warning(f"服务模式连续失败 {self._service_failures} 次（{reason}），"
+                                f"{SERVICE_BREAKER_COOLDOWN:.0f}秒内使用传统模式")
+
+    def _summarize_results(self, results: List[dict], total_time_ms: int) -> dict:
+        """
+        根据单个文件结果生成批处理响应
+
+        Args:
+            results: 文件处理结果列表
+            total_time_ms: 总耗时（毫秒）
+
+        Returns:
+            dict: 与BatchResponse结构一致的批处理响应
+        """
+        success_count = sum(1 for result in results if result.get('success'))
+        return {
+            "success": True,
+            "success_count": success_count,
+            "failed_count": len(results) - success_count,
+            "total_files": len(results),
+            "results": results,
+            "total_time_ms": total_time_ms
+        }
+
+    def _merge_batch_responses(self, responses: List[dict], parallel: bool = False) -> dict:
+        """
+        合并多个批处理响应
+
+        Args:
+            responses: 批处理响应列表
+            parallel: 各响应是否并行执行（总耗时取最大值而非求和）
+
+        Returns:
+            dict: 合并后的批处理响应
+        """
+        merged = {
+            "success": True,
+            "success_count": 0,
+            "failed_count": 0,
+            "total_files": 0,
+            "results": [],
+            "total_time_ms": 0
+        }
+        errors = []
+        for response in responses:
+            if not response.get("success", True) and response.get("error"):
+                errors.append(response["error"])
+            merged["success_count"] += response.get("success_count", 0)
+            merged["failed_count"] += response.get("failed_count", 0)
+            merged["total_files"] += response.get("total_files", 0)
+            merged["results"].extend(response.get("results") or [])
+            if parallel:
+                merged["total_time_ms"] = max(merged["total_time_ms"], response.get("total_time_ms", 0))
+            else:
+                merged["total_time_ms"] += response.get("total_time_ms", 0)
+
+        if errors:
+            merged["error"] = "; ".join(errors)
+            merged["success"] = merged["success_count"] > 0
+        return merged
 
     def _process_files_batch_service(self, file_list: list, output_dir: str = None,
-                                   use_source_dir: bool = False, naming_format: str = "auto") -> dict:
+                                   use_source_dir: bool = False, naming_format: str = "auto",
+                                   result_callback: Optional[Callable[[dict], None]] = None,
+                                   file_sizes: Optional[Dict[str, int]] = None) -> dict:
         """
         使用服务模式批量处理文件
+
+        文件按大小均衡分配给各服务实例，每个实例一个会话并行处理；
+        result_callback可能在多个线程中被调用。
+
+        Raises:
+            ServiceBatchError: 有实例处理失败，异常中携带所有已收到的结果
+        """
+        if file_sizes is None:
+            file_sizes = self._stat_file_sizes(file_list)
+        assignments = self.service_supervisor.assign(file_list, file_sizes)
+        if not assignments:
+            raise ServiceBatchError("没有可用的服务实例", [])
+
+        def run(instance: ServiceInstance, files: list) -> dict:
+            try:
+                return self._process_service_session(instance, files, output_dir, use_source_dir,
+                                                     naming_format, result_callback, file_sizes)
+            except ServiceBatchError as e:
+                self.service_supervisor.mark_failed(instance, str(e))
+                raise
+            finally:
+                self.service_supervisor.release(instance, len(files))
+
+        if len(assignments) == 1:
+            return run(*assignments[0])
+
+        self.logger.info(f"服务模式分配 {len(file_list)} 个文件到 {len(assignments)} 个实例: "
+                         f"{[len(files) for _, files in assignments]}")
+        responses = []
+        errors = []
+        results = []
+        with ThreadPoolExecutor(max_workers=len(assignments)) as executor:
+            futures = [executor.submit(run, instance, files) for instance, files in assignments]
+            for future in futures:
+                try:
+                    response = future.result()
+                    responses.append(response)
+                    results.extend(response.get("results") or [])
+                except ServiceBatchError as e:
+                    errors.append(str(e))
+                    results.extend(e.results)
+
+        if errors:
+            raise ServiceBatchError("; ".join(errors), results)
+        return self._merge_batch_responses(responses, parallel=True)
+
+    def _process_service_session(self, instance: ServiceInstance, file_list: list, output_dir: str = None,
+                                 use_source_dir: bool = False, naming_format: str = "auto",
+                                 result_callback: Optional[Callable[[dict], None]] = None,
+                                 file_sizes: Optional[Dict[str, int]] = None) -> dict:
         """
+        在单个服务实例上用一个会话处理文件
+
+        处理进度通过订阅由服务端主动推送，每个文件完成时立即回调。
+        服务端在每个文件开始处理时推送file_started事件，某个文件超过截止时间仍未完成或整批超时时
+        报告为失败并结束该实例的进程，剩余文件由调用方交给传统模式。
+
+        Raises:
+            ServiceBatchError: 服务通信失败，异常中携带已收到的结果
+        """
+        client = instance.client
+        session_id = None
+        subscription = None
+        results = []
+        start_time = time.time()
+
         try:
             # 启动会话
-            if not self.service_client.start_session():
-                self.logger.error("启动服务会话失败，回退到传统模式")
-                return self._process_files_batch_subprocess(file_list, output_dir, use_source_dir, naming_format)
+            session_id = client.create_session()
+            if not session_id:
+                raise ServiceBatchError("启动服务会话失败", results)
 
             # 准备文件列表
-            files = []
-            for file_path in file_list:
-                task = {"input_path": file_path}
-                if not use_source_dir and output_dir:
-                    task["output_path"] = output_dir
-                files.append(task)
+            if file_sizes is None:
+                file_sizes = self._stat_file_sizes(file_list)
+            files = self._build_file_tasks(file_list, output_dir, use_source_dir, file_sizes)
 
             # 添加文件到会话
-            if not self.service_client.add_files(files):
-                self.service_client.end_session()
-                self.logger.error("添加文件到服务会话失败，回退到传统模式")
-                return self._process_files_batch_subprocess(file_list, output_dir, use_source_dir, naming_format)
+            if not client.add_files(files, session_id=session_id):
+                raise ServiceBatchError("添加文件到服务会话失败", results)
+
+            # 订阅进度（必须在开始处理之前，避免错过最早完成的文件）
+            subscription = client.subscribe_progress(session_id)
+            if subscription is None:
+                raise ServiceBatchError("订阅服务进度失败", results)
 
             # 开始处理
             options = {
@@ -542,154 +1210,554 @@ class FileProcessor:
                 "naming_format": naming_format
             }
 
-            if not self.service_client.start_processing(options):
-                self.service_client.end_session()
-                self.logger.error("启动服务处理失败，回退到传统模式")
-                return self._process_files_batch_subprocess(file_list, output_dir, use_source_dir, naming_format)
-
-            # 等待处理完成并获取进度
-            import time
-            start_time = time.time()
-            timeout = PROCESS_TIMEOUT_SECONDS * len(file_list)
-
-            while True:
-                progress_info = self.service_client.get_progress()
-                if progress_info is None:
-                    break
-
-                status = progress_info.get("status", "unknown")
-                if status in ["completed", "partial_success", "error"]:
-                    break
-
-                # 检查超时
-                if time.time() - start_time > timeout:
-                    self.service_client.stop_processing()
-                    self.service_client.end_session()
-                    return {
+            if not client.start_processing(options, session_id=session_id):
+                raise ServiceBatchError("启动服务处理失败", results)
+
+            # 等待服务端推送的完成事件
+            timeout = self._batch_timeout(file_list, file_sizes)
+            tracker = DeadlineTracker(self.throughput, file_sizes, self._file_extension)
+            next_check = time.monotonic() + WATCHDOG_INTERVAL
+            summary = None
+
+            for event in subscription.events(heartbeat=min(SERVICE_EVENT_HEARTBEAT, WATCHDOG_INTERVAL)):
+                event_type = event.get("type")
+                if event_type == "file_started":
+                    tracker.start(event.get("input_path", ""))
+                elif event_type == "file_completed":
+                    result = {
+                        "input_path": event.get("input_path", ""),
+                        "output_path": event.get("output_path", ""),
+                        "success": event.get("success", False),
+                        "process_time_ms": event.get("process_time_ms", 0)
+                    }
+                    if event.get("error"):
+                        result["error"] = event["error"]
+                    if event.get("decoder"):
+                        result["decoder"] = event["decoder"]
+                    tracker.finish(result)
+                    results.append(result)
+                    if result_callback:
+                        result_callback(result)
+                elif event_type == "session_finished":
+                    summary = event
+
+                # 停止处理：服务端不再开始新文件，未处理的文件没有结果，留给下次继续转换
+                if summary is None and self.cancelled:
+                    subscription.close()
+                    client.stop_processing(session_id)
+                    self.logger.info(f"服务模式处理已停止: 已完成 {len(results)}/{len(file_list)} 个文件")
+                    response = self._summarize_results(results, int((time.time() - start_time) * 1000))
+                    response["success"] = False
+                    response["error"] = ERROR_MESSAGES['processing_cancelled']
+                    return response
+
+                # 单个文件超时：服务进程内无法单独终止该文件，停止会话后由调用方重启实例
+                stragglers = []
+                if summary is None and time.monotonic() >= next_check:
+                    next_check = time.monotonic() + WATCHDOG_INTERVAL
+                    stragglers = tracker.overdue()
+                if stragglers:
+                    subscription.close()
+                    client.stop_processing(session_id)
+                    for file_path, limit in stragglers:
+                        result = self._straggler_result(file_path, limit)
+                        results.append(result)
+                        if result_callback:
+                            result_callback(result)
+                    error_msg = f"{len(stragglers)} 个文件处理超时"
+                    self._abandon_service_instance(instance, tracker, results, result_callback, error_msg)
+                    raise ServiceBatchError(error_msg, results)
+
+                # 检查整批超时：未完成的文件交给调用方回退处理
+                if summary is None and time.time() - start_time > timeout:
+                    subscription.close()
+                    client.stop_processing(session_id)
+                    error_msg = f"服务处理超时（超过{timeout:.0f}秒）"
+                    self._abandon_service_instance(instance, tracker, results, result_callback, error_msg)
+                    raise ServiceBatchError(error_msg, results)
+
+            if summary is None:
+                raise ServiceBatchError("服务连接中断，未收到处理结果", results)
+
+            # 漏收的推送事件从服务端结果列表补齐
+            reported = {result["input_path"] for result in results}
+            if len(results) < summary.get("processed_files", 0):
+                self.logger.warning(f"推送事件不完整（{len(results)}/{summary.get('processed_files')}），"
+                                    f"从服务端补取处理结果")
+                for result in client.iter_results(session_id):
+                    if result.get("input_path") in reported:
+                        continue
+                    reported.add(result.get("input_path"))
+                    results.append(result)
+                    if result_callback:
+                        result_callback(result)
+
+            # 服务端在add_files时会丢弃不存在或格式不支持的文件，这些文件不会产生事件
+            for file_path in file_list:
+                if file_path not in reported:
+                    result = {
+                        "input_path": file_path,
                         "success": False,
-                        "error": f"服务处理超时（超过{timeout}秒）",
-                        "results": []
+                        "error": "服务未接受该文件（文件不存在或格式不支持）",
+                        "process_time_ms": 0
                     }
+                    results.append(result)
+                    if result_callback:
+                        result_callback(result)
+
+            response = self._summarize_results(results, int((time.time() - start_time) * 1000))
+            response["success"] = summary.get("status") in ["completed", "partial_success"]
+            self.logger.info(f"服务模式处理完成: 成功 {response['success_count']}, "
+                             f"失败 {response['failed_count']}, 耗时 {response['total_time_ms']}ms")
+            return response
+
+        except ServiceBatchError:
+            raise
+        except Exception as e:
+            raise ServiceBatchError(f"服务模式处理异常: {e}", results)
+        finally:
+            if subscription:
+                subscription.close()
+            if session_id and client.connected:
+                client.end_session(session_id)
+
+    def _abandon_service_instance(self, instance: ServiceInstance, tracker: DeadlineTracker, results: List[dict],
+                                  result_callback: Optional[Callable[[dict], None]], reason: str):
+        """
+        结束有文件卡住或整批超时的服务实例
 
-                time.sleep(0.1)  # 等待100ms再检查（减少延迟）
+        服务进程内无法单独终止某个文件，只能结束整个进程，由监管器重启。
+        确认进程已结束后，正在处理的文件才能交给传统模式重新处理；
+        无法确认时这些文件可能仍在写入输出，报告为失败，不再重复处理。
 
-            # 获取最终结果
-            final_progress = self.service_client.get_progress()
-            self.service_client.end_session()
+        Args:
+            instance: 服务实例
+            tracker: 本会话的截止时间跟踪器
+            results: 已收到的结果（追加无法确认状态的文件的失败结果）
+            result_callback: 单个文件处理完成时的回调
+            reason: 结束原因
+        """
+        if self.service_supervisor.kill_instance(instance, reason):
+            return
+
+        reported = {result.get("input_path") for result in results}
+        for file_path in tracker.running():
+            if file_path in reported:
+                continue
+            self.logger.warning(f"服务实例未能确认结束，不重新处理正在处理的文件: {file_path}")
+            result = {
+                "input_path": file_path,
+                "success": False,
+                "error": "服务实例未能结束，文件可能仍在处理，未重新处理",
+                "process_time_ms": 0
+            }
+            results.append(result)
+            if result_callback:
+                result_callback(result)
 
-            if final_progress:
-                total_files = final_progress.get("total_files", len(file_list))
-                processed_files = final_progress.get("processed_files", 0)
-                status = final_progress.get("status", "unknown")
+    def _process_files_batch_subprocess(self, file_list: list, output_dir: str = None,
+                                      use_source_dir: bool = False, naming_format: str = "auto",
+                                      result_callback: Optional[Callable[[dict], None]] = None,
+                                      file_sizes: Optional[Dict[str, int]] = None) -> dict:
+        """
+        使用传统subprocess模式批量处理文件
 
-                success = status in ["completed", "partial_success"]
-                return {
-                    "success": success,
-                    "success_count": processed_files,
-                    "failed_count": total_files - processed_files,
-                    "total_files": total_files,
-                    "results": [],  # 服务模式暂不返回详细结果
-                    "total_time_ms": int((time.time() - start_time) * 1000)
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "无法获取处理结果",
-                    "results": []
-                }
+        文件较多时按大小均衡拆分为多个分片，每个分片一个um --batch进程并行处理，
+        某个分片完成后立即回调其结果，慢文件只拖慢所在分片。
+        result_callback可能在多个线程中被调用。
+        """
+        if file_sizes is None:
+            file_sizes = self._stat_file_sizes(file_list)
 
-        except Exception as e:
-            self.logger.error(f"服务模式处理异常: {e}，回退到传统模式")
-            if self.service_client and self.service_client.session_id:
-                self.service_client.end_session()
-            return self._process_files_batch_subprocess(file_list, output_dir, use_source_dir, naming_format)
+        shards = self._plan_batch_shards(file_list, file_sizes)
+        if len(shards) <= 1:
+            return self._run_batch_process(file_list, output_dir, use_source_dir, naming_format, result_callback,
+                                           file_sizes)
 
-    def _process_files_batch_subprocess(self, file_list: list, output_dir: str = None,
-                                      use_source_dir: bool = False, naming_format: str = "auto") -> dict:
+        self.logger.info(f"拆分为 {len(shards)} 个分片并行批处理: {[len(shard) for shard in shards]}")
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            futures = [executor.submit(self._run_batch_process, shard, output_dir, use_source_dir,
+                                       naming_format, result_callback, file_sizes)
+                       for shard in shards]
+            responses = [future.result() for future in futures]
+
+        return self._merge_batch_responses(responses, parallel=True)
+
+    def _plan_batch_shards(self, file_list: list, file_sizes: Dict[str, int]) -> List[list]:
         """
-        使用传统subprocess模式批量处理文件
+        按文件大小把文件列表拆分为多个大小均衡的分片
+
+        分片数由CPU核心数、总字节数和文件数决定：大约每BATCH_SHARD_MIN_BYTES字节
+        或每BATCH_SHARD_TARGET_FILES个文件一个分片，取两者中较多的。
+        分配采用最长处理时间优先（LPT）：
+        从大到小依次放入当前总字节数最小的分片。
+
+        Args:
+            file_list: 文件列表
+            file_sizes: 文件路径 -> 文件大小
+
+        Returns:
+            List[list]: 分片列表，不需要拆分时只有一个分片
         """
-        import json
+        max_shards = min(BATCH_MAX_SHARDS, max(1, (os.cpu_count() or 1) // 2), len(file_list))
+        if max_shards <= 1:
+            return [file_list]
+
+        sizes = [file_sizes.get(file_path, 0) for file_path in file_list]
+        total_bytes = sum(sizes)
+        shard_count = min(max_shards, max(math.ceil(total_bytes / BATCH_SHARD_MIN_BYTES),
+                                          math.ceil(len(file_list) / BATCH_SHARD_TARGET_FILES)))
+        if shard_count <= 1:
+            return [file_list]
+
+        # 字节数相同（如大量小文件）时按文件数均衡
+        heap = [(0, 0, index) for index in range(shard_count)]
+        shards = [[] for _ in range(shard_count)]
+        for size, file_path in sorted(zip(sizes, file_list), key=lambda item: item[0], reverse=True):
+            load, count, index = heapq.heappop(heap)
+            shards[index].append(file_path)
+            heapq.heappush(heap, (load + size, count + 1, index))
+
+        return [shard for shard in shards if shard]
+
+    def _run_batch_process(self, file_list: list, output_dir: str = None,
+                           use_source_dir: bool = False, naming_format: str = "auto",
+                           result_callback: Optional[Callable[[dict], None]] = None,
+                           file_sizes: Optional[Dict[str, int]] = None) -> dict:
+        """
+        用um --batch进程处理文件列表
 
-        try:
-            # 构建批处理请求
-            batch_request = {
-                "files": [],
-                "options": {
-                    "remove_source": False,
-                    "update_metadata": True,  # 启用元数据更新，确保保留文件名中的Live等标识
-                    "overwrite_output": True,
-                    "skip_noop": True,
-                    "naming_format": naming_format
-                }
-            }
+        整批文件的截止时间按文件大小和历史处理速度计算。某个文件超过自己的截止时间时
+        结束当前进程并把该文件报告为失败，其余未完成的文件用新进程继续处理，
+        单个卡住的文件不会拖住整批文件。
+        提供result_callback时结果只通过回调返回，不在内存中累积，返回值中的results为空。
+        """
+        if file_sizes is None:
+            file_sizes = self._stat_file_sizes(file_list)
+
+        timeout = self._batch_timeout(file_list, file_sizes)
+        deadline = time.monotonic() + timeout
+        responses = []
+        remaining = file_list
+        while remaining:
+            response, remaining = self._run_batch_attempt(remaining, output_dir, use_source_dir, naming_format,
+                                                          result_callback, file_sizes, deadline, timeout)
+            responses.append(response)
+            if remaining:
+                self.logger.info(f"重新启动批处理进程处理剩余 {len(remaining)} 个文件")
+
+        if len(responses) == 1:
+            return responses[0]
+        return self._merge_batch_responses(responses)
+
+    def _run_batch_attempt(self, file_list: list, output_dir: Optional[str], use_source_dir: bool,
+                           naming_format: str, result_callback: Optional[Callable[[dict], None]],
+                           file_sizes: Dict[str, int], deadline: float, timeout: float) -> Tuple[dict, list]:
+        """
+        启动一个um --batch进程处理文件列表
 
-            # 添加文件任务
-            for file_path in file_list:
-                task = {"input_path": file_path}
+        以流式模式运行：um每开始一个文件输出一行start通知，每完成一个文件输出一行JSON结果，
+        读到即回调，最后一行为汇总。看门狗线程定期检查整批截止时间和正在处理的文件的截止时间。
 
-                if not use_source_dir and output_dir:
-                    task["output_path"] = output_dir
+        Args:
+            file_list: 文件列表
+            output_dir: 输出目录路径
+            use_source_dir: 是否使用源文件目录作为输出目录
+            naming_format: 文件命名格式
+            result_callback: 单个文件处理完成时的回调
+            file_sizes: 文件路径 -> 文件大小
+            deadline: 整批文件的截止时刻（time.monotonic）
+            timeout: 整批文件的超时时间（秒），用于错误信息
 
-                batch_request["files"].append(task)
+        Returns:
+            Tuple[dict, list]: (批处理结果, 因有文件超时而结束进程后需要重新处理的文件)
+        """
+        import json
 
-            self.logger.info(f"开始传统模式批处理 {len(file_list)} 个文件")
+        # 构建批处理请求
+        batch_request = {
+            "files": self._build_file_tasks(file_list, output_dir, use_source_dir, file_sizes),
+            "options": {
+                "remove_source": False,
+                "update_metadata": True,  # 启用元数据更新，确保保留文件名中的Live等标识
+                "overwrite_output": True,
+                "skip_noop": True,
+                "naming_format": naming_format
+            },
+            "stream": True
+        }
 
-            # 调用批处理模式
-            cmd = [self.um_exe_path, "--batch"]
+        self.logger.info(f"开始传统模式批处理 {len(file_list)} 个文件")
 
+        start_time = time.monotonic()
+        results = [] if result_callback is None else None
+        success_count = 0
+        failed_count = 0
+        summary = None
+        legacy_lines = None
+        stderr_tail = deque(maxlen=BATCH_STDERR_TAIL_LINES)
+        tracker = DeadlineTracker(self.throughput, file_sizes, self._file_extension)
+        finished = set()
+        stragglers = []
+        timed_out = threading.Event()
+        done = threading.Event()
+
+        try:
             um_exe_dir = os.path.dirname(os.path.abspath(self.um_exe_path))
-            result = subprocess.run(
-                cmd,
-                input=json.dumps(batch_request),
-                capture_output=True,
+            process = self._spawn_process(
+                [self.um_exe_path, "--batch"],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
                 text=True,
                 encoding='utf-8',
                 errors='ignore',
-                timeout=PROCESS_TIMEOUT_SECONDS * len(file_list),  # 根据文件数量调整超时
-                cwd=um_exe_dir,
-                **self._get_subprocess_kwargs()
+                cwd=um_exe_dir
             )
-
-            if result.returncode == 0:
-                # 解析批处理响应
-                response = json.loads(result.stdout)
-                self.logger.info(f"批处理完成: 成功 {response.get('success_count', 0)}, "
-                               f"失败 {response.get('failed_count', 0)}, "
-                               f"耗时 {response.get('total_time_ms', 0)}ms")
-                return response
-            else:
-                error_msg = result.stderr or result.stdout or '未知错误'
-                self.logger.error(f"批处理失败: {error_msg}")
-                return {
-                    "success": False,
-                    "error": error_msg,
-                    "results": []
-                }
-
-        except subprocess.TimeoutExpired:
-            error_msg = f"批处理超时（超过{PROCESS_TIMEOUT_SECONDS * len(file_list)}秒）"
+        except Exception as e:
+            error_msg = f"批处理异常: {str(e)}"
             self.logger.error(error_msg)
             return {
                 "success": False,
                 "error": error_msg,
                 "results": []
-            }
+            }, []
+        if process is None:
+            return {
+                "success": False,
+                "error": ERROR_MESSAGES['processing_cancelled'],
+                "results": []
+            }, []
+
+        # stderr必须并行读取，否则日志写满管道缓冲区后um会阻塞
+        stderr_thread = threading.Thread(target=self._drain_stream, args=(process.stderr, stderr_tail), daemon=True)
+        stderr_thread.start()
+
+        def watchdog():
+            while not done.wait(WATCHDOG_INTERVAL):
+                if time.monotonic() > deadline:
+                    timed_out.set()
+                else:
+                    stragglers.extend(tracker.overdue())
+                    if not stragglers:
+                        continue
+                process.kill()
+                return
+
+        watchdog_thread = threading.Thread(target=watchdog, daemon=True)
+        watchdog_thread.start()
+
+        try:
+            try:
+                process.stdin.write(json.dumps(batch_request))
+                process.stdin.close()
+            except OSError as e:
+                self.logger.warning(f"写入批处理请求失败: {e}")
+
+            for line in process.stdout:
+                if legacy_lines is not None:
+                    legacy_lines.append(line)
+                    continue
+
+                stripped = line.strip()
+                if not stripped:
+                    continue
+                try:
+                    item = json.loads(stripped)
+                except json.JSONDecodeError:
+                    # 旧版um不支持流式输出，输出的是一个格式化的完整JSON
+                    legacy_lines = [line]
+                    continue
+
+                line_type = item.pop("type", None)
+                if line_type == "start":
+                    tracker.start(item.get("input_path", ""))
+                elif line_type == "result":
+                    tracker.finish(item)
+                    finished.add(item.get("input_path"))
+                    if item.get("success"):
+                        success_count += 1
+                    else:
+                        failed_count += 1
+                    if results is not None:
+                        results.append(item)
+                    if result_callback:
+                        result_callback(item)
+                elif line_type == "summary":
+                    summary = item
+
+            returncode = process.wait()
         except Exception as e:
+            process.kill()
+            process.wait()
             error_msg = f"批处理异常: {str(e)}"
             self.logger.error(error_msg)
             return {
                 "success": False,
                 "error": error_msg,
-                "results": []
+                "success_count": success_count,
+                "failed_count": failed_count,
+                "total_files": success_count + failed_count,
+                "results": results or []
+            }, []
+        finally:
+            done.set()
+            watchdog_thread.join()
+            stderr_thread.join(timeout=1.0)
+            self._release_process(process)
+
+        # um收到停止请求后不再开始新文件，写完正在处理的文件后正常退出，此时只有部分文件有结果
+        stopped_early = returncode != 0 or (legacy_lines is None and len(finished) < len(file_list))
+        if self.cancelled and stopped_early:
+            self.logger.info(f"批处理已停止: 已完成 {success_count + failed_count}/{len(file_list)} 个文件")
+            return {
+                "success": False,
+                "error": ERROR_MESSAGES['processing_cancelled'],
+                "success_count": success_count,
+                "failed_count": failed_count,
+                "total_files": success_count + failed_count,
+                "results": results or []
+            }, []
+
+        if timed_out.is_set():
+            # 进程已被结束：没有结果的文件报告为失败，保证每个文件都有结果
+            error_msg = f"批处理超时（超过{timeout:.0f}秒）"
+            self.logger.error(error_msg)
+            unfinished = self._fail_unfinished(file_list, finished, error_msg, results, result_callback)
+            failed_count += len(unfinished)
+            return {
+                "success": False,
+                "error": error_msg,
+                "success_count": success_count,
+                "failed_count": failed_count,
+                "total_files": success_count + failed_count,
+                "unfinished_files": unfinished,
+                "results": results or []
+            }, []
+
+        if stragglers:
+            # 超时的文件报告为失败，其余未完成的文件（包括被一起终止的文件）交给新进程
+            for file_path, limit in stragglers:
+                if file_path in finished:
+                    continue
+                finished.add(file_path)
+                result = self._straggler_result(file_path, limit)
+                failed_count += 1
+                if results is not None:
+                    results.append(result)
+                if result_callback:
+                    result_callback(result)
+            return {
+                "success": True,
+                "success_count": success_count,
+                "failed_count": failed_count,
+                "total_files": success_count + failed_count,
+                "results": results or [],
+                "total_time_ms": int((time.monotonic() - start_time) * 1000)
+            }, [file_path for file_path in file_list if file_path not in finished]
+
+        if returncode == 0 and legacy_lines is not None:
+            # 解析批处理响应
+            try:
+                response = json.loads("".join(legacy_lines))
+                if not isinstance(response, dict):
+                    raise ValueError(f"响应不是JSON对象: {type(response).__name__}")
+            except ValueError as e:
+                # 旧版um输出被截断或不是JSON：没有结果的文件报告为失败，不让异常中断整个批处理
+                error_msg = f"解析批处理输出失败: {e}"
+                self.logger.error(error_msg)
+                unfinished = self._fail_unfinished(file_list, finished, error_msg, results, result_callback)
+                failed_count += len(unfinished)
+                return {
+                    "success": False,
+                    "error": error_msg,
+                    "success_count": success_count,
+                    "failed_count": failed_count,
+                    "total_files": success_count + failed_count,
+                    "unfinished_files": unfinished,
+                    "results": results or []
+                }, []
+            for file_result in response.get('results') or []:
+                tracker.finish(file_result)
+                if result_callback:
+                    result_callback(file_result)
+        elif returncode == 0 and summary is not None:
+            response = {
+                "success": True,
+                "success_count": summary.get("success_count", success_count),
+                "failed_count": summary.get("failed_count", failed_count),
+                "total_files": summary.get("total_files", success_count + failed_count),
+                "results": results or [],
+                "total_time_ms": summary.get("total_time_ms", 0)
+            }
+        else:
+            error_msg = "\n".join(stderr_tail) or '未知错误'
+            self.logger.error(f"批处理失败: {error_msg}")
+            return {
+                "success": False,
+                "error": error_msg,
+                "success_count": success_count,
+                "failed_count": failed_count,
+                "total_files": success_count + failed_count,
+                "results": results or []
+            }, []
+
+        self.logger.info(f"批处理完成: 成功 {response.get('success_count', 0)}, "
+                         f"失败 {response.get('failed_count', 0)}, "
+                         f"耗时 {response.get('total_time_ms', 0)}ms")
+        return response, []
+
+    @staticmethod
+    def _fail_unfinished(file_list: list, finished: set, error_msg: str, results: Optional[list],
+                         result_callback: Optional[Callable[[dict], None]]) -> list:
+        """
+        把批处理中没有结果的文件报告为失败
+
+        Args:
+            file_list: 文件列表
+            finished: 已有结果的文件路径
+            error_msg: 失败结果中的错误信息
+            results: 累积结果的列表，提供回调时为None
+            result_callback: 单个文件处理完成时的回调
+
+        Returns:
+            list: 被报告为失败的文件路径
+        """
+        unfinished = [file_path for file_path in file_list if file_path not in finished]
+        for file_path in unfinished:
+            result = {
+                "input_path": file_path,
+                "success": False,
+                "error": error_msg,
+                "process_time_ms": 0
             }
+            if results is not None:
+                results.append(result)
+            if result_callback:
+                result_callback(result)
+        return unfinished
+
+    @staticmethod
+    def _drain_stream(stream, tail: deque):
+        """
+        持续读取子进程输出，只保留最后若干行
+
+        Args:
+            stream: 子进程的文本输出流
+            tail: 保存最后若干行的队列
+        """
+        try:
+            for line in stream:
+                tail.append(line.rstrip())
+        except (OSError, ValueError):
+            pass
 
     def _process_files_individual(self, file_list: list, output_dir: str = None,
-                                use_source_dir: bool = False, naming_format: str = "auto") -> dict:
+                                use_source_dir: bool = False, naming_format: str = "auto",
+                                result_callback: Optional[Callable[[dict], None]] = None) -> dict:
         """
         使用单文件模式逐个处理文件（ffmpeg不可用时的回退方案）
         """
-        import time
         start_time = time.time()
 
         results = []
@@ -724,16 +1792,18 @@ class FileProcessor:
                     failed_count += 1
                     result["error"] = message
 
-                results.append(result)
-
             except Exception as e:
                 failed_count += 1
-                results.append({
+                result = {
                     "input_path": file_path,
                     "success": False,
                     "error": f"处理异常: {str(e)}",
                     "process_time_ms": 0
-                })
+                }
+
+            results.append(result)
+            if result_callback:
+                result_callback(result)
 
         total_time = int((time.time() - start_time) * 1000)
 
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录扫描缓存 - 用SQLite记录每个目录的文件名和子目录名，目录修改时间未变化时不再重新读取目录
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .app_data import get_app_data_path
+from .constants import (
+    SCAN_CACHE_FILENAME,
+    LOG_FORMAT
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS directories (
+    path     TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    files    TEXT NOT NULL,
+    subdirs  TEXT NOT NULL
+)
+"""
+
+# 名称列表的分隔符：文件名中不可能出现NUL字符
+_SEPARATOR = "\0"
+
+# 目录列表：(目录修改时间, 文件名列表, 子目录名列表)
+Listing = Tuple[int, List[str], List[str]]
+
+
+def normalize_directory(path: str) -> str:
+    """统一目录路径格式作为缓存的键"""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def _join_names(names: List[str]) -> str:
+    return _SEPARATOR.join(names)
+
+
+def _split_names(value: str) -> List[str]:
+    return value.split(_SEPARATOR) if value else []
+
+
+class ScanCache:
+    """
+    目录扫描缓存
+
+    在目录中新建、删除或重命名文件和子目录都会更新该目录的修改时间，而修改文件内容或子目录里的变化不会，
+    所以每个目录只需比较自己的修改时间。缓存保存目录下全部普通文件的名称，与扫描时使用的扩展名无关。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        打开（或创建）扫描缓存数据库
+
+        Args:
+            db_path: 数据库路径，默认使用应用数据目录下的scan_cache.db
+        """
+        self.db_path = db_path or get_app_data_path(SCAN_CACHE_FILENAME)
+        self.logger = self._setup_logger()
+        self._lock = threading.Lock()
+        # 扫描线程和界面线程都可能访问，统一由_lock串行化
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def _setup_logger(self) -> logging.Logger:
+        """设置日志记录器"""
+        logger = logging.getLogger('ScanCache')
+        logger.setLevel(logging.INFO)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(LOG_FORMAT)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        return logger
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+    def load(self, root: str) -> Dict[str, Listing]:
+        """
+        一次读取根目录及其下所有目录的缓存
+
+        Args:
+            root: 根目录
+
+        Returns:
+            Dict[str, Listing]: 规范化的目录路径 -> (修改时间, 文件名列表, 子目录名列表)
+        """
+        key = normalize_directory(root)
+        prefix = os.path.join(key, "")
+        # 以prefix开头的路径都落在[prefix, prefix的最后一个字符加一)区间内，可以使用主键索引
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, mtime_ns, files, subdirs FROM directories "
+                "WHERE path = ? OR (path >= ? AND path < ?)", (key, prefix, upper)).fetchall()
+        return {path: (mtime_ns, _split_names(files), _split_names(subdirs))
+                for path, mtime_ns, files, subdirs in rows}
+
+    def save(self, listings: Dict[str, Listing], stale: Iterable[str] = ()):
+        """
+        写入新读取的目录，删除已不存在的目录
+
+        Args:
+            listings: 规范化的目录路径 -> (修改时间, 文件名列表, 子目录名列表)
+            stale: 需要删除的目录（规范化的路径）
+        """
+        rows = [(path, mtime_ns, _join_names(files), _join_names(subdirs))
+                for path, (mtime_ns, files, subdirs) in listings.items()]
+        stale_rows = [(path,) for path in stale]
+        if not rows and not stale_rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO directories (path, mtime_ns, files, subdirs) VALUES (?, ?, ?, ?)", rows)
+            self._conn.executemany("DELETE FROM directories WHERE path = ?", stale_rows)
+            self._conn.commit()
+
+    def clear(self):
+        """清空全部缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM directories")
+            self._conn.commit()
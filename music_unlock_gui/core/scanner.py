@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录扫描器 - 多线程并行遍历目录树，按批返回匹配的文件，支持取消
+"""
+
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from .constants import (
+    SCAN_MAX_WORKERS,
+    SCAN_CHUNK_SIZE,
+    SCAN_CHUNK_INTERVAL,
+    SCAN_CACHE_RACY_SECONDS,
+    LOG_FORMAT
+)
+from .scan_cache import ScanCache, normalize_directory
+
+# 所有目录扫描完成的标记
+_DONE = object()
+
+
+class DirectoryScanner:
+    """
+    并行目录扫描器
+
+    每个目录由线程池中的一个任务用os.scandir读取一次，子目录作为新任务提交，
+    不同子树可以同时等待磁盘或网络。目录项自带的类型信息（Windows上还有大小和时间）
+    直接使用，不再逐个stat。匹配的文件通过生成器按批返回，扫描进行中就可以显示。
+
+    同一目录内的文件按名称排序，不同目录之间的顺序取决于扫描完成的先后。
+    符号链接指向的目录不会进入，与os.walk的默认行为一致。
+    每个扫描器只用于一次扫描，开始前调用cancel()也有效。
+
+    提供扫描缓存时，每个目录先stat一次，修改时间与缓存一致就直接使用缓存的文件名，
+    只有变化的目录才重新读取，扫描结束后把新读取的目录写回缓存。
+
+    扫描进度按目录树的分支估计：根目录的权重为1，每个目录的权重平均分给它的子目录，
+    没有子目录的目录扫描完成时计入它的权重。只需一次遍历，不必事先统计目录总数。
+    """
+
+    def __init__(self, match: Callable[[str], bool], max_workers: int = SCAN_MAX_WORKERS,
+                 chunk_size: int = SCAN_CHUNK_SIZE, chunk_interval: float = SCAN_CHUNK_INTERVAL,
+                 cache: Optional[ScanCache] = None, collect_sizes: bool = False):
+        """
+        初始化扫描器
+
+        Args:
+            match: 判断文件名是否需要的函数（参数为不含路径的文件名）
+            max_workers: 并行扫描的线程数
+            chunk_size: 每批最多的文件数
+            chunk_interval: 最长的发送间隔（秒）
+            cache: 目录扫描缓存（为None时每个目录都重新读取）
+            collect_sizes: 是否记录匹配文件的大小（保存在sizes中；需要读取目录项，不使用缓存）
+        """
+        self.match = match
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = max(1, chunk_size)
+        self.chunk_interval = chunk_interval
+        self.cache = None if collect_sizes else cache
+        self.collect_sizes = collect_sizes
+        self.logger = self._setup_logger()
+
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+        self._start_time = 0.0
+        self._end_time = 0.0
+        self.dirs_scanned = 0
+        self.files_seen = 0
+        self.files_matched = 0
+        self.errors = 0
+        self.dirs_cached = 0
+        self.sizes: Dict[str, int] = {}
+        self._progress = 0.0
+        self._cached = {}
+        self._listings = {}
+        self._visited = set()
+
+    def _setup_logger(self) -> logging.Logger:
+        """设置日志记录器"""
+        logger = logging.getLogger('DirectoryScanner')
+        logger.setLevel(logging.INFO)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(LOG_FORMAT)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        return logger
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        """取消扫描（可以在任意线程调用），正在读取的目录读完后不再开始新的目录"""
+        self._cancel_event.set()
+
+    @property
+    def elapsed(self) -> float:
+        """已用时间（秒）"""
+        if not self._start_time:
+            return 0.0
+        return (self._end_time or time.monotonic()) - self._start_time
+
+    @property
+    def files_per_second(self) -> float:
+        """每秒扫描的文件数（包括不匹配的文件）"""
+        elapsed = self.elapsed
+        return self.files_seen / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def progress(self) -> float:
+        """估计的扫描进度（0到1）"""
+        return min(1.0, self._progress)
+
+    def scan(self, root: str) -> Iterator[List[str]]:
+        """
+        扫描目录树
+
+        Args:
+            root: 根目录
+
+        Yields:
+            List[str]: 一批匹配的文件路径，每隔chunk_interval至少返回一次（可能为空列表）
+        """
+        self._start_time = time.monotonic()
+        self._end_time = 0.0
+        self.dirs_scanned = self.files_seen = self.files_matched = self.errors = self.dirs_cached = 0
+        self.sizes = {}
+        self._progress = 0.0
+        self._cached = self._load_cache(root)
+        self._listings = {}
+        self._visited = set()
+
+        results = queue.Queue()
+        outstanding = 1
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scan')
+
+        def scan_task(directory: str, weight: float):
+            nonlocal outstanding
+            try:
+                if not self._cancel_event.is_set():
+                    matched, subdirs = self._scan_directory(directory)
+                    if subdirs and not self._cancel_event.is_set():
+                        with self._lock:
+                            outstanding += len(subdirs)
+                        child_weight = weight / len(subdirs)
+                        for subdir in subdirs:
+                            executor.submit(scan_task, subdir, child_weight)
+                    else:
+                        with self._lock:
+                            self._progress += weight
+                    if matched:
+                        results.put(matched)
+            finally:
+                with self._lock:
+                    outstanding -= 1
+                    finished = outstanding == 0
+                if finished:
+                    results.put(_DONE)
+
+        executor.submit(scan_task, root, 1.0)
+        item = None
+        buffer = []
+        next_flush = time.monotonic() + self.chunk_interval
+        try:
+            while True:
+                try:
+                    item = results.get(timeout=max(0.0, next_flush - time.monotonic()))
+                except queue.Empty:
+                    item = None
+                if item is _DONE:
+                    self._progress = 1.0
+                    break
+                if item:
+                    buffer.extend(item)
+                if len(buffer) >= self.chunk_size:
+                    full = len(buffer) - len(buffer) % self.chunk_size
+                    for start in range(0, full, self.chunk_size):
+                        yield buffer[start:start + self.chunk_size]
+                    buffer = buffer[full:]
+                if time.monotonic() >= next_flush:
+                    # 没有新文件时也返回空列表，调用方借此刷新进度
+                    yield buffer
+                    buffer = []
+                    next_flush = time.monotonic() + self.chunk_interval
+            if buffer:
+                yield buffer
+        finally:
+            # 调用方提前停止迭代时也要让剩余任务尽快结束
+            if not self._end_time:
+                self._end_time = time.monotonic()
+            if item is not _DONE:
+                self._cancel_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._save_cache(complete=item is _DONE and not self.cancelled)
+
+        self.logger.info(f"扫描{'已取消' if self.cancelled else '完成'}: {root}, {self.dirs_scanned} 个目录"
+                         f"（{self.dirs_cached} 个使用缓存）, {self.files_seen} 个文件, 匹配 {self.files_matched} 个, "
+                         f"耗时 {self.elapsed:.2f}秒 ({self.files_per_second:.0f} 个/秒)")
+
+    def _load_cache(self, root: str) -> dict:
+        """读取根目录下所有目录的缓存，读取失败时不使用缓存"""
+        if self.cache is None:
+            return {}
+        try:
+            return self.cache.load(root)
+        except sqlite3.Error as e:
+            self.logger.warning(f"读取扫描缓存失败，将重新扫描全部目录: {e}")
+            return {}
+
+    def _save_cache(self, complete: bool):
+        """
+        把新读取的目录写回缓存
+
+        Args:
+            complete: 是否完整扫描了整个目录树（只有完整扫描后才能删除不再存在的目录）
+        """
+        if self.cache is None:
+            return
+        with self._lock:
+            listings = dict(self._listings)
+            stale = set(self._cached) - self._visited if complete else ()
+        try:
+            self.cache.save(listings, stale)
+        except sqlite3.Error as e:
+            self.logger.warning(f"保存扫描缓存失败: {e}")
+
+    def _scan_directory(self, directory: str):
+        """
+        读取单个目录（修改时间与缓存一致时使用缓存）
+
+        Args:
+            directory: 目录路径
+
+        Returns:
+            Tuple[List[str], List[str]]: (匹配的文件路径, 子目录路径)
+        """
+        sizes = None
+        try:
+            if self.collect_sizes:
+                file_names, subdir_names, sizes = self._list_directory_with_sizes(directory)
+                cached = False
+            elif self.cache is None:
+                file_names, subdir_names = self._list_directory(directory)
+                cached = False
+            else:
+                file_names, subdir_names, cached = self._list_directory_cached(directory)
+        except OSError as e:
+            self.logger.warning(f"无法读取目录: {directory}, {e}")
+            with self._lock:
+                self.errors += 1
+            return [], []
+
+        # 与DirEntry.path相同的拼接方式
+        prefix = os.path.join(directory, '')
+        match = self.match
+        matched = [prefix + name for name in file_names if match(name)]
+        subdirs = [prefix + name for name in subdir_names]
+        matched.sort()
+        with self._lock:
+            if sizes:
+                for name, size in sizes.items():
+                    self.sizes[prefix + name] = size
+            self.dirs_scanned += 1
+            self.dirs_cached += cached
+            self.files_seen += len(file_names)
+            self.files_matched += len(matched)
+        return matched, subdirs
+
+    def _list_directory_cached(self, directory: str) -> Tuple[List[str], List[str], bool]:
+        """
+        通过缓存读取目录
+
+        Args:
+            directory: 目录路径
+
+        Returns:
+            Tuple[List[str], List[str], bool]: (文件名, 子目录名, 是否使用了缓存)
+        """
+        key = normalize_directory(directory)
+        mtime_ns = os.stat(directory).st_mtime_ns
+        with self._lock:
+            self._visited.add(key)
+        cached = self._cached.get(key)
+        if cached is not None and cached[0] == mtime_ns:
+            return cached[1], cached[2], True
+
+        listed_at_ns = time.time_ns()
+        file_names, subdir_names = self._list_directory(directory)
+        # 刚修改过的目录在同一时间精度内可能再次变化而修改时间不变，这种目录下次仍然重新读取
+        if listed_at_ns - mtime_ns > SCAN_CACHE_RACY_SECONDS * 1e9:
+            with self._lock:
+                self._listings[key] = (mtime_ns, file_names, subdir_names)
+        return file_names, subdir_names, False
+
+    def _list_directory_with_sizes(self, directory: str) -> Tuple[List[str], List[str], Dict[str, int]]:
+        """
+        用os.scandir读取目录，同时记录匹配文件的大小
+
+        Windows上目录项自带文件大小，不需要额外的系统调用；其他系统每个匹配的文件stat一次。
+
+        Args:
+            directory: 目录路径
+
+        Returns:
+            Tuple[List[str], List[str], Dict[str, int]]: (普通文件名, 子目录名, 匹配的文件名 -> 大小)
+        """
+        file_names = []
+        subdir_names = []
+        sizes = {}
+        match = self.match
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdir_names.append(entry.name)
+                    elif entry.is_file():
+                        file_names.append(entry.name)
+                        if match(entry.name):
+                            sizes[entry.name] = entry.stat().st_size
+                except OSError:
+                    continue
+        return file_names, subdir_names, sizes
+
+    @staticmethod
+    def _list_directory(directory: str) -> Tuple[List[str], List[str]]:
+        """
+        用os.scandir读取目录
+
+        Args:
+            directory: 目录路径
+
+        Returns:
+            Tuple[List[str], List[str]]: (普通文件名, 子目录名)
+        """
+        file_names = []
+        subdir_names = []
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdir_names.append(entry.name)
+                    elif entry.is_file():
+                        file_names.append(entry.name)
+                except OSError:
+                    continue
+        return file_names, subdir_names
@@ -9,20 +9,39 @@ import json
 import logging
 import os
 import platform
+import queue
 import socket
 import threading
 import time
 import uuid
-from typing import Dict, List, Optional, Callable, Any
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, Optional, Callable, Any, Tuple, Iterator
+
+from .constants import (
+    SERVICE_RECV_CHUNK_SIZE,
+    SERVICE_ADD_FILES_CHUNK_SIZE,
+    SERVICE_REQUEST_TIMEOUT,
+    SERVICE_EVENT_TYPES,
+    SERVICE_RESULTS_PAGE_SIZE,
+    SERVICE_PROBE_INITIAL_DELAY,
+    SERVICE_PROBE_MAX_DELAY,
+    SERVICE_PING_TIMEOUT,
+    SERVICE_SHUTDOWN_TIMEOUT
+)
 
 
 class ServiceClient:
-    """音乐解密服务客户端"""
-    
+    """
+    音乐解密服务客户端
+
+    同一连接上可以有多个请求同时在途：每个请求按消息ID登记一个Future，
+    后台读取线程收到响应后按ID分发，调用方各自等待自己的Future。
+    """
+
     def __init__(self, service_path: str = None):
         """
         初始化服务客户端
-        
+
         Args:
             service_path: 服务路径（Windows命名管道或Unix套接字）
         """
@@ -33,7 +52,20 @@ class ServiceClient:
         self.connected = False
         self.session_id = None
         self._lock = threading.Lock()
-        
+        self._write_lock = threading.Lock()
+        # 在途请求：消息ID -> Future
+        self._pending: Dict[str, Future] = {}
+        # 进度订阅：订阅消息ID -> 事件队列
+        self._subscriptions: Dict[str, queue.Queue] = {}
+        self._pending_lock = threading.Lock()
+        self._reader_thread: Optional[threading.Thread] = None
+        # 持久接收缓冲区：服务端以换行分隔每条JSON响应（json.NewEncoder输出）
+        self._recv_buffer = bytearray()
+        self._scan_pos = 0
+        # Windows重叠I/O使用的事件句柄
+        self._read_event = None
+        self._write_event = None
+
     def _setup_logger(self) -> logging.Logger:
         """设置日志记录器"""
         logger = logging.getLogger(f"{__name__}.ServiceClient")
@@ -46,62 +78,202 @@ class ServiceClient:
             logger.addHandler(handler)
             logger.setLevel(logging.INFO)
         return logger
-        
+
     def _get_default_service_path(self) -> str:
         """获取默认服务路径"""
         if self.is_windows:
             return r'\\.\pipe\um_service'
         else:
             return '/tmp/um_service.sock'
-            
-    def connect(self, timeout: float = 10.0) -> bool:
+
+    def connect(self, timeout: float = 10.0, quiet: bool = False) -> bool:
         """
         连接到服务
-        
+
         Args:
             timeout: 连接超时时间（秒）
-            
+            quiet: 连接失败时只记录调试日志（用于就绪探测）
+
         Returns:
             bool: 是否连接成功
         """
         with self._lock:
             if self.connected:
                 return True
-                
+
             try:
                 if self.is_windows:
                     # Windows命名管道
+                    import win32event
                     import win32file
                     import win32pipe
-                    
+
                     # 等待管道可用
                     win32pipe.WaitNamedPipe(self.service_path, int(timeout * 1000))
-                    
+
+                    # 使用重叠I/O，读取线程阻塞读取时不会阻塞其他线程写入
                     self.socket = win32file.CreateFile(
                         self.service_path,
                         win32file.GENERIC_READ | win32file.GENERIC_WRITE,
                         0,
                         None,
                         win32file.OPEN_EXISTING,
-                        0,
+                        win32file.FILE_FLAG_OVERLAPPED,
                         None
                     )
+                    self._read_event = win32event.CreateEvent(None, True, False, None)
+                    self._write_event = win32event.CreateEvent(None, True, False, None)
                 else:
                     # Unix域套接字
                     self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
                     self.socket.settimeout(timeout)
                     self.socket.connect(self.service_path)
-                    
+                    # 连接建立后改为阻塞模式，请求超时由各自的Future控制
+                    self.socket.settimeout(None)
+
+                self._recv_buffer.clear()
+                self._scan_pos = 0
                 self.connected = True
+
+                # 启动后台读取线程
+                self._reader_thread = threading.Thread(
+                    target=self._reader_loop,
+                    args=(self.socket,),
+                    name="ServiceClientReader",
+                    daemon=True
+                )
+                self._reader_thread.start()
+
                 self.logger.info(f"成功连接到服务: {self.service_path}")
                 return True
-                
+
             except Exception as e:
-                self.logger.error(f"连接服务失败: {e}")
+                if quiet:
+                    self.logger.debug(f"连接服务失败: {e}")
+                else:
+                    self.logger.error(f"连接服务失败: {e}")
+                if self.socket is not None and not self.is_windows:
+                    self.socket.close()
                 self.socket = None
                 self.connected = False
                 return False
-                
+
+    def ping(self, timeout: float = SERVICE_PING_TIMEOUT) -> bool:
+        """
+        发送轻量级ping请求，确认服务能够正常处理消息
+
+        Args:
+            timeout: 等待响应的超时时间（秒）
+
+        Returns:
+            bool: 服务是否响应
+        """
+        if not self.connected:
+            return False
+
+        try:
+            future = self.submit_messages([("ping", {})])[0]
+        except Exception as e:
+            self.logger.debug(f"发送ping失败: {e}")
+            return False
+
+        response = self._wait_response(future, timeout)
+        return bool(response and response.get("success"))
+
+    def hello(self) -> Optional[Dict[str, Any]]:
+        """
+        握手，获取服务版本、可执行文件信息、支持的扩展名和协议能力
+
+        Returns:
+            Dict: 服务信息，服务不支持握手或请求失败时返回None
+        """
+        response = self._send_message("hello", {})
+
+        if response and response.get("success"):
+            return response.get("data", {})
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.warning(f"服务握手失败: {error}")
+            return None
+
+    def shutdown(self, force: bool = False, timeout: float = SERVICE_SHUTDOWN_TIMEOUT) -> bool:
+        """
+        请求服务退出，并等待监听地址释放
+
+        Args:
+            force: 有会话正在处理时也强制停止
+            timeout: 等待服务退出的最长时间（秒）
+
+        Returns:
+            bool: 服务是否已退出
+        """
+        response = self._send_message("shutdown", {"force": force})
+        if not (response and response.get("success")):
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.warning(f"停止服务失败: {error}")
+            return False
+
+        self.disconnect()
+
+        deadline = time.monotonic() + timeout
+        delay = SERVICE_PROBE_INITIAL_DELAY
+        while self._endpoint_exists():
+            if time.monotonic() >= deadline:
+                self.logger.warning("等待服务退出超时")
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, SERVICE_PROBE_MAX_DELAY)
+
+        self.logger.info("服务已停止")
+        return True
+
+    def _endpoint_exists(self) -> bool:
+        """
+        检查服务监听地址是否存在
+
+        Returns:
+            bool: 套接字文件或命名管道是否存在
+        """
+        if not self.is_windows:
+            return os.path.exists(self.service_path)
+
+        import pywintypes
+        import win32pipe
+        try:
+            win32pipe.WaitNamedPipe(self.service_path, 1)
+            return True
+        except pywintypes.error as e:
+            # 管道存在但暂无空闲实例时等待超时（ERROR_SEM_TIMEOUT）
+            return e.winerror == 121
+
+    def wait_until_ready(self, timeout: float) -> bool:
+        """
+        等待服务就绪：按指数退避轮询套接字文件，连接后发送ping确认
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 服务是否已就绪并保持连接
+        """
+        deadline = time.monotonic() + timeout
+        delay = SERVICE_PROBE_INITIAL_DELAY
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            # Unix下套接字文件出现前无需尝试连接；Windows命名管道由connect内部等待
+            if self.is_windows or os.path.exists(self.service_path):
+                if self.connect(timeout=min(remaining, SERVICE_PING_TIMEOUT), quiet=True):
+                    if self.ping(timeout=min(max(deadline - time.monotonic(), 0.1), SERVICE_PING_TIMEOUT)):
+                        return True
+                    self.disconnect()
+
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, SERVICE_PROBE_MAX_DELAY)
+
     def disconnect(self):
         """断开连接"""
         with self._lock:
@@ -111,6 +283,11 @@ class ServiceClient:
                         import win32file
                         win32file.CloseHandle(self.socket)
                     else:
+                        # 先shutdown以唤醒阻塞在recv上的读取线程
+                        try:
+                            self.socket.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass
                         self.socket.close()
                 except Exception as e:
                     self.logger.error(f"断开连接时出错: {e}")
@@ -119,124 +296,381 @@ class ServiceClient:
                     self.connected = False
                     self.session_id = None
                     self.logger.info("已断开服务连接")
-                    
-    def _send_message(self, msg_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+
+        self._fail_pending(ConnectionError("连接已断开"))
+        reader = self._reader_thread
+        if reader and reader is not threading.current_thread():
+            reader.join(timeout=1.0)
+        self._reader_thread = None
+
+    def _recv_raw(self, conn) -> bytes:
         """
-        发送消息到服务端
-        
+        从连接读取一块数据
+
+        Args:
+            conn: 套接字或管道句柄
+
+        Returns:
+            bytes: 读取到的数据，连接关闭时返回空字节串
+        """
+        if self.is_windows:
+            import pywintypes
+            import win32file
+            import winerror
+
+            overlapped = pywintypes.OVERLAPPED()
+            overlapped.hEvent = self._read_event
+            buffer = win32file.AllocateReadBuffer(SERVICE_RECV_CHUNK_SIZE)
+            try:
+                win32file.ReadFile(conn, buffer, overlapped)
+                size = win32file.GetOverlappedResult(conn, overlapped, True)
+            except pywintypes.error as e:
+                if e.winerror in (winerror.ERROR_BROKEN_PIPE, winerror.ERROR_OPERATION_ABORTED):
+                    return b''
+                raise
+            return bytes(buffer[:size])
+        return conn.recv(SERVICE_RECV_CHUNK_SIZE)
+
+    def _write_all(self, data: bytes):
+        """
+        将数据完整写入连接（处理部分写入）
+
+        Args:
+            data: 要写入的数据
+        """
+        if self.is_windows:
+            import pywintypes
+            import win32file
+
+            view = memoryview(data)
+            while view:
+                overlapped = pywintypes.OVERLAPPED()
+                overlapped.hEvent = self._write_event
+                win32file.WriteFile(self.socket, view, overlapped)
+                written = win32file.GetOverlappedResult(self.socket, overlapped, True)
+                view = view[written:]
+        else:
+            self.socket.sendall(data)
+
+    def _read_line(self, conn) -> Optional[bytes]:
+        """
+        从接收缓冲区读取一行完整消息
+
+        已扫描过的部分不会重复查找换行符，消费后的数据从缓冲区头部删除，
+        因此大响应被拆分成多次读取时也不会产生二次方级的拷贝。
+
+        Args:
+            conn: 套接字或管道句柄
+
+        Returns:
+            bytes: 不含换行符的一行数据，连接关闭时返回None
+        """
+        while True:
+            index = self._recv_buffer.find(b'\n', self._scan_pos)
+            if index >= 0:
+                line = bytes(self._recv_buffer[:index])
+                del self._recv_buffer[:index + 1]
+                self._scan_pos = 0
+                return line
+
+            self._scan_pos = len(self._recv_buffer)
+            chunk = self._recv_raw(conn)
+            if not chunk:
+                return None
+            self._recv_buffer += chunk
+
+    def _reader_loop(self, conn):
+        """
+        后台读取线程：按消息ID把响应分发给等待中的请求
+
+        Args:
+            conn: 本线程负责读取的套接字或管道句柄
+        """
+        try:
+            while True:
+                line = self._read_line(conn)
+                if line is None:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    response = json.loads(line.decode('utf-8'))
+                except ValueError as e:
+                    self.logger.error(f"解析响应失败: {e}")
+                    continue
+
+                self._dispatch_response(response)
+        except Exception as e:
+            if self.connected:
+                self.logger.error(f"读取响应失败: {e}")
+        finally:
+            if self.socket is conn and self.connected:
+                self.logger.warning("服务连接已关闭")
+                self.connected = False
+            self._fail_pending(ConnectionError("服务连接已关闭"))
+
+    def _dispatch_response(self, response: Dict[str, Any]):
+        """
+        将响应交给对应的在途请求
+
+        Args:
+            response: 服务端响应
+        """
+        response_id = response.get("id", "")
+        with self._pending_lock:
+            if response.get("type") in SERVICE_EVENT_TYPES:
+                events = self._subscriptions.get(response_id)
+                if events is not None:
+                    events.put(response)
+                    return
+            future = self._pending.pop(response_id, None)
+
+        if future is None:
+            self.logger.warning(f"收到无法匹配的响应: {response.get('error') or response.get('type')}")
+            return
+
+        self.logger.debug(f"收到响应: {response.get('type', 'unknown')}")
+        if not future.done():
+            future.set_result(response)
+
+    def _fail_pending(self, error: Exception):
+        """
+        使所有在途请求以异常结束
+
+        Args:
+            error: 要设置的异常
+        """
+        with self._pending_lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+            # 通知所有订阅连接已断开
+            for events in self._subscriptions.values():
+                events.put(None)
+
+        for future in pending:
+            if not future.done():
+                future.set_exception(error)
+
+    def _build_message(self, msg_type: str, data: Dict[str, Any]) -> Tuple[str, bytes]:
+        """
+        构建一条换行分隔的JSON消息
+
         Args:
             msg_type: 消息类型
             data: 消息数据
-            
+
         Returns:
-            Dict: 服务端响应，失败时返回None
+            Tuple[str, bytes]: (消息ID, 编码后的消息)
         """
-        if not self.connected:
-            self.logger.error("未连接到服务")
-            return None
-            
+        message_id = str(uuid.uuid4())
         message = {
-            "id": str(uuid.uuid4()),
+            "id": message_id,
             "type": msg_type,
             "data": data,
             "timestamp": int(time.time())
         }
-        
+        json_str = json.dumps(message, ensure_ascii=False)
+        return message_id, (json_str + '\n').encode('utf-8')
+
+    def submit_messages(self, messages: List[Tuple[str, Dict[str, Any]]]) -> List[Future]:
+        """
+        一次写入多条消息，不等待响应
+
+        Args:
+            messages: (消息类型, 消息数据) 列表
+
+        Returns:
+            List[Future]: 与messages顺序一致的Future，结果为服务端响应
+        """
+        ids = []
+        frames = []
+        for msg_type, data in messages:
+            message_id, frame = self._build_message(msg_type, data)
+            ids.append(message_id)
+            frames.append(frame)
+
+        futures = self._submit_frames(ids, frames)
+        self.logger.debug(f"发送消息: {[msg_type for msg_type, _ in messages]}")
+        return futures
+
+    def _submit_frames(self, ids: List[str], frames: List[bytes]) -> List[Future]:
+        """
+        登记在途请求并一次写入已编码的消息
+
+        Args:
+            ids: 消息ID列表
+            frames: 与ids对应的已编码消息
+
+        Returns:
+            List[Future]: 与ids顺序一致的Future
+        """
+        futures = [Future() for _ in ids]
+        if not self.connected:
+            for future in futures:
+                future.set_exception(ConnectionError("未连接到服务"))
+            return futures
+
+        # 先登记再写入，避免响应先于登记到达
+        with self._pending_lock:
+            for message_id, future in zip(ids, futures):
+                self._pending[message_id] = future
+
         try:
-            # 发送JSON消息
-            json_str = json.dumps(message, ensure_ascii=False)
-            message_bytes = (json_str + '\n').encode('utf-8')
+            # 合并为一次写入，减少系统调用次数
+            with self._write_lock:
+                self._write_all(b''.join(frames))
+        except Exception as e:
+            with self._pending_lock:
+                for message_id in ids:
+                    self._pending.pop(message_id, None)
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
 
-            if self.is_windows:
-                import win32file
-                win32file.WriteFile(self.socket, message_bytes)
-            else:
-                self.socket.send(message_bytes)
-            
-            self.logger.debug(f"发送消息: {msg_type}")
-
-            # 接收响应
-            if self.is_windows:
-                import win32file
-                result, response_data = win32file.ReadFile(self.socket, 4096)
-            else:
-                response_data = self.socket.recv(4096)
+        return futures
 
-            if response_data:
-                response_str = response_data.decode('utf-8').strip()
-                response = json.loads(response_str)
-                self.logger.debug(f"收到响应: {response.get('type', 'unknown')}")
-                return response
-            else:
-                self.logger.error("未收到响应")
-                return None
-                
+    def _wait_response(self, future: Future, timeout: float = SERVICE_REQUEST_TIMEOUT) -> Optional[Dict[str, Any]]:
+        """
+        等待单个请求的响应
+
+        Args:
+            future: submit_messages返回的Future
+            timeout: 等待超时时间（秒）
+
+        Returns:
+            Dict: 服务端响应，失败时返回None
+        """
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            # 移除在途登记，避免慢响应的请求不断累积，迟到的响应按无法匹配处理
+            with self._pending_lock:
+                for message_id, pending in self._pending.items():
+                    if pending is future:
+                        del self._pending[message_id]
+                        break
+            self.logger.error(f"等待响应超时（{timeout}秒）")
         except Exception as e:
             self.logger.error(f"发送消息失败: {e}")
-            return None
-            
-    def start_session(self) -> bool:
+        return None
+
+    def _send_messages(self, messages: List[Tuple[str, Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
         """
-        启动处理会话
-        
+        一次写入多条消息并等待全部响应
+
+        Args:
+            messages: (消息类型, 消息数据) 列表
+
         Returns:
-            bool: 是否成功启动会话
+            List[Dict]: 与messages顺序一致的响应列表，失败的位置为None
+        """
+        futures = self.submit_messages(messages)
+        deadline = time.monotonic() + SERVICE_REQUEST_TIMEOUT
+        return [self._wait_response(future, max(0.0, deadline - time.monotonic())) for future in futures]
+
+    def _send_message(self, msg_type: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        发送消息到服务端
+
+        Args:
+            msg_type: 消息类型
+            data: 消息数据
+
+        Returns:
+            Dict: 服务端响应，失败时返回None
+        """
+        return self._send_messages([(msg_type, data)])[0]
+
+    def create_session(self) -> Optional[str]:
+        """
+        创建新的处理会话（不影响当前会话）
+
+        同一连接上可以并行存在多个会话，后续调用通过session_id参数指定会话。
+
+        Returns:
+            str: 会话ID，失败时返回None
         """
         response = self._send_message("start_session", {})
-        
+
         if response and response.get("success"):
-            self.session_id = response.get("data", {}).get("session_id")
-            self.logger.info(f"启动会话成功: {self.session_id}")
-            return True
+            session_id = response.get("data", {}).get("session_id")
+            self.logger.info(f"启动会话成功: {session_id}")
+            return session_id
         else:
             error = response.get("error", "未知错误") if response else "无响应"
             self.logger.error(f"启动会话失败: {error}")
-            return False
-            
-    def add_files(self, files: List[Dict[str, str]]) -> bool:
+            return None
+
+    def start_session(self) -> bool:
+        """
+        启动处理会话并设为当前会话
+
+        Returns:
+            bool: 是否成功启动会话
+        """
+        session_id = self.create_session()
+        if session_id:
+            self.session_id = session_id
+            return True
+        return False
+
+    def add_files(self, files: List[Dict[str, str]], session_id: str = None) -> bool:
         """
         添加文件到处理队列
-        
+
         Args:
             files: 文件列表，每个文件包含input_path和可选的output_path
-            
+            session_id: 会话ID，默认使用当前会话
+
         Returns:
             bool: 是否成功添加文件
         """
-        if not self.session_id:
+        session_id = session_id or self.session_id
+        if not session_id:
             self.logger.error("未启动会话")
             return False
-            
-        data = {
-            "session_id": self.session_id,
-            "files": files
-        }
-        
-        response = self._send_message("add_files", data)
-        
-        if response and response.get("success"):
-            added_count = response.get("data", {}).get("added_count", 0)
-            self.logger.info(f"成功添加 {added_count} 个文件")
+
+        # 大量文件拆分为多条消息，合并为一次写入后并行等待响应
+        messages = [
+            ("add_files", {
+                "session_id": session_id,
+                "files": files[i:i + SERVICE_ADD_FILES_CHUNK_SIZE]
+            })
+            for i in range(0, len(files), SERVICE_ADD_FILES_CHUNK_SIZE)
+        ]
+        if not messages:
             return True
-        else:
-            error = response.get("error", "未知错误") if response else "无响应"
-            self.logger.error(f"添加文件失败: {error}")
-            return False
-            
-    def start_processing(self, options: Dict[str, Any] = None) -> bool:
+
+        added_count = 0
+        for response in self._send_messages(messages):
+            if response and response.get("success"):
+                added_count += response.get("data", {}).get("added_count", 0)
+            else:
+                error = response.get("error", "未知错误") if response else "无响应"
+                self.logger.error(f"添加文件失败: {error}")
+                return False
+
+        self.logger.info(f"成功添加 {added_count} 个文件")
+        return True
+
+    def start_processing(self, options: Dict[str, Any] = None, session_id: str = None) -> bool:
         """
         开始处理文件
-        
+
         Args:
             options: 处理选项
-            
+            session_id: 会话ID，默认使用当前会话
+
         Returns:
             bool: 是否成功开始处理
         """
-        if not self.session_id:
+        session_id = session_id or self.session_id
+        if not session_id:
             self.logger.error("未启动会话")
             return False
-            
+
         if options is None:
             options = {
                 "remove_source": False,
@@ -245,14 +679,14 @@ class ServiceClient:
                 "skip_noop": True,
                 "naming_format": "auto"
             }
-            
+
         data = {
-            "session_id": self.session_id,
+            "session_id": session_id,
             "options": options
         }
-        
+
         response = self._send_message("start_processing", data)
-        
+
         if response and response.get("success"):
             self.logger.info("开始处理文件")
             return True
@@ -260,42 +694,151 @@ class ServiceClient:
             error = response.get("error", "未知错误") if response else "无响应"
             self.logger.error(f"开始处理失败: {error}")
             return False
-            
-    def get_progress(self) -> Optional[Dict[str, Any]]:
+
+    def get_progress(self, session_id: str = None) -> Optional[Dict[str, Any]]:
         """
         获取处理进度
-        
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
         Returns:
             Dict: 进度信息，失败时返回None
         """
-        if not self.session_id:
+        session_id = session_id or self.session_id
+        if not session_id:
             self.logger.error("未启动会话")
             return None
-            
-        data = {"session_id": self.session_id}
+
+        data = {"session_id": session_id}
         response = self._send_message("get_progress", data)
-        
+
         if response and response.get("success"):
             return response.get("data", {})
         else:
             error = response.get("error", "未知错误") if response else "无响应"
             self.logger.error(f"获取进度失败: {error}")
             return None
-            
-    def stop_processing(self) -> bool:
+
+    def get_results(self, session_id: str = None, offset: int = 0,
+                    limit: int = SERVICE_RESULTS_PAGE_SIZE) -> Optional[Dict[str, Any]]:
+        """
+        分页获取会话中已完成文件的处理结果
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+            offset: 起始位置
+            limit: 本页最多返回的结果数
+
+        Returns:
+            Dict: 包含results、next_offset、has_more、finished等字段，失败时返回None
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return None
+
+        data = {"session_id": session_id, "offset": offset, "limit": limit}
+        response = self._send_message("get_results", data)
+
+        if response and response.get("success"):
+            return response.get("data", {})
+        else:
+            error = response.get("error", "未知错误") if response else "无响应"
+            self.logger.error(f"获取处理结果失败: {error}")
+            return None
+
+    def iter_results(self, session_id: str = None, offset: int = 0,
+                     page_size: int = SERVICE_RESULTS_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        逐页读取会话的处理结果，每次只在内存中保留一页
+
+        只读取调用时已完成的结果；处理仍在进行时，可记下已读取数量稍后从该位置继续。
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+            offset: 起始位置
+            page_size: 每页结果数
+
+        Yields:
+            Dict: 单个文件的处理结果
+
+        Raises:
+            ConnectionError: 读取某一页失败
+        """
+        while True:
+            page = self.get_results(session_id, offset, page_size)
+            if page is None:
+                raise ConnectionError("获取处理结果失败")
+
+            yield from page.get("results") or []
+
+            next_offset = page.get("next_offset", offset)
+            if not page.get("has_more") or next_offset <= offset:
+                return
+            offset = next_offset
+
+    def subscribe_progress(self, session_id: str = None) -> Optional['ProgressSubscription']:
+        """
+        订阅会话进度，服务端会在每个文件完成时主动推送事件
+
+        应在start_processing之前订阅，以免错过最早完成的文件。
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
+        Returns:
+            ProgressSubscription: 订阅对象，迭代即可得到事件；失败时返回None
+        """
+        session_id = session_id or self.session_id
+        if not session_id:
+            self.logger.error("未启动会话")
+            return None
+
+        message_id, frame = self._build_message("subscribe", {"session_id": session_id})
+        events = queue.Queue()
+        with self._pending_lock:
+            self._subscriptions[message_id] = events
+
+        response = self._wait_response(self._submit_frames([message_id], [frame])[0])
+
+        if response and response.get("success"):
+            self.logger.debug(f"订阅会话进度成功: {session_id}")
+            return ProgressSubscription(self, session_id, message_id, events, response.get("data", {}))
+
+        self._remove_subscription(message_id)
+        error = response.get("error", "未知错误") if response else "无响应"
+        self.logger.error(f"订阅会话进度失败: {error}")
+        return None
+
+    def _remove_subscription(self, subscription_id: str):
+        """
+        移除本地订阅登记
+
+        Args:
+            subscription_id: 订阅消息ID
+        """
+        with self._pending_lock:
+            self._subscriptions.pop(subscription_id, None)
+
+    def stop_processing(self, session_id: str = None) -> bool:
         """
         停止处理
-        
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
         Returns:
             bool: 是否成功停止处理
         """
-        if not self.session_id:
+        session_id = session_id or self.session_id
+        if not session_id:
             self.logger.error("未启动会话")
             return False
-            
-        data = {"session_id": self.session_id}
+
+        data = {"session_id": session_id}
         response = self._send_message("stop_processing", data)
-        
+
         if response and response.get("success"):
             self.logger.info("停止处理成功")
             return True
@@ -303,37 +846,132 @@ class ServiceClient:
             error = response.get("error", "未知错误") if response else "无响应"
             self.logger.error(f"停止处理失败: {error}")
             return False
-            
-    def end_session(self) -> bool:
+
+    def end_session(self, session_id: str = None) -> bool:
         """
         结束会话
-        
+
+        Args:
+            session_id: 会话ID，默认使用当前会话
+
         Returns:
             bool: 是否成功结束会话
         """
-        if not self.session_id:
+        is_current = session_id is None or session_id == self.session_id
+        session_id = session_id or self.session_id
+        if not session_id:
             return True  # 没有会话，认为已结束
-            
-        data = {"session_id": self.session_id}
+
+        data = {"session_id": session_id}
         response = self._send_message("end_session", data)
-        
+
+        if is_current:
+            self.session_id = None  # 失败时也强制清除会话ID
+
         if response and response.get("success"):
             self.logger.info("结束会话成功")
-            self.session_id = None
             return True
         else:
             error = response.get("error", "未知错误") if response else "无响应"
             self.logger.error(f"结束会话失败: {error}")
-            self.session_id = None  # 强制清除会话ID
             return False
-            
+
     def __enter__(self):
         """上下文管理器入口"""
         self.connect()
         return self
-        
+
     def __exit__(self, exc_type, exc_val, exc_tb):
         """上下文管理器出口"""
         if self.session_id:
             self.end_session()
         self.disconnect()
+
+
+class ProgressSubscription:
+    """
+    会话进度订阅
+
+    迭代得到服务端推送的事件字典，type字段为事件类型：
+    file_started（单个文件开始处理，包含input_path）、
+    file_completed（单个文件完成，包含input_path/output_path/success/error/process_time_ms）、
+    session_finished（会话结束，包含最终统计），以及可选的heartbeat。
+    收到session_finished或连接断开后迭代结束。
+    """
+
+    def __init__(self, client: ServiceClient, session_id: str, subscription_id: str,
+                 events: queue.Queue, initial: Dict[str, Any]):
+        """
+        初始化订阅
+
+        Args:
+            client: 所属的服务客户端
+            session_id: 会话ID
+            subscription_id: 订阅消息ID
+            events: 读取线程投递事件的队列
+            initial: 订阅响应中的会话状态
+        """
+        self.client = client
+        self.session_id = session_id
+        self.subscription_id = subscription_id
+        self.finished = bool(initial.get("finished"))
+        self._events = events
+        self._initial = initial
+        self._closed = False
+
+    def events(self, heartbeat: float = None) -> Iterator[Dict[str, Any]]:
+        """
+        迭代推送事件
+
+        Args:
+            heartbeat: 超过该时间（秒）没有事件时产出一个heartbeat事件，
+                便于调用方检查超时或停止标志；为None时一直阻塞等待
+
+        Yields:
+            Dict: 事件数据
+        """
+        try:
+            if self.finished:
+                # 订阅时会话已结束，直接给出最终结果
+                event = dict(self._initial)
+                event["type"] = "session_finished"
+                yield event
+                return
+
+            while True:
+                try:
+                    message = self._events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield {"type": "heartbeat", "session_id": self.session_id}
+                    continue
+
+                if message is None:
+                    self.client.logger.warning("订阅过程中服务连接已断开")
+                    return
+
+                event = dict(message.get("data") or {})
+                event["type"] = message.get("type")
+                yield event
+
+                if event["type"] == "session_finished":
+                    self.finished = True
+                    return
+        finally:
+            self.close()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.events()
+
+    def close(self):
+        """取消订阅"""
+        if self._closed:
+            return
+        self._closed = True
+        self.client._remove_subscription(self.subscription_id)
+
+        # 会话未结束时通知服务端停止推送（不等待响应）
+        if not self.finished and self.client.connected:
+            self.client.submit_messages([("unsubscribe", {
+                "session_id": self.session_id,
+                "subscription_id": self.subscription_id
+            })])
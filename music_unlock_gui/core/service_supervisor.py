@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务监管器 - 负责管理多个um服务实例的启动、健康检查、崩溃重启和负载均衡
+"""
+
+import heapq
+import logging
+import math
+import os
+import platform
+import signal
+import subprocess
+import threading
+import time
+from typing import List, Optional, Tuple, Dict, Any
+
+from .constants import (
+    SERVICE_STARTUP_TIMEOUT,
+    SERVICE_REQUIRED_CAPABILITIES,
+    SERVICE_MAX_INSTANCES,
+    SERVICE_WORKERS_PER_INSTANCE,
+    SERVICE_MIN_FILES_PER_INSTANCE,
+    SERVICE_HEALTH_INTERVAL,
+    SERVICE_RESTART_BACKOFF_BASE,
+    SERVICE_RESTART_BACKOFF_MAX,
+    LOG_FORMAT
+)
+from .service_client import ServiceClient
+
+
+class ServiceInstance:
+    """单个um服务实例"""
+
+    def __init__(self, index: int, service_path: str):
+        """
+        初始化服务实例
+
+        Args:
+            index: 实例序号
+            service_path: 实例的套接字路径或命名管道名
+        """
+        self.index = index
+        self.service_path = service_path
+        self.client = ServiceClient(service_path)
+        # 由本监管器启动的进程；复用已运行的服务时为None
+        self.process: Optional[subprocess.Popen] = None
+        # 握手返回的服务信息
+        self.info: Optional[Dict[str, Any]] = None
+        self.healthy = False
+        # 已分配但尚未完成的文件数
+        self.queue_depth = 0
+        self.restart_count = 0
+        # 有文件卡住时置位：进程可能还能响应ping，不能只重新连接，必须结束进程后重启
+        self.force_restart = False
+        # 连续启动失败次数及下次允许重启的时间
+        self.start_failures = 0
+        self.next_start_at = 0.0
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"ServiceInstance({self.index}, {self.service_path!r}, healthy={self.healthy})"
+
+
+class ServiceSupervisor:
+    """
+    服务监管器
+
+    持有N个独立的um --service进程（各自使用不同的--service-pipe），
+    定期健康检查并重启崩溃或无响应的实例，按队列深度把文件分配给各实例。
+    单个Go进程的worker数有上限，多核机器上多个实例可以提高总吞吐量。
+    """
+
+    def __init__(self, um_exe_path: str, instance_count: int = None, base_path: str = None):
+        """
+        初始化服务监管器
+
+        Args:
+            um_exe_path: um可执行文件路径
+            instance_count: 服务实例数量，默认按CPU核心数计算
+            base_path: 第一个实例的服务路径，其余实例在此基础上加序号
+        """
+        self.um_exe_path = um_exe_path
+        self.logger = self._setup_logger()
+
+        if instance_count is None:
+            instance_count = self.default_instance_count()
+
+        base_path = base_path or ServiceClient().service_path
+        self.instances = [ServiceInstance(index, self._instance_path(base_path, index))
+                          for index in range(max(1, instance_count))]
+
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._monitor_thread: Optional[threading.Thread] = None
+        # 首轮启动结束（无论成功与否）时置位
+        self.ready = threading.Event()
+
+    def _setup_logger(self) -> logging.Logger:
+        """设置日志记录器"""
+        logger = logging.getLogger('ServiceSupervisor')
+        logger.setLevel(logging.INFO)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(LOG_FORMAT)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        return logger
+
+    @staticmethod
+    def default_instance_count() -> int:
+        """
+        根据CPU核心数计算服务实例数量
+
+        Go批处理器的worker数为CPU核心数的2~3倍，但单进程上限为20，
+        核心数较多时单个实例无法用满CPU。
+
+        Returns:
+            int: 实例数量
+        """
+        cpu_count = os.cpu_count() or 1
+        count = math.ceil(cpu_count * 2 / SERVICE_WORKERS_PER_INSTANCE)
+        return max(1, min(count, SERVICE_MAX_INSTANCES))
+
+    @staticmethod
+    def _instance_path(base_path: str, index: int) -> str:
+        """
+        计算实例的服务路径，第一个实例使用默认路径以便与其他进程共享
+
+        Args:
+            base_path: 基础路径
+            index: 实例序号
+
+        Returns:
+            str: 实例的服务路径
+        """
+        if index == 0:
+            return base_path
+        root, ext = os.path.splitext(base_path)
+        return f"{root}_{index}{ext}"
+
+    def start(self):
+        """在后台线程中启动所有实例并开始健康检查，不阻塞调用方"""
+        if self._monitor_thread and self._monitor_thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._monitor_thread = threading.Thread(target=self._monitor_loop, name="ServiceSupervisor", daemon=True)
+        self._monitor_thread.start()
+
+    def stop(self):
+        """停止健康检查并断开所有实例的连接（服务进程保持运行，供下次复用）"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._monitor_thread and self._monitor_thread is not threading.current_thread():
+            self._monitor_thread.join(timeout=2.0)
+        self._monitor_thread = None
+
+        for instance in self.instances:
+            instance.healthy = False
+            instance.client.disconnect()
+
+    def _monitor_loop(self):
+        """首轮并行启动所有实例，之后定期健康检查"""
+        try:
+            threads = [threading.Thread(target=self._start_instance, args=(instance,),
+                                        name=f"ServiceStartup-{instance.index}", daemon=True)
+                       for instance in self.instances]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            healthy = len(self.healthy_instances())
+            if healthy:
+                self.logger.info(f"服务模式已启用，可用实例 {healthy}/{len(self.instances)}")
+            else:
+                self.logger.warning("没有可用的服务实例，将使用传统模式")
+        finally:
+            self.ready.set()
+
+        while not self._stop_event.is_set():
+            self._wake_event.wait(SERVICE_HEALTH_INTERVAL)
+            self._wake_event.clear()
+            if self._stop_event.is_set():
+                return
+
+            for instance in self.instances:
+                if self._stop_event.is_set():
+                    return
+                try:
+                    self._check_instance(instance)
+                except Exception as e:
+                    self.logger.error(f"检查服务实例 {instance.index} 时出错: {e}")
+
+    def _check_instance(self, instance: ServiceInstance):
+        """
+        检查单个实例，不健康时按退避时间重启
+
+        Args:
+            instance: 服务实例
+        """
+        if instance.healthy:
+            crashed = instance.process is not None and instance.process.poll() is not None
+            if not crashed and instance.client.connected and instance.client.ping():
+                return
+            self.mark_failed(instance, "进程已退出" if crashed else "无响应")
+
+        if time.monotonic() < instance.next_start_at:
+            return
+
+        instance.client.disconnect()
+        if instance.force_restart:
+            self.logger.info(f"强制重启服务实例 {instance.index}")
+            with instance.lock:
+                terminated = self._terminate(instance)
+            if not terminated:
+                self.logger.warning(f"无法确认服务实例 {instance.index} 已结束，稍后重试")
+                instance.next_start_at = time.monotonic() + SERVICE_RESTART_BACKOFF_BASE
+                return
+            instance.force_restart = False
+        elif not (instance.client.connect(timeout=1.0, quiet=True) and instance.client.ping()):
+            # 只是连接断开时重新连接即可，不必结束仍在为其他进程服务的实例
+            self.logger.info(f"重启服务实例 {instance.index}")
+            with instance.lock:
+                self._terminate(instance)
+        if self._start_instance(instance):
+            instance.restart_count += 1
+
+    def _start_instance(self, instance: ServiceInstance) -> bool:
+        """
+        连接已运行的服务，未运行或版本不一致时启动新的服务进程
+
+        Args:
+            instance: 服务实例
+
+        Returns:
+            bool: 实例是否可用
+        """
+        with instance.lock:
+            try:
+                ok = self._connect_or_spawn(instance)
+            except Exception as e:
+                self.logger.warning(f"启动服务实例 {instance.index} 失败: {e}")
+                ok = False
+
+            if ok:
+                instance.start_failures = 0
+                instance.next_start_at = 0.0
+            else:
+                instance.client.disconnect()
+                delay = min(SERVICE_RESTART_BACKOFF_BASE * (2 ** instance.start_failures), SERVICE_RESTART_BACKOFF_MAX)
+                instance.start_failures += 1
+                instance.next_start_at = time.monotonic() + delay
+            instance.healthy = ok
+            return ok
+
+    def _connect_or_spawn(self, instance: ServiceInstance) -> bool:
+        """
+        复用与当前um可执行文件一致的服务，否则请旧服务退出后重新启动
+
+        Args:
+            instance: 服务实例
+
+        Returns:
+            bool: 实例是否可用
+        """
+        client = instance.client
+        if client.connect(timeout=2.0, quiet=True) and client.ping():
+            if self._check_compatible(instance):
+                self.logger.info(f"复用已运行的服务实例 {instance.index}（版本 {instance.info.get('version')}）")
+                return True
+
+            self.logger.info(f"服务实例 {instance.index} 与当前um不一致，请求其退出")
+            if not client.shutdown():
+                self.logger.warning(f"无法停止旧的服务实例 {instance.index}")
+                return False
+
+        client.disconnect()
+        if not self._spawn(instance):
+            return False
+
+        start_time = time.monotonic()
+        if not client.wait_until_ready(SERVICE_STARTUP_TIMEOUT):
+            self.logger.warning(f"服务实例 {instance.index} 启动后仍无法连接")
+            return False
+        if not self._check_compatible(instance):
+            self.logger.warning(f"新启动的服务实例 {instance.index} 握手失败")
+            return False
+
+        self.logger.info(f"服务实例 {instance.index} 已就绪（启动耗时 {(time.monotonic() - start_time) * 1000:.0f}ms）")
+        return True
+
+    def _check_compatible(self, instance: ServiceInstance) -> bool:
+        """
+        通过握手检查服务是否由当前um可执行文件启动且支持所需的协议能力
+
+        Args:
+            instance: 服务实例
+
+        Returns:
+            bool: 是否可以复用该服务
+        """
+        info = instance.client.hello()
+        if info is None:
+            self.logger.info(f"服务实例 {instance.index} 不支持握手，视为旧版本")
+            return False
+
+        missing = [cap for cap in SERVICE_REQUIRED_CAPABILITIES if cap not in info.get("capabilities", [])]
+        if missing:
+            self.logger.info(f"服务实例 {instance.index} 缺少协议能力: {missing}")
+            return False
+
+        binary = info.get("binary") or {}
+        try:
+            stat = os.stat(os.path.realpath(self.um_exe_path))
+        except OSError as e:
+            self.logger.warning(f"读取um可执行文件信息失败: {e}")
+            return False
+
+        if binary.get("size") != stat.st_size or binary.get("mod_time") != int(stat.st_mtime):
+            self.logger.info(f"服务实例 {instance.index} 的可执行文件已变化: {binary.get('path')}")
+            return False
+
+        instance.info = info
+        return True
+
+    def _spawn(self, instance: ServiceInstance) -> bool:
+        """
+        启动服务进程
+
+        服务进程与GUI脱离（独立会话/进程组），GUI退出后继续运行，供下次启动复用。
+
+        Args:
+            instance: 服务实例
+
+        Returns:
+            bool: 是否成功启动进程
+        """
+        try:
+            cmd = [self.um_exe_path, "--service", "--service-pipe", instance.service_path]
+            kwargs = {}
+            if platform.system() == "Windows":
+                kwargs['creationflags'] = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+            else:
+                kwargs['start_new_session'] = True
+
+            instance.process = subprocess.Popen(cmd,
+                                                stdin=subprocess.DEVNULL,
+                                                stdout=subprocess.DEVNULL,
+                                                stderr=subprocess.DEVNULL,
+                                                cwd=os.path.dirname(os.path.abspath(self.um_exe_path)),
+                                                **kwargs)
+            return True
+        except Exception as e:
+            self.logger.error(f"启动服务实例 {instance.index} 失败: {e}")
+            return False
+
+    def _terminate(self, instance: ServiceInstance) -> bool:
+        """
+        结束无响应的服务进程，释放其监听地址
+
+        Args:
+            instance: 服务实例
+
+        Returns:
+            bool: 是否确认进程已经结束（不再写入任何输出文件）
+        """
+        instance.client.disconnect()
+
+        if instance.process is not None:
+            if instance.process.poll() is None:
+                instance.process.kill()
+                try:
+                    instance.process.wait(timeout=2.0)
+                except subprocess.TimeoutExpired:
+                    self.logger.warning(f"服务实例 {instance.index} 未能及时退出")
+                    return False
+            instance.process = None
+            return True
+
+        # 复用的服务不是本进程启动的，按握手时得到的进程号结束
+        pid = (instance.info or {}).get("pid")
+        if not pid:
+            # 不知道进程号时只能以监听地址不再接受连接作为已结束的依据
+            return not instance.client.connect(timeout=1.0, quiet=True)
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass
+        exited = self._wait_exit(instance, pid, 2.0)
+        if not exited and hasattr(signal, "SIGKILL"):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except OSError:
+                pass
+            exited = self._wait_exit(instance, pid, 1.0)
+        if exited:
+            instance.info = None
+        else:
+            self.logger.warning(f"服务实例 {instance.index}（进程 {pid}）未能及时退出")
+        return exited
+
+    @staticmethod
+    def _wait_exit(instance: ServiceInstance, pid: int, timeout: float) -> bool:
+        """
+        等待不是本进程启动的服务进程退出
+
+        Args:
+            instance: 服务实例
+            pid: 服务进程号
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 进程是否已退出
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            if platform.system() == "Windows":
+                # Windows上os.kill(pid, 0)会结束进程，改为检查命名管道是否还能连接
+                alive = instance.client.connect(timeout=0.2, quiet=True)
+                instance.client.disconnect()
+            else:
+                try:
+                    os.kill(pid, 0)
+                    alive = True
+                except ProcessLookupError:
+                    alive = False
+                except OSError:
+                    alive = True
+            if not alive:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.1)
+
+    def mark_failed(self, instance: ServiceInstance, reason: str):
+        """
+        标记实例不可用，由健康检查线程尽快重启
+
+        Args:
+            instance: 服务实例
+            reason: 失败原因
+        """
+        if instance.healthy:
+            self.logger.warning(f"服务实例 {instance.index} 不可用: {reason}")
+        instance.healthy = False
+        self._wake_event.set()
+
+    def kill_instance(self, instance: ServiceInstance, reason: str) -> bool:
+        """
+        立即结束实例的服务进程（有文件卡住时使用），健康检查线程随后启动新进程
+
+        卡住的进程其他goroutine仍能响应ping，只标记不可用会被健康检查重新连接复用，
+        所以这里直接结束进程；无法确认结束时保留强制重启标记，健康检查不会复用该进程。
+
+        Args:
+            instance: 服务实例
+            reason: 结束原因
+
+        Returns:
+            bool: 是否确认进程已经结束
+        """
+        self.logger.warning(f"结束服务实例 {instance.index}: {reason}")
+        instance.healthy = False
+        instance.force_restart = True
+        with instance.lock:
+            confirmed = self._terminate(instance)
+        if confirmed:
+            instance.force_restart = False
+        self._wake_event.set()
+        return confirmed
+
+    def healthy_instances(self) -> List[ServiceInstance]:
+        """获取当前可用的实例列表"""
+        return [instance for instance in self.instances if instance.healthy]
+
+    def is_available(self) -> bool:
+        """是否至少有一个实例可用"""
+        return any(instance.healthy for instance in self.instances)
+
+    def assign(self, file_list: list, file_sizes: Optional[Dict[str, int]] = None) -> List[Tuple[ServiceInstance, list]]:
+        """
+        把文件分配给可用实例
+
+        文件较少时只使用部分实例（优先选择队列深度最小的实例），避免为少量文件拆分多个会话。
+        提供文件大小时按最长处理时间优先（LPT）分配：从大到小依次交给已分配字节数最少的实例；
+        否则按文件数均衡。分配的文件计入实例的队列深度，处理结束后需调用release。
+
+        Args:
+            file_list: 文件列表
+            file_sizes: 文件路径 -> 文件大小（可选）
+
+        Returns:
+            List[Tuple[ServiceInstance, list]]: (实例, 分配给该实例的文件)列表；没有可用实例时为空
+        """
+        with self._lock:
+            healthy = sorted(self.healthy_instances(), key=lambda instance: instance.queue_depth)
+            if not healthy or not file_list:
+                return []
+
+            parts = max(1, min(len(healthy), len(file_list) // SERVICE_MIN_FILES_PER_INSTANCE))
+            candidates = healthy[:parts]
+
+            if file_sizes:
+                ordered = sorted(file_list, key=lambda file_path: file_sizes.get(file_path, 0), reverse=True)
+            else:
+                ordered = file_list
+
+            heap = [(0, instance.queue_depth, position) for position, instance in enumerate(candidates)]
+            heapq.heapify(heap)
+            shards = [[] for _ in candidates]
+            for file_path in ordered:
+                load, depth, position = heapq.heappop(heap)
+                shards[position].append(file_path)
+                size = file_sizes.get(file_path, 0) if file_sizes else 0
+                heapq.heappush(heap, (load + size, depth + 1, position))
+
+            assignments = []
+            for instance, shard in zip(candidates, shards):
+                if shard:
+                    instance.queue_depth += len(shard)
+                    assignments.append((instance, shard))
+            return assignments
+
+    def release(self, instance: ServiceInstance, file_count: int):
+        """
+        归还分配给实例的队列深度
+
+        Args:
+            instance: 服务实例
+            file_count: 已处理结束的文件数
+        """
+        with self._lock:
+            instance.queue_depth = max(0, instance.queue_depth - file_count)
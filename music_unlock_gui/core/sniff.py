@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输出格式预测 - 移植internal/sniff/audio.go的文件头识别，
+配合各加密格式的文件头解密，只读取少量数据即可预测um输出的音频格式
+"""
+
+import hashlib
+import os
+import struct
+from typing import Callable, Dict, List, Optional
+
+from .constants import SNIFF_HEADER_SIZE
+
+_WMA_HEADER = bytes([
+    0x30, 0x26, 0xb2, 0x75, 0x8e, 0x66, 0xcf, 0x11,
+    0xa6, 0xd9, 0x00, 0xaa, 0x00, 0x62, 0xce, 0x6c,
+])
+
+
+# ---------------------------------------------------------------------------
+# 文件头识别（与internal/sniff/audio.go一致）
+# ---------------------------------------------------------------------------
+
+def _read_mpeg4_ftyp_box(header: bytes) -> Optional[tuple]:
+    """解析MPEG-4 ftyp box，返回(major_brand, compatible_brands)，不是有效的ftyp box时返回None"""
+    if len(header) < 8 or header[4:8] != b"ftyp":
+        return None
+
+    size = struct.unpack(">I", header[0:4])[0]
+    if size < 16 or size % 4 != 0:
+        return None
+
+    major_brand = header[8:12]
+    compatible_brands = []
+    i = 16
+    while i < size and i + 4 < len(header):
+        compatible_brands.append(header[i:i + 4])
+        i += 4
+    return major_brand, compatible_brands
+
+
+def _is_valid_mp3_frame(frame: bytes) -> bool:
+    """检查4字节是否为有效的MP3帧头"""
+    if frame[0] != 0xFF or (frame[1] & 0xE0) != 0xE0:
+        return False
+    if (frame[1] >> 3) & 0x03 == 1:  # 保留的MPEG版本
+        return False
+    if (frame[1] >> 1) & 0x03 == 0:  # 保留的layer
+        return False
+    bitrate = (frame[2] >> 4) & 0x0F
+    if bitrate == 0 or bitrate == 15:  # free或保留的比特率
+        return False
+    if (frame[2] >> 2) & 0x03 == 3:  # 保留的采样率
+        return False
+    return True
+
+
+def _sniff_mp3(header: bytes) -> bool:
+    """识别带或不带ID3v2标签的MP3"""
+    if len(header) < 4:
+        return False
+    if header.startswith(b"ID3"):
+        return True
+    return any(_is_valid_mp3_frame(header[i:i + 4]) for i in range(len(header) - 3))
+
+
+def audio_extension(header: bytes) -> Optional[str]:
+    """
+    根据文件头识别音频格式（建议至少16字节）
+
+    Args:
+        header: 解密后的音频文件头
+
+    Returns:
+        Optional[str]: 扩展名（如.flac），无法识别时返回None
+    """
+    # 先检查特征明确的格式，MP3最后检查以避免误判
+    if header.startswith(b"OggS"):
+        return ".ogg"
+    if header.startswith(b"fLaC"):
+        return ".flac"
+    if header.startswith(b"RIFF"):
+        return ".wav"
+    if header.startswith(b"FRM8"):
+        return ".dff"
+    if header.startswith(_WMA_HEADER):
+        return ".wma"
+
+    box = _read_mpeg4_ftyp_box(header)
+    if box is not None:
+        major_brand, compatible_brands = box
+        if major_brand == b"M4A " or b"M4A " in compatible_brands:
+            return ".m4a"
+        return ".mp4"
+
+    if _sniff_mp3(header):
+        return ".mp3"
+    return None
+
+
+def smart_fallback(input_ext: str) -> str:
+    """
+    无法识别时根据输入扩展名推测输出格式（与Go的getSmartFallback一致）
+
+    Args:
+        input_ext: 输入文件的最后一段扩展名
+
+    Returns:
+        str: 推测的扩展名
+    """
+    if input_ext in (".mgg", ".mgg0", ".mgg1", ".mgga", ".mggh", ".mggl", ".mggm", ".qmcogg"):
+        return ".ogg"
+    if input_ext in (".mflac", ".mflac0", ".mflac1", ".mflaca", ".mflach", ".mflacl", ".mflacm", ".qmcflac"):
+        return ".flac"
+    return ".mp3"
+
+
+def audio_extension_with_smart_fallback(header: bytes, input_ext: str) -> str:
+    """
+    识别音频格式，失败时根据输入扩展名推测（与Go的AudioExtensionWithSmartFallback一致）
+
+    Args:
+        header: 解密后的音频文件头
+        input_ext: 输入文件的最后一段扩展名
+
+    Returns:
+        str: 扩展名
+    """
+    return audio_extension(header) or smart_fallback(input_ext)
+
+
+# ---------------------------------------------------------------------------
+# AES-128-ECB解密（仅用于解开NCM文件中的密钥，数据量很小）
+# ---------------------------------------------------------------------------
+
+def _build_aes_tables() -> tuple:
+    """生成AES的S盒和逆S盒"""
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # p乘以3，q除以3（GF(2^8)）
+        p = p ^ ((p << 1) & 0xFF) ^ (0x1B if p & 0x80 else 0)
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xFF
+        if q & 0x80:
+            q ^= 0x09
+        rotated = q ^ ((q << 1 | q >> 7) & 0xFF) ^ ((q << 2 | q >> 6) & 0xFF) \
+            ^ ((q << 3 | q >> 5) & 0xFF) ^ ((q << 4 | q >> 4) & 0xFF)
+        sbox[p] = rotated ^ 0x63
+        if p == 1:
+            break
+    sbox[0] = 0x63
+
+    inv_sbox = [0] * 256
+    for i, value in enumerate(sbox):
+        inv_sbox[value] = i
+    return sbox, inv_sbox
+
+
+_AES_SBOX, _AES_INV_SBOX = _build_aes_tables()
+
+
+def _gmul(a: int, b: int) -> int:
+    """GF(2^8)乘法"""
+    result = 0
+    while b:
+        if b & 1:
+            result ^= a
+        a = ((a << 1) ^ 0x1B) & 0xFF if a & 0x80 else a << 1
+        b >>= 1
+    return result
+
+
+_MUL9, _MUL11, _MUL13, _MUL14 = ([_gmul(i, n) for i in range(256)] for n in (9, 11, 13, 14))
+
+
+def _aes128_round_keys(key: bytes) -> List[List[int]]:
+    """AES-128密钥扩展，返回11个16字节的轮密钥"""
+    words = [list(key[i:i + 4]) for i in range(0, 16, 4)]
+    rcon = 1
+    for i in range(4, 44):
+        word = list(words[i - 1])
+        if i % 4 == 0:
+            word = [_AES_SBOX[b] for b in word[1:] + word[:1]]
+            word[0] ^= rcon
+            rcon = ((rcon << 1) ^ 0x1B) & 0xFF if rcon & 0x80 else rcon << 1
+        words.append([a ^ b for a, b in zip(words[i - 4], word)])
+    return [sum(words[r * 4:r * 4 + 4], []) for r in range(11)]
+
+
+def _aes128_decrypt_block(block: bytes, round_keys: List[List[int]]) -> bytes:
+    """解密单个16字节分组"""
+    state = [b ^ k for b, k in zip(block, round_keys[10])]
+    for round_index in range(9, -1, -1):
+        # InvShiftRows + InvSubBytes
+        state = [_AES_INV_SBOX[state[(r + 4 * ((c - r) % 4))]] for c in range(4) for r in range(4)]
+        state = [b ^ k for b, k in zip(state, round_keys[round_index])]
+        if round_index == 0:
+            break
+        # InvMixColumns
+        mixed = []
+        for c in range(0, 16, 4):
+            a0, a1, a2, a3 = state[c:c + 4]
+            mixed += [
+                _MUL14[a0] ^ _MUL11[a1] ^ _MUL13[a2] ^ _MUL9[a3],
+                _MUL9[a0] ^ _MUL14[a1] ^ _MUL11[a2] ^ _MUL13[a3],
+                _MUL13[a0] ^ _MUL9[a1] ^ _MUL14[a2] ^ _MUL11[a3],
+                _MUL11[a0] ^ _MUL13[a1] ^ _MUL9[a2] ^ _MUL14[a3],
+            ]
+        state = mixed
+    return bytes(state)
+
+
+def aes128_ecb_decrypt(data: bytes, key: bytes) -> bytes:
+    """
+    AES-128-ECB解密并去除PKCS#7填充
+
+    Args:
+        data: 密文（长度为16的倍数）
+        key: 16字节密钥
+
+    Returns:
+        bytes: 明文
+    """
+    round_keys = _aes128_round_keys(key)
+    plain = b"".join(_aes128_decrypt_block(data[i:i + 16], round_keys)
+                     for i in range(0, len(data) - len(data) % 16, 16))
+    if plain and 0 < plain[-1] <= 16:
+        plain = plain[:-plain[-1]]
+    return plain
+
+
+# ---------------------------------------------------------------------------
+# 各加密格式的文件头解密（只解密开头SNIFF_HEADER_SIZE字节）
+# ---------------------------------------------------------------------------
+
+_NCM_MAGIC = b"CTENFDAM"
+_NCM_CORE_KEY = bytes([
+    0x68, 0x7a, 0x48, 0x52, 0x41, 0x6d, 0x73, 0x6f,
+    0x35, 0x6b, 0x49, 0x6e, 0x62, 0x61, 0x78, 0x57,
+])
+
+
+def _decrypt_ncm_header(f) -> Optional[bytes]:
+    """网易云音乐NCM：解开RC4密钥后生成256字节的密钥盒"""
+    if f.read(8) != _NCM_MAGIC:
+        return None
+    f.seek(2, os.SEEK_CUR)
+
+    key_len = struct.unpack("<I", f.read(4))[0]
+    key_raw = bytes(b ^ 0x64 for b in f.read(key_len))
+    key = aes128_ecb_decrypt(key_raw, _NCM_CORE_KEY)[17:]  # 去掉"neteasecloudmusic"前缀
+    if not key:
+        return None
+
+    meta_len = struct.unpack("<I", f.read(4))[0]
+    f.seek(meta_len + 5, os.SEEK_CUR)  # 元数据 + 5字节间隔
+    cover_frame_len = struct.unpack("<I", f.read(4))[0]
+    f.seek(cover_frame_len + 4, os.SEEK_CUR)
+    data = f.read(SNIFF_HEADER_SIZE)
+
+    box = list(range(256))
+    j = 0
+    for i in range(256):
+        j = (box[i] + j + key[i % len(key)]) & 0xFF
+        box[i], box[j] = box[j], box[i]
+    stream = []
+    for i in range(256):
+        n = (i + 1) & 0xFF
+        si = box[n]
+        sj = box[(n + si) & 0xFF]
+        stream.append(box[(si + sj) & 0xFF])
+
+    return bytes(b ^ stream[i & 0xFF] for i, b in enumerate(data))
+
+
+_KWM_MAGIC = (b"yeelion-kuwo-tme", b"yeelion-kuwo\x00\x00\x00\x00")
+_KWM_KEY = b"MoOtOiTvINGwd2E6n0E1i7L5t2IoOoNk"
+
+
+def _decrypt_kwm_header(f) -> Optional[bytes]:
+    """酷我音乐KWM：文件头中的密钥与固定密钥异或得到32字节掩码"""
+    header = f.read(0x400)
+    if len(header) < 0x400 or header[:0x10] not in _KWM_MAGIC:
+        return None
+
+    key_str = str(struct.unpack("<Q", header[0x18:0x20])[0]).encode()
+    if len(key_str) > 32:
+        key_str = key_str[:32]
+    elif len(key_str) < 32:
+        key_str = bytes(key_str[i % len(key_str)] for i in range(32))
+    mask = bytes(a ^ b for a, b in zip(_KWM_KEY, key_str))
+
+    data = f.read(SNIFF_HEADER_SIZE)
+    return bytes(b ^ mask[i & 0x1F] for i, b in enumerate(data))
+
+
+def _decrypt_xm_header(f) -> Optional[bytes]:
+    """虾米音乐XM：从指定偏移开始与单字节掩码异或"""
+    header = f.read(16)
+    if len(header) < 16 or header[:4] != b"ifmt" or header[8:12] != b"\xfe\xfe\xfe\xfe":
+        return None
+
+    encrypt_start = header[12] | header[13] << 8 | header[14] << 16
+    mask = header[15]
+    data = f.read(SNIFF_HEADER_SIZE)
+    return bytes(b ^ mask if i >= encrypt_start else b for i, b in enumerate(data))
+
+
+_TM_MAGIC = b"QQMU"
+_TM_REPLACE_HEADER = bytes([0x00, 0x00, 0x00, 0x20, 0x66, 0x74, 0x79, 0x70])
+
+
+def _decrypt_tm_header(f) -> Optional[bytes]:
+    """太合音乐TM：替换被改写的前8字节，或本身未加密"""
+    data = f.read(SNIFF_HEADER_SIZE)
+    if data.startswith(_TM_MAGIC):
+        return _TM_REPLACE_HEADER + data[8:]
+    if audio_extension(data[:8]):
+        return data
+    return None
+
+
+_QMC_STATIC_BOX = bytes([
+    0x77, 0x48, 0x32, 0x73, 0xDE, 0xF2, 0xC0, 0xC8, 0x95, 0xEC, 0x30, 0xB2, 0x51, 0xC3, 0xE1, 0xA0,
+    0x9E, 0xE6, 0x9D, 0xCF, 0xFA, 0x7F, 0x14, 0xD1, 0xCE, 0xB8, 0xDC, 0xC3, 0x4A, 0x67, 0x93, 0xD6,
+    0x28, 0xC2, 0x91, 0x70, 0xCA, 0x8D, 0xA2, 0xA4, 0xF0, 0x08, 0x61, 0x90, 0x7E, 0x6F, 0xA2, 0xE0,
+    0xEB, 0xAE, 0x3E, 0xB6, 0x67, 0xC7, 0x92, 0xF4, 0x91, 0xB5, 0xF6, 0x6C, 0x5E, 0x84, 0x40, 0xF7,
+    0xF3, 0x1B, 0x02, 0x7F, 0xD5, 0xAB, 0x41, 0x89, 0x28, 0xF4, 0x25, 0xCC, 0x52, 0x11, 0xAD, 0x43,
+    0x68, 0xA6, 0x41, 0x8B, 0x84, 0xB5, 0xFF, 0x2C, 0x92, 0x4A, 0x26, 0xD8, 0x47, 0x6A, 0x7C, 0x95,
+    0x61, 0xCC, 0xE6, 0xCB, 0xBB, 0x3F, 0x47, 0x58, 0x89, 0x75, 0xC3, 0x75, 0xA1, 0xD9, 0xAF, 0xCC,
+    0x08, 0x73, 0x17, 0xDC, 0xAA, 0x9A, 0xA2, 0x16, 0x41, 0xD8, 0xA2, 0x06, 0xC6, 0x8B, 0xFC, 0x66,
+    0x34, 0x9F, 0xCF, 0x18, 0x23, 0xA0, 0x0A, 0x74, 0xE7, 0x2B, 0x27, 0x70, 0x92, 0xE9, 0xAF, 0x37,
+    0xE6, 0x8C, 0xA7, 0xBC, 0x62, 0x65, 0x9C, 0xC2, 0x08, 0xC9, 0x88, 0xB3, 0xF3, 0x43, 0xAC, 0x74,
+    0x2C, 0x0F, 0xD4, 0xAF, 0xA1, 0xC3, 0x01, 0x64, 0x95, 0x4E, 0x48, 0x9F, 0xF4, 0x35, 0x78, 0x95,
+    0x7A, 0x39, 0xD6, 0x6A, 0xA0, 0x6D, 0x40, 0xE8, 0x4F, 0xA8, 0xEF, 0x11, 0x1D, 0xF3, 0x1B, 0x3F,
+    0x3F, 0x07, 0xDD, 0x6F, 0x5B, 0x19, 0x30, 0x19, 0xFB, 0xEF, 0x0E, 0x37, 0xF0, 0x0E, 0xCD, 0x16,
+    0x49, 0xFE, 0x53, 0x47, 0x13, 0x1A, 0xBD, 0xA4, 0xF1, 0x40, 0x19, 0x60, 0x0E, 0xED, 0x68, 0x09,
+    0x06, 0x5F, 0x4D, 0xCF, 0x3D, 0x1A, 0xFE, 0x20, 0x77, 0xE4, 0xD9, 0xDA, 0xF9, 0xA4, 0x2B, 0x76,
+    0x1C, 0x71, 0xDB, 0x00, 0xBC, 0xFD, 0x0C, 0x6C, 0xA5, 0x47, 0xF7, 0xF6, 0x00, 0x79, 0x4A, 0x11,
+])
+
+
+def _decrypt_qmc_header(f) -> Optional[bytes]:
+    """QQ音乐：只处理使用静态密码表的旧格式，文件尾带密钥的格式需要完整的密钥推导，返回None"""
+    f.seek(-4, os.SEEK_END)
+    suffix = f.read(4)
+    if suffix in (b"QTag", b"STag", b"cex\x00"):
+        return None
+    key_len = struct.unpack("<I", suffix)[0]
+    if 0 < key_len <= 0xFFFF:
+        return None
+
+    f.seek(0)
+    data = f.read(SNIFF_HEADER_SIZE)
+    return bytes(b ^ _QMC_STATIC_BOX[((i % 0x7FFF if i > 0x7FFF else i) ** 2 + 27) & 0xFF]
+                 for i, b in enumerate(data))
+
+
+_KGM_MAGIC = (
+    bytes([0x7C, 0xD5, 0x32, 0xEB, 0x86, 0x02, 0x7F, 0x4B, 0xA8, 0xAF, 0xA6, 0x8E, 0x0F, 0xFF, 0x99, 0x14]),
+    bytes([0x05, 0x28, 0xBC, 0x96, 0xE9, 0xE4, 0x5A, 0x43, 0x91, 0xAA, 0xBD, 0xD0, 0x7A, 0xF5, 0x36, 0x31]),
+)
+_KGM_V3_SLOT_KEYS = {1: bytes([0x6C, 0x2C, 0x2F, 0x27])}
+
+
+def _kugou_md5(data: bytes) -> bytes:
+    """酷狗的MD5变换：摘要按2字节一组倒序"""
+    digest = hashlib.md5(data).digest()
+    return b"".join(digest[14 - i:16 - i] for i in range(0, 16, 2))
+
+
+def _decrypt_kgm_header(f) -> Optional[bytes]:
+    """酷狗音乐KGM/VPR：只处理v3加密，v5需要酷狗客户端数据库，返回None"""
+    header = f.read(0x3C)
+    if len(header) < 0x3C or header[:16] not in _KGM_MAGIC:
+        return None
+
+    audio_offset, version, slot = struct.unpack("<III", header[0x10:0x1C])
+    slot_key = _KGM_V3_SLOT_KEYS.get(slot)
+    if version != 3 or slot_key is None:
+        return None
+
+    slot_box = _kugou_md5(slot_key)
+    file_box = _kugou_md5(header[0x2C:0x3C]) + b"\x6b"
+
+    f.seek(audio_offset)
+    data = bytearray(f.read(SNIFF_HEADER_SIZE))
+    for i in range(len(data)):
+        b = data[i] ^ file_box[i % len(file_box)]
+        b ^= (b << 4) & 0xFF
+        b ^= slot_box[i % len(slot_box)]
+        b ^= (i ^ i >> 8 ^ i >> 16 ^ i >> 24) & 0xFF
+        data[i] = b
+    return bytes(data)
+
+
+_HEADER_DECRYPTORS: Dict[str, Callable] = {
+    ".ncm": _decrypt_ncm_header,
+    ".kwm": _decrypt_kwm_header,
+    ".xm": _decrypt_xm_header,
+    **dict.fromkeys((".tm0", ".tm2", ".tm3", ".tm6"), _decrypt_tm_header),
+    **dict.fromkeys((".kgm", ".kgma", ".kgg", ".vpr", ".kgm.flac", ".vpr.flac"), _decrypt_kgm_header),
+    **dict.fromkeys((
+        ".qmc0", ".qmc2", ".qmc3", ".qmc4", ".qmc6", ".qmc8", ".qmcflac", ".qmcogg", ".tkm",
+        ".bkcmp3", ".bkcm4a", ".bkcflac", ".bkcwav", ".bkcape", ".bkcogg", ".bkcwma",
+        ".666c6163", ".6d7033", ".6f6767", ".6d3461", ".776176", ".mmp4",
+        ".mgg", ".mgg0", ".mgg1", ".mgga", ".mggh", ".mggl", ".mggm",
+        ".mflac", ".mflac0", ".mflac1", ".mflaca", ".mflach", ".mflacl", ".mflacm",
+    ), _decrypt_qmc_header),
+}
+
+# 无法廉价解密时，根据加密格式名推测输出格式
+_EXTENSION_HINTS = {
+    ".qmc0": ".mp3", ".qmc3": ".mp3", ".qmc2": ".m4a", ".qmc4": ".m4a", ".qmc6": ".m4a", ".qmc8": ".m4a",
+    ".tkm": ".m4a", ".mmp4": ".mp4",
+    ".bkcmp3": ".mp3", ".bkcm4a": ".m4a", ".bkcflac": ".flac", ".bkcwav": ".wav", ".bkcape": ".ape",
+    ".bkcogg": ".ogg", ".bkcwma": ".wma",
+    ".666c6163": ".flac", ".6d7033": ".mp3", ".6f6767": ".ogg", ".6d3461": ".m4a", ".776176": ".wav",
+    ".kgm.flac": ".flac", ".vpr.flac": ".flac",
+    ".tm0": ".mp3", ".tm3": ".mp3", ".tm2": ".m4a", ".tm6": ".m4a",
+}
+
+
+def decrypt_header(file_path: str, encrypted_ext: str) -> Optional[bytes]:
+    """
+    解密文件开头的音频数据
+
+    Args:
+        file_path: 加密文件路径
+        encrypted_ext: 匹配到的加密格式扩展名（小写，如.kgm.flac）
+
+    Returns:
+        Optional[bytes]: 解密后的音频文件头，格式不支持廉价解密或文件无效时返回None
+    """
+    decryptor = _HEADER_DECRYPTORS.get(encrypted_ext)
+    if decryptor is None:
+        return None
+    try:
+        with open(file_path, 'rb') as f:
+            return decryptor(f)
+    except (OSError, struct.error, IndexError, ValueError):
+        return None
+
+
+def predict_output_extension(file_path: str, encrypted_ext: str) -> str:
+    """
+    预测um解密后输出的音频扩展名
+
+    能解密文件头时与um使用相同的识别逻辑，结果一致；否则根据加密格式名推测。
+
+    Args:
+        file_path: 加密文件路径
+        encrypted_ext: 匹配到的加密格式扩展名（小写，如.kgm.flac）
+
+    Returns:
+        str: 扩展名（如.flac）
+    """
+    input_ext = os.path.splitext(file_path)[1]
+    header = decrypt_header(file_path, encrypted_ext)
+    if header is not None:
+        return audio_extension_with_smart_fallback(header, input_ext)
+    return _EXTENSION_HINTS.get(encrypted_ext) or smart_fallback(input_ext)
@@ -11,21 +11,26 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Callable, Optional
 import logging
 
+from .journal import BatchJournal
+
 
 class ThreadManager:
     """线程管理器类"""
     
-    def __init__(self, max_workers: int = 6):
+    def __init__(self, max_workers: int = 6, journal: Optional[BatchJournal] = None):
         """
         初始化线程管理器
         
         Args:
             max_workers: 最大工作线程数
+            journal: 批处理日志（可选），记录批处理的文件和结果，用于中断后继续转换
         """
         self.max_workers = max_workers
+        self.journal = journal
         self.executor: Optional[ThreadPoolExecutor] = None
         self.futures = []
         self.stop_event = threading.Event()
+        self.processor = None  # 当前任务使用的文件处理器，停止时通知其结束um进程
         self.logger = self._setup_logger()
         self.processing = False
     
@@ -63,6 +68,7 @@ class ThreadManager:
         
         self.processing = True
         self.stop_event.clear()
+        self._attach_processor(processor)
         
         # 创建线程池
         self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
@@ -113,6 +119,7 @@ class ThreadManager:
 
         self.processing = True
         self.stop_event.clear()
+        self._attach_processor(processor)
 
         self.logger.info(f"开始批处理模式处理 {len(file_list)} 个文件")
 
@@ -229,6 +236,17 @@ class ThreadManager:
             if self.executor:
                 self.executor.shutdown(wait=False)
     
+    def _attach_processor(self, processor):
+        """
+        记录当前任务使用的文件处理器并清除其上一次的停止标志
+
+        Args:
+            processor: 文件处理器实例
+        """
+        self.processor = processor
+        if processor is not None:
+            processor.reset_cancel()
+
     def stop_all(self):
         """停止所有正在进行的任务"""
         if not self.processing:
@@ -236,6 +254,10 @@ class ThreadManager:
         
         self.logger.info("正在停止所有任务...")
         self.stop_event.set()
+
+        # 结束正在运行的um进程，释放CPU和磁盘
+        if self.processor is not None:
+            self.processor.cancel()
         
         # 取消所有未开始的任务
         for future in self.futures:
@@ -318,6 +340,31 @@ class ThreadManager:
             'max_workers': self.max_workers
         }
 
+    def _post_file_result(self, message_queue: queue.Queue, result: dict):
+        """
+        将单个文件的处理结果发送给GUI
+
+        Args:
+            message_queue: 消息队列
+            result: 文件处理结果（ProcessResult）
+        """
+        file_path = result.get('input_path', '')
+
+        if result.get('success', False):
+            message_queue.put({
+                'type': 'success',
+                'file_path': file_path,
+                'message': result.get('message', '转换成功')
+            })
+        else:
+            error_msg = result.get('error', '未知错误')
+            message_queue.put({
+                'type': 'error',
+                'file_path': file_path,
+                'message': error_msg
+            })
+            self.logger.error(f"文件处理失败: {file_path}, 错误: {error_msg}")
+
     def _process_batch(self, file_list: List[str], output_dir: str = None,
                       processor=None, message_queue: queue.Queue = None,
                       use_source_dir: bool = False, naming_format: str = "auto"):
@@ -331,12 +378,17 @@ class ThreadManager:
             message_queue: 消息队列
             use_source_dir: 是否使用源文件目录
         """
+        completed = False
         try:
             if self.stop_event.is_set():
                 return
 
             self.logger.info(f"开始批处理 {len(file_list)} 个文件")
 
+            # 先把文件列表写入日志，中途崩溃后可以继续处理没有结果的文件
+            if self.journal is not None:
+                self.journal.begin(file_list, output_dir, use_source_dir, naming_format)
+
             # 发送开始消息
             if message_queue:
                 message_queue.put({
@@ -344,40 +396,31 @@ class ThreadManager:
                     'total_files': len(file_list)
                 })
 
+            # 每个文件完成时立即转发给GUI
+            def result_callback(result: dict):
+                if message_queue and not self.stop_event.is_set():
+                    self._post_file_result(message_queue, result)
+
             # 调用批处理方法
             response = processor.process_files_batch(
                 file_list,
                 output_dir,
                 use_source_dir,
-                naming_format
+                naming_format,
+                result_callback=result_callback,
+                journal=self.journal
             )
 
             if self.stop_event.is_set():
                 return
 
+            # 先结束日志再通知GUI；批处理整体失败时保留日志中未完成的文件
+            completed = response.get('success', True)
+            self._close_journal(completed)
+
             # 发送结果消息
             if message_queue:
                 if response.get('success', True):
-                    # 发送每个文件的结果
-                    for result in response.get('results', []):
-                        file_path = result.get('input_path', '')
-                        success = result.get('success', False)
-
-                        if success:
-                            message_queue.put({
-                                'type': 'success',
-                                'file_path': file_path,
-                                'message': result.get('message', '转换成功')
-                            })
-                        else:
-                            error_msg = result.get('error', '未知错误')
-                            message_queue.put({
-                                'type': 'error',
-                                'file_path': file_path,
-                                'message': error_msg
-                            })
-                            self.logger.error(f"文件处理失败: {file_path}, 错误: {error_msg}")
-
                     # 发送完成消息
                     message_queue.put({
                         'type': 'batch_complete',
@@ -402,4 +445,19 @@ class ThreadManager:
                     'error': f"批处理异常: {str(e)}"
                 })
         finally:
+            self._close_journal(completed)
             self.processing = False
+
+    def _close_journal(self, completed: bool):
+        """
+        关闭批处理日志（已关闭时不做任何事）
+
+        Args:
+            completed: 批处理是否正常结束，未正常结束时日志保留未完成的文件供继续转换
+        """
+        if self.journal is None:
+            return
+        if completed:
+            self.journal.finish()
+        else:
+            self.journal.close()
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+处理速度模型 - 按加密格式记录历史处理速度，用于计算单个文件和整批文件的截止时间
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .app_data import get_app_data_path
+from .constants import (
+    THROUGHPUT_FILENAME,
+    THROUGHPUT_DEFAULT_BYTES_PER_SEC,
+    THROUGHPUT_EWMA_ALPHA,
+    THROUGHPUT_MIN_SAMPLE_BYTES,
+    THROUGHPUT_FILE_OVERHEAD_SECONDS,
+    FILE_DEADLINE_SAFETY_FACTOR,
+    FILE_DEADLINE_MIN_SECONDS,
+    BATCH_DEADLINE_SAFETY_FACTOR,
+    BATCH_DEADLINE_MIN_SECONDS,
+    BATCH_TIMEOUT_MAX_SECONDS,
+    LOG_FORMAT
+)
+
+# 所有格式合并统计的键，某个格式没有历史数据时使用
+_ALL_FORMATS = "*"
+
+
+class ThroughputModel:
+    """按扩展名统计的处理速度（字节/秒），使用指数加权移动平均（EWMA）并持久化"""
+
+    def __init__(self, model_path: Optional[str] = None):
+        """
+        加载处理速度模型
+
+        Args:
+            model_path: 模型文件路径，默认使用应用数据目录下的throughput.json
+        """
+        self.model_path = model_path or get_app_data_path(THROUGHPUT_FILENAME)
+        self.logger = self._setup_logger()
+        self._lock = threading.Lock()
+        self._rates: Dict[str, float] = {}
+        self._samples: Dict[str, int] = {}
+        self._dirty = False
+        self._load()
+
+    def _setup_logger(self) -> logging.Logger:
+        """设置日志记录器"""
+        logger = logging.getLogger('ThroughputModel')
+        logger.setLevel(logging.INFO)
+
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(LOG_FORMAT)
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+
+        return logger
+
+    def _load(self):
+        """读取模型文件，文件不存在或损坏时使用默认速度"""
+        try:
+            with open(self.model_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"读取处理速度模型失败，使用默认值: {e}")
+            return
+
+        for ext, entry in (data.get("extensions") or {}).items():
+            try:
+                rate = float(entry["bytes_per_sec"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if rate > 0 and math.isfinite(rate):
+                self._rates[ext] = rate
+                self._samples[ext] = int(entry.get("samples") or 0)
+
+    def save(self):
+        """把有变化的模型写回文件（先写临时文件再替换，避免写到一半时损坏）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "version": 1,
+                "extensions": {
+                    ext: {"bytes_per_sec": rate, "samples": self._samples.get(ext, 0)}
+                    for ext, rate in self._rates.items()
+                }
+            }
+            self._dirty = False
+
+        temp_path = self.model_path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.model_path)
+        except OSError as e:
+            self.logger.warning(f"保存处理速度模型失败: {e}")
+
+    def rate(self, ext: str) -> float:
+        """
+        获取某个格式的处理速度
+
+        Args:
+            ext: 扩展名（如.ncm）
+
+        Returns:
+            float: 字节/秒，没有历史数据时依次使用全部格式的平均值和默认值
+        """
+        with self._lock:
+            return self._rates.get(ext.lower()) or self._rates.get(_ALL_FORMATS) or THROUGHPUT_DEFAULT_BYTES_PER_SEC
+
+    def record(self, ext: str, size: int, seconds: float):
+        """
+        记录一个文件的实际处理耗时
+
+        过小的文件耗时主要是固定开销，不能反映处理速度，不参与统计。
+
+        Args:
+            ext: 扩展名
+            size: 文件大小（字节）
+            seconds: 从开始处理到完成的耗时（秒）
+        """
+        if size < THROUGHPUT_MIN_SAMPLE_BYTES or seconds <= 0:
+            return
+
+        observed = size / seconds
+        with self._lock:
+            for key in (ext.lower(), _ALL_FORMATS):
+                previous = self._rates.get(key)
+                if previous is None:
+                    self._rates[key] = observed
+                else:
+                    self._rates[key] = previous + THROUGHPUT_EWMA_ALPHA * (observed - previous)
+                self._samples[key] = self._samples.get(key, 0) + 1
+            self._dirty = True
+
+    def file_deadline(self, ext: str, size: int) -> float:
+        """
+        计算单个文件允许的最长处理时间
+
+        Args:
+            ext: 扩展名
+            size: 文件大小（字节）
+
+        Returns:
+            float: 秒
+        """
+        expected = size / self.rate(ext)
+        return max(FILE_DEADLINE_MIN_SECONDS, expected * FILE_DEADLINE_SAFETY_FACTOR)
+
+    def batch_deadline(self, files: Iterable[Tuple[str, int]], parallelism: int = 1) -> float:
+        """
+        计算整批文件允许的最长处理时间
+
+        Args:
+            files: (扩展名, 文件大小)序列
+            parallelism: 同时处理的文件数
+
+        Returns:
+            float: 秒，不超过BATCH_TIMEOUT_MAX_SECONDS
+        """
+        expected = sum(THROUGHPUT_FILE_OVERHEAD_SECONDS + size / self.rate(ext)
+                       for ext, size in files) / max(parallelism, 1)
+        deadline = max(BATCH_DEADLINE_MIN_SECONDS, expected * BATCH_DEADLINE_SAFETY_FACTOR)
+        return min(deadline, BATCH_TIMEOUT_MAX_SECONDS)
+
+
+class DeadlineTracker:
+    """跟踪正在处理的文件，找出超过截止时间仍未完成的文件，并用实际耗时更新处理速度模型"""
+
+    def __init__(self, model: ThroughputModel, file_sizes: Dict[str, int], extension_of: Callable[[str], str]):
+        """
+        初始化跟踪器
+
+        Args:
+            model: 处理速度模型
+            file_sizes: 文件路径 -> 文件大小
+            extension_of: 根据文件路径获取扩展名的函数
+        """
+        self.model = model
+        self.file_sizes = file_sizes
+        self.extension_of = extension_of
+        self._lock = threading.Lock()
+        self._running: Dict[str, float] = {}  # 文件路径 -> 开始时间
+        self._limits: Dict[str, float] = {}  # 文件路径 -> 允许的处理时间，检查时才计算
+
+    def start(self, file_path: str):
+        """
+        记录文件开始处理
+
+        Args:
+            file_path: 文件路径
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._running[file_path] = now
+
+    def finish(self, result: dict):
+        """
+        记录文件处理完成，成功的文件计入处理速度
+
+        Args:
+            result: 单个文件的处理结果
+        """
+        file_path = result.get("input_path", "")
+        with self._lock:
+            started = self._running.pop(file_path, None)
+            self._limits.pop(file_path, None)
+        size = self.file_sizes.get(file_path, 0)
+        if not result.get("success") or size < THROUGHPUT_MIN_SAMPLE_BYTES:
+            return
+
+        # 优先使用um统计的耗时，旧版um没有统计时使用开始通知到完成的时间
+        seconds = (result.get("process_time_ms") or 0) / 1000.0
+        if seconds <= 0 and started is not None:
+            seconds = time.monotonic() - started
+        self.model.record(self.extension_of(file_path), size, seconds)
+
+    def running(self) -> List[str]:
+        """
+        获取已开始但尚未完成的文件
+
+        Returns:
+            List[str]: 文件路径列表
+        """
+        with self._lock:
+            return list(self._running)
+
+    def overdue(self) -> List[Tuple[str, float]]:
+        """
+        获取超过截止时间仍未完成的文件
+
+        Returns:
+            List[Tuple[str, float]]: (文件路径, 允许的处理时间（秒）)
+        """
+        now = time.monotonic()
+        with self._lock:
+            running = list(self._running.items())
+
+        overdue = []
+        for file_path, started in running:
+            limit = self._limits.get(file_path)
+            if limit is None:
+                limit = self.model.file_deadline(self.extension_of(file_path), self.file_sizes.get(file_path, 0))
+                with self._lock:
+                    self._limits[file_path] = limit
+            if now - started > limit:
+                overdue.append((file_path, limit))
+        return overdue
@@ -7,7 +7,7 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import os
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 import queue
 
 from core.file_deleter import ThreadedFileDeleter
@@ -580,19 +580,25 @@ class DeleteToolWindow:
             self.file_tree.delete(item)
         self.scanned_files = []
 
-    def update_file_list(self, files: List[str]):
+    def update_file_list(self, files: List[str], sizes: List[Optional[int]]):
         """更新文件列表"""
         self.clear_file_list()
-        self.scanned_files = files
+        self.append_files(files, sizes)
 
-        for i, file_path in enumerate(files, 1):
-            filename = os.path.basename(file_path)
-            try:
-                size = os.path.getsize(file_path)
-                size_str = self.format_file_size(size)
-            except:
-                size_str = "未知"
+    def append_files(self, files: List[str], sizes: List[Optional[int]]):
+        """
+        追加文件到列表（扫描进行中每找到一批文件调用一次）
 
+        Args:
+            files: 文件路径列表
+            sizes: 扫描时读取的文件大小（无法读取时为None），不在界面线程访问磁盘
+        """
+        start = len(self.scanned_files) + 1
+        self.scanned_files.extend(files)
+
+        for i, (file_path, size) in enumerate(zip(files, sizes), start):
+            filename = os.path.basename(file_path)
+            size_str = self.format_file_size(size) if size is not None else "未知"
             self.file_tree.insert("", "end", text=str(i), values=(filename, size_str, file_path))
 
     def format_file_size(self, size_bytes: int) -> str:
@@ -638,13 +644,21 @@ class DeleteToolWindow:
             self.progress_var.set(text)
             self.progress_bar['value'] = progress
 
+        elif msg_type == 'scan_files':
+            _, files, sizes = message
+            self.append_files(files, sizes)
+            self.status_var.set(f"{DELETE_TOOL_MESSAGES['scan_started']} 已找到 {len(self.scanned_files)} 个文件")
+
         elif msg_type == 'scan_complete':
-            _, success, files, error = message
+            _, success, files, error, sizes = message
             if success:
-                self.update_file_list(files)
+                # 文件已在扫描过程中逐批加入列表
+                if len(files) != len(self.scanned_files):
+                    self.update_file_list(files, sizes)
                 self.status_var.set(f"{DELETE_TOOL_MESSAGES['scan_completed']} - 找到 {len(files)} 个文件")
                 self.delete_button.config(state="normal" if files else "disabled")
             else:
+                self.clear_file_list()
                 messagebox.showerror("扫描失败", error)
                 self.status_var.set("扫描失败")
             self.reset_ui_state()
@@ -9,12 +9,16 @@ from tkinter import ttk, filedialog, messagebox
 import os
 import threading
 import queue
-from typing import List, Optional
+import sqlite3
+from typing import Dict, List, Optional
 
 
 
 from core.processor import FileProcessor
 from core.thread_manager import ThreadManager
+from core.journal import BatchJournal
+from core.scanner import DirectoryScanner
+from core.scan_cache import ScanCache
 from core.constants import (
     PLATFORM_FORMAT_GROUPS,
     OUTPUT_MODE_SOURCE,
@@ -41,13 +45,22 @@ class MusicUnlockGUI:
         self.um_exe_path = um_exe_path
         self.output_dir = ""
         self.file_list = []
+        self.file_items: Dict[str, str] = {}  # 文件路径 -> 列表项ID，避免逐项查找
         self.processing = False
+        self.scanner: Optional[DirectoryScanner] = None  # 正在进行的文件夹扫描
 
 
 
-        # 初始化处理器和线程管理器（启用服务模式，获得更好的性能）
-        self.processor = FileProcessor(um_exe_path, use_service_mode=True)
-        self.thread_manager = ThreadManager(max_workers=DEFAULT_MAX_WORKERS)
+        # 初始化处理器和线程管理器（启用服务模式，获得更好的性能；启用转换记录，跳过已转换的文件）
+        self.processor = FileProcessor(um_exe_path, use_service_mode=True, use_manifest=True)
+        # 批处理日志记录每次转换的进度，程序中途退出后可以继续转换
+        self.journal = BatchJournal()
+        self.thread_manager = ThreadManager(max_workers=DEFAULT_MAX_WORKERS, journal=self.journal)
+        # 扫描缓存：再次添加同一文件夹时只重新读取有变化的目录
+        try:
+            self.scan_cache: Optional[ScanCache] = ScanCache()
+        except (sqlite3.Error, OSError):
+            self.scan_cache = None
 
         # 获取支持的格式列表
         self.supported_extensions = self.processor.supported_extensions
@@ -66,6 +79,11 @@ class MusicUnlockGUI:
         menubar = tk.Menu(self.root)
         self.root.config(menu=menubar)
 
+        # 文件菜单
+        file_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="文件", menu=file_menu)
+        file_menu.add_command(label="继续上次未完成的转换", command=self.resume_last_run)
+
         # 帮助菜单
         help_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="帮助", menu=help_menu)
@@ -335,33 +353,60 @@ GitHub: https://github.com/Kariseven323/um-unlockMusic"""
     
     def add_folder(self):
         """添加文件夹"""
+        if self.scanner is not None:
+            messagebox.showwarning("警告", ERROR_MESSAGES['scan_in_progress'])
+            return
         directory = filedialog.askdirectory(title="选择包含音乐文件的文件夹")
         if directory:
-            files = self.scan_directory(directory)
-            if files:
-                self.add_files_to_list(files)
-            else:
-                messagebox.showinfo("提示", "所选文件夹中没有找到支持的音乐文件")
+            self.scan_directory(directory)
     
-    def scan_directory(self, directory: str) -> List[str]:
-        """扫描目录中的音乐文件"""
-        files = []
-
-        for root, dirs, filenames in os.walk(directory):
-            for filename in filenames:
-                if self.processor.is_supported_file(os.path.join(root, filename)):
-                    files.append(os.path.join(root, filename))
+    def scan_directory(self, directory: str):
+        """
+        在后台线程扫描目录中的音乐文件，找到的文件通过消息队列逐批加入列表
 
-        return files
+        Args:
+            directory: 要扫描的目录
+        """
+        scanner = DirectoryScanner(self.processor.extension_matcher.matches, cache=self.scan_cache)
+        self.scanner = scanner
+
+        def scan_worker():
+            found = 0
+            try:
+                for chunk in scanner.scan(directory):
+                    found += len(chunk)
+                    self.message_queue.put({
+                        'type': 'scan_files',
+                        'scanner': scanner,
+                        'files': chunk,
+                        'found': found,
+                        'files_per_second': scanner.files_per_second
+                    })
+            finally:
+                self.message_queue.put({
+                    'type': 'scan_complete',
+                    'scanner': scanner,
+                    'found': found,
+                    'cancelled': scanner.cancelled
+                })
+
+        threading.Thread(target=scan_worker, daemon=True).start()
+        self.update_status(SUCCESS_MESSAGES['scan_started'])
+
+    def cancel_scan(self):
+        """取消正在进行的文件夹扫描，已经在队列中的结果也不再加入列表"""
+        if self.scanner is not None:
+            self.scanner.cancel()
+            self.scanner = None
     
     def add_files_to_list(self, files: List[str]):
         """添加文件到列表"""
         for file_path in files:
-            if file_path not in self.file_list:
+            if file_path not in self.file_items:
                 self.file_list.append(file_path)
                 filename = os.path.basename(file_path)
-                item_id = self.file_tree.insert("", "end", text=file_path, 
-                                               values=(filename, "等待", "0%"))
+                self.file_items[file_path] = self.file_tree.insert("", "end", text=file_path,
+                                                                   values=(filename, "等待", "0%"))
         
         self.update_status(SUCCESS_MESSAGES['files_added'].format(len(files), len(self.file_list)))
     
@@ -371,15 +416,20 @@ GitHub: https://github.com/Kariseven323/um-unlockMusic"""
             messagebox.showwarning("警告", ERROR_MESSAGES['already_processing'])
             return
 
+        self.cancel_scan()
         self.file_list.clear()
-        for item in self.file_tree.get_children():
-            self.file_tree.delete(item)
+        self.file_items.clear()
+        self.file_tree.delete(*self.file_tree.get_children())
 
         self.update_status(SUCCESS_MESSAGES['list_cleared'])
         self.progress_var.set(0)
     
     def start_conversion(self):
         """开始转换"""
+        if self.scanner is not None:
+            messagebox.showwarning("警告", ERROR_MESSAGES['scan_in_progress'])
+            return
+
         if not self.file_list:
             messagebox.showwarning("警告", ERROR_MESSAGES['no_files_selected'])
             return
@@ -417,6 +467,36 @@ GitHub: https://github.com/Kariseven323/um-unlockMusic"""
         
         self.update_status(SUCCESS_MESSAGES['processing_started'])
     
+    def resume_last_run(self):
+        """继续上次中断的转换，只提交批处理日志中还没有结果的文件"""
+        if self.processing:
+            messagebox.showwarning("警告", "正在转换，请等待完成或先停止转换")
+            return
+
+        run = self.journal.load_unfinished()
+        if not run:
+            messagebox.showinfo("提示", "没有未完成的转换任务")
+            return
+
+        remaining = run['files']
+        if not messagebox.askyesno("继续转换",
+                                   f"上次转换共 {run['total_files']} 个文件，还有 {len(remaining)} 个未完成，是否继续？"):
+            return
+
+        # 恢复上次的输出设置
+        if run['use_source_dir'] or not run['output_dir']:
+            self.output_mode_var.set(OUTPUT_MODE_SOURCE)
+        else:
+            self.output_mode_var.set(OUTPUT_MODE_CUSTOM)
+            self.output_dir = run['output_dir']
+        self.on_output_mode_change()
+        self.naming_format_var.set(NAMING_FORMAT_LABELS.get(run['naming_format'],
+                                                            NAMING_FORMAT_LABELS[NAMING_FORMAT_AUTO]))
+
+        self.clear_list()
+        self.add_files_to_list(remaining)
+        self.start_conversion()
+
     def stop_conversion(self):
         """停止转换"""
         self.thread_manager.stop_all()
@@ -435,6 +515,7 @@ GitHub: https://github.com/Kariseven323/um-unlockMusic"""
     
     def stop_all_tasks(self):
         """停止所有任务"""
+        self.cancel_scan()
         self.thread_manager.stop_all()
     
     def check_queue(self):
@@ -454,13 +535,14 @@ GitHub: https://github.com/Kariseven323/um-unlockMusic"""
         msg_type = message.get('type')
         file_path = message.get('file_path')
 
+        # 文件夹扫描消息（已取消的扫描留在队列中的消息直接丢弃）
+        if msg_type in ('scan_files', 'scan_complete'):
+            if message.get('scanner') is self.scanner:
+                self.handle_scan_message(message)
+            return
+
         # 查找对应的树项
-        item_id = None
-        if file_path:
-            for item in self.file_tree.get_children():
-                if self.file_tree.item(item, 'text') == file_path:
-                    item_id = item
-                    break
+        item_id = self.file_items.get(file_path) if file_path else None
 
         if msg_type == 'progress':
             if item_id:
@@ -520,6 +602,29 @@ GitHub: https://github.com/Kariseven323/um-unlockMusic"""
         # 更新总体进度
         self.update_overall_progress()
     
+    def handle_scan_message(self, message: dict):
+        """
+        处理文件夹扫描的消息
+
+        Args:
+            message: scan_files（一批找到的文件）或scan_complete（扫描结束）消息
+        """
+        if message['type'] == 'scan_files':
+            self.add_files_to_list(message['files'])
+            self.update_status(SUCCESS_MESSAGES['scan_progress'].format(message['found'],
+                                                                        message['files_per_second']))
+            return
+
+        self.scanner = None
+        found = message.get('found', 0)
+        if message.get('cancelled'):
+            self.update_status(SUCCESS_MESSAGES['scan_cancelled'].format(found, len(self.file_list)))
+        elif found:
+            self.update_status(SUCCESS_MESSAGES['scan_finished'].format(found, len(self.file_list)))
+        else:
+            self.update_status("")
+            messagebox.showinfo("提示", "所选文件夹中没有找到支持的音乐文件")
+
     def update_overall_progress(self):
         """更新总体进度"""
         if not self.file_list:
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编排层开销基准测试
+
+使用fake_um.py代替真实的um，测量FileProcessor（批处理子进程模式/服务模式）、
+ServiceClient和ThreadManager在大量文件下的编排开销，不需要真实加密文件和Go工具链。
+
+用法：
+    python tests/scripts/bench_orchestration.py --files 100000
+    python tests/scripts/bench_orchestration.py --files 20000 --modes service --instances 2 --latency-ms 1
+"""
+
+import argparse
+import logging
+import os
+import queue
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.processor import FileProcessor  # noqa: E402
+from core.service_supervisor import ServiceSupervisor  # noqa: E402
+from core.thread_manager import ThreadManager  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+
+def make_file_list(count: int) -> list:
+    """生成不存在的虚拟文件路径（fake_um默认不检查输入文件）"""
+    return [f"/bench/album_{i // 100:04d}/track_{i:06d}.ncm" for i in range(count)]
+
+
+def make_processor(mode: str, socket_dir: str, instances: int) -> FileProcessor:
+    """
+    创建使用fake_um的处理器
+
+    服务模式使用临时目录下的套接字，避免影响正在运行的真实服务。
+    """
+    processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False)
+    if mode == 'service':
+        supervisor = ServiceSupervisor(FAKE_UM_PATH, instance_count=instances,
+                                       base_path=os.path.join(socket_dir, 'um_bench.sock'))
+        supervisor.start()
+        processor.service_supervisor = supervisor
+        if not processor.wait_for_service(timeout=30):
+            raise RuntimeError("fake_um服务启动失败")
+    return processor
+
+
+def bench_processor(mode: str, file_list: list, socket_dir: str, instances: int) -> dict:
+    """直接调用FileProcessor.process_files_batch"""
+    processor = make_processor(mode, socket_dir, instances)
+    callbacks = [0]
+
+    def on_result(result):
+        callbacks[0] += 1
+
+    try:
+        start = time.perf_counter()
+        response = processor.process_files_batch(file_list, output_dir='/bench/out', result_callback=on_result)
+        elapsed = time.perf_counter() - start
+    finally:
+        if processor.service_supervisor:
+            processor.service_supervisor.stop()
+            for instance in processor.service_supervisor.instances:
+                instance.client.connect(timeout=1.0, quiet=True) and instance.client.shutdown(force=True)
+
+    return {
+        'elapsed': elapsed,
+        'success': response.get('success_count', 0),
+        'failed': response.get('failed_count', 0),
+        'callbacks': callbacks[0],
+    }
+
+
+def bench_thread_manager(mode: str, file_list: list, socket_dir: str, instances: int) -> dict:
+    """通过ThreadManager批处理，并像GUI一样消费消息队列"""
+    processor = make_processor(mode, socket_dir, instances)
+    manager = ThreadManager()
+    message_queue = queue.Queue()
+    per_file = 0
+    summary = {}
+
+    try:
+        start = time.perf_counter()
+        manager.start_batch_processing(file_list, '/bench/out', processor, message_queue)
+        while True:
+            message = message_queue.get()
+            if message['type'] in ('success', 'error'):
+                per_file += 1
+            elif message['type'] in ('batch_complete', 'batch_error'):
+                summary = message
+                break
+        elapsed = time.perf_counter() - start
+    finally:
+        if processor.service_supervisor:
+            processor.service_supervisor.stop()
+            for instance in processor.service_supervisor.instances:
+                instance.client.connect(timeout=1.0, quiet=True) and instance.client.shutdown(force=True)
+
+    return {
+        'elapsed': elapsed,
+        'success': summary.get('success_count', 0),
+        'failed': summary.get('failed_count', 0),
+        'callbacks': per_file,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="编排层开销基准测试（使用fake_um）")
+    parser.add_argument('--files', type=int, default=100000, help="文件数量")
+    parser.add_argument('--modes', default='batch,service', help="逗号分隔：batch、service")
+    parser.add_argument('--thread-manager', action='store_true', help="同时测试ThreadManager消息转发")
+    parser.add_argument('--instances', type=int, default=1, help="服务实例数量")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="每个文件的模拟处理耗时（毫秒）")
+    parser.add_argument('--failure-rate', type=float, default=0.0, help="模拟失败率")
+    parser.add_argument('--workers', type=int, default=8, help="fake_um的worker数量")
+    args = parser.parse_args()
+
+    # 配置传给fake_um子进程
+    os.environ['FAKE_UM_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['FAKE_UM_FAILURE_RATE'] = str(args.failure_rate)
+    os.environ['FAKE_UM_WORKERS'] = str(args.workers)
+
+    # 逐文件的日志会主导耗时，基准测试只保留警告
+    logging.disable(logging.INFO)
+
+    file_list = make_file_list(args.files)
+    ideal = args.files * args.latency_ms / 1000.0 / args.workers
+    print(f"=== 编排层基准测试: {args.files} 个文件, 模拟耗时 {args.latency_ms}ms/文件, "
+          f"理想处理时间 {ideal:.2f}s ===")
+
+    benches = [('FileProcessor', bench_processor)]
+    if args.thread_manager:
+        benches.append(('ThreadManager', bench_thread_manager))
+
+    with tempfile.TemporaryDirectory(prefix='um_bench_') as socket_dir:
+        for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+            for name, bench in benches:
+                result = bench(mode, file_list, socket_dir, args.instances)
+                elapsed = result['elapsed']
+                overhead_us = max(elapsed - ideal / max(1, args.instances if mode == 'service' else 1), 0) \
+                    / max(1, args.files) * 1e6
+                print(f"{name:<14} {mode:<8} 耗时 {elapsed:8.2f}s  "
+                      f"{args.files / elapsed:10.0f} 文件/秒  "
+                      f"编排开销 {overhead_us:7.1f}us/文件  "
+                      f"成功 {result['success']} 失败 {result['failed']} 回调 {result['callbacks']}")
+                if result['callbacks'] != args.files:
+                    print(f"  ✗ 回调数量与文件数不一致: {result['callbacks']} != {args.files}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,651 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+um的纯Python替身，用于编排层（FileProcessor、ServiceClient、ThreadManager）的基准和回归测试
+
+不需要真实的加密音频文件和Go工具链：
+- --service [--service-pipe 路径]：与cmd/um/service.go相同的NDJSON协议（仅支持Unix域套接字）
+- --batch：与cmd/um/batch.go相同的stdin/stdout JSON
+- --supported-ext、--version、-i/-o单文件模式
+
+行为通过环境变量配置：
+- FAKE_UM_LATENCY_MS：每个文件的处理耗时（毫秒），默认0
+- FAKE_UM_JITTER_MS：处理耗时的随机抖动上限（毫秒），默认0
+- FAKE_UM_FAILURE_RATE：失败率（0~1），按输入路径哈希决定，同一文件在各模式下结果一致，默认0
+- FAKE_UM_RESPONSE_PADDING：每条结果附加的填充字节数，用于放大响应体积，默认0
+- FAKE_UM_WORKERS：并发处理的worker数，默认8
+- FAKE_UM_CHECK_INPUT：为1时像真实um一样检查输入文件是否存在、格式是否支持，默认0
+- FAKE_UM_STARTUP_DELAY_MS：服务模式开始监听前的延迟（毫秒），用于测试就绪探测，默认0
+- FAKE_UM_VERSION：报告的版本号，默认fake
+- FAKE_UM_WRITE_OUTPUT：为1时把输入文件内容写到输出路径（模拟真实的输出文件），默认0
+- FAKE_UM_HANG_MATCH：输入路径包含该字符串的文件处理时一直阻塞（模拟卡住的文件），默认不启用
+- FAKE_UM_IGNORE_TERM：为1时忽略SIGTERM（模拟不响应退出请求的进程），默认0
+- FAKE_UM_FLAKY_MATCH：输入路径包含该字符串的文件前FAKE_UM_FLAKY_COUNT次处理返回I/O错误（模拟网络盘读取中断），
+  处理次数记录在FAKE_UM_FLAKY_DIR目录中（跨进程累计），默认不启用
+- FAKE_UM_LEGACY_BATCH：模拟不支持流式输出的旧版um，批处理忽略stream请求，只输出完整JSON；
+  为truncated时只输出前一半，为garbage时输出非JSON文本，默认不启用
+"""
+
+import json
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+# 与cmd/um/service.go中的isSupportedFormat保持一致
+SUPPORTED_EXTENSIONS = [
+    ".ncm",
+    ".qmc0", ".qmc2", ".qmc3", ".qmc4", ".qmc6", ".qmc8", ".qmcflac", ".qmcogg", ".tkm",
+    ".mflac", ".mflac0", ".mflac1", ".mflaca", ".mflach", ".mflacl", ".mflacm",
+    ".mgg", ".mgg0", ".mgg1", ".mgga", ".mggh", ".mggl", ".mggm", ".mmp4",
+    ".666c6163", ".6d3461", ".6d7033", ".6f6767", ".776176",
+    ".kgm", ".kgma", ".kgg", ".kgm.flac",
+    ".kwm",
+    ".tm0", ".tm2", ".tm3", ".tm6",
+    ".xm", ".x2m", ".x3m",
+    ".bkcmp3", ".bkcm4a", ".bkcflac", ".bkcwav", ".bkcape", ".bkcogg", ".bkcwma",
+    ".vpr", ".vpr.flac",
+]
+
+CAPABILITIES = ["ping", "pipelining", "subscribe", "get_results", "shutdown"]
+TERMINAL_STATUSES = ("completed", "partial_success", "error", "stopped")
+DEFAULT_RESULTS_PAGE_SIZE = 500
+MAX_RESULTS_PAGE_SIZE = 5000
+
+
+class FakeConfig:
+    """从环境变量读取的替身行为配置"""
+
+    def __init__(self):
+        self.latency = float(os.environ.get("FAKE_UM_LATENCY_MS", "0")) / 1000.0
+        self.jitter = float(os.environ.get("FAKE_UM_JITTER_MS", "0")) / 1000.0
+        self.failure_rate = float(os.environ.get("FAKE_UM_FAILURE_RATE", "0"))
+        self.padding = int(os.environ.get("FAKE_UM_RESPONSE_PADDING", "0"))
+        self.workers = max(1, int(os.environ.get("FAKE_UM_WORKERS", "8")))
+        self.check_input = os.environ.get("FAKE_UM_CHECK_INPUT", "0") == "1"
+        self.startup_delay = float(os.environ.get("FAKE_UM_STARTUP_DELAY_MS", "0")) / 1000.0
+        self.version = os.environ.get("FAKE_UM_VERSION", "fake")
+        self.write_output = os.environ.get("FAKE_UM_WRITE_OUTPUT", "0") == "1"
+        self.hang_match = os.environ.get("FAKE_UM_HANG_MATCH", "")
+        self.flaky_match = os.environ.get("FAKE_UM_FLAKY_MATCH", "")
+        self.flaky_count = int(os.environ.get("FAKE_UM_FLAKY_COUNT", "1"))
+        self.flaky_dir = os.environ.get("FAKE_UM_FLAKY_DIR", "")
+        self.legacy_batch = os.environ.get("FAKE_UM_LEGACY_BATCH", "")
+
+
+def log(message: str):
+    """日志输出到stderr，与真实um一致，stdout只用于协议数据"""
+    print(f"{time.strftime('%Y-%m-%dT%H:%M:%S')}\tINFO\t{message}", file=sys.stderr, flush=True)
+
+
+def match_extension(path: str) -> str:
+    """返回路径匹配的支持扩展名（优先匹配.kgm.flac这类复合扩展名），不支持时返回空字符串"""
+    lower = path.lower()
+    for ext in sorted(SUPPORTED_EXTENSIONS, key=len, reverse=True):
+        if lower.endswith(ext):
+            return ext
+    return ""
+
+
+def should_fail(path: str, rate: float) -> bool:
+    """按输入路径哈希决定是否失败，保证同一文件每次运行结果一致"""
+    if rate <= 0:
+        return False
+    return zlib.crc32(path.encode("utf-8")) / 0xFFFFFFFF < rate
+
+
+def flaky_attempt(path: str, config: FakeConfig) -> bool:
+    """
+    判断这次处理是否模拟临时性I/O错误
+
+    每次失败在FAKE_UM_FLAKY_DIR中独占创建一个标记文件，前flaky_count次处理失败，之后成功。
+    """
+    if not config.flaky_match or config.flaky_match not in path or not config.flaky_dir:
+        return False
+    key = f"{zlib.crc32(path.encode('utf-8')):08x}"
+    for attempt in range(config.flaky_count):
+        try:
+            os.close(os.open(os.path.join(config.flaky_dir, f"{key}-{attempt}"), os.O_CREAT | os.O_EXCL))
+            return True
+        except FileExistsError:
+            continue
+    return False
+
+
+def process_task(task: dict, config: FakeConfig) -> dict:
+    """
+    模拟处理单个文件，返回与Go ProcessResult相同结构的结果
+
+    Args:
+        task: FileTask字典（input_path、output_path）
+        config: 替身配置
+
+    Returns:
+        dict: ProcessResult字典
+    """
+    start = time.monotonic()
+    input_path = task.get("input_path", "")
+    result = {"input_path": input_path, "success": False}
+
+    delay = config.latency + (random.random() * config.jitter if config.jitter else 0)
+    if delay > 0:
+        time.sleep(delay)
+    if config.hang_match and config.hang_match in input_path:
+        time.sleep(3600)
+
+    if config.check_input and not os.path.exists(input_path):
+        result["error"] = f"输入文件不存在: {input_path}"
+    elif should_fail(input_path, config.failure_rate):
+        result["error"] = f"模拟解密失败: {os.path.basename(input_path)}"
+    elif flaky_attempt(input_path, config):
+        result["error"] = f"读取音频数据失败: read {input_path}: input/output error"
+    else:
+        ext = match_extension(input_path)
+        stem = os.path.basename(input_path)[:-len(ext)] if ext else os.path.splitext(os.path.basename(input_path))[0]
+        output_dir = task.get("output_path") or os.path.dirname(input_path)
+        output_path = os.path.join(output_dir, stem + ".flac")
+        result["success"] = True
+        result["output_path"] = output_path
+        result["decoder"] = ext
+        if config.write_output:
+            try:
+                os.makedirs(output_dir, exist_ok=True)
+                with open(input_path, "rb") as src, open(output_path, "wb") as dst:
+                    dst.write(src.read())
+            except OSError as e:
+                result["success"] = False
+                result["error"] = f"写入输出文件失败: {e}"
+
+    if config.padding:
+        result["padding"] = "x" * config.padding
+    result["process_time_ms"] = int((time.monotonic() - start) * 1000)
+    return result
+
+
+def binary_identity() -> dict:
+    """与Go服务的binaryIdentity一致，供客户端判断服务是否由同一可执行文件启动"""
+    path = os.path.realpath(sys.argv[0])
+    try:
+        stat = os.stat(path)
+        return {"path": path, "size": stat.st_size, "mod_time": int(stat.st_mtime)}
+    except OSError:
+        return {"path": path}
+
+
+# ---------------------------------------------------------------------------
+# 批处理模式
+# ---------------------------------------------------------------------------
+
+def run_batch(config: FakeConfig) -> int:
+    """读取stdin中的BatchRequest，输出BatchResponse"""
+    log("启动批处理模式")
+    try:
+        request = json.loads(sys.stdin.read())
+    except json.JSONDecodeError as e:
+        print(f"读取批处理请求失败: 解析JSON失败: {e}", file=sys.stderr)
+        return 1
+
+    files = request.get("files") or []
+    start = time.monotonic()
+    if request.get("stream") and not config.legacy_batch:
+        return run_batch_stream(files, config, start)
+
+    with ThreadPoolExecutor(max_workers=config.workers) as executor:
+        results = list(executor.map(lambda task: process_task(task, config), files))
+
+    success_count = sum(1 for result in results if result["success"])
+    response = {
+        "results": results,
+        "total_files": len(files),
+        "success_count": success_count,
+        "failed_count": len(results) - success_count,
+        "total_time_ms": int((time.monotonic() - start) * 1000),
+    }
+    output = json.dumps(response, ensure_ascii=False, indent=2)
+    if config.legacy_batch == "truncated":
+        output = output[:len(output) // 2]
+    elif config.legacy_batch == "garbage":
+        output = "panic: runtime error\n"
+    sys.stdout.write(output)
+    sys.stdout.flush()
+    return 0
+
+
+def run_batch_stream(files: list, config: FakeConfig, start: float) -> int:
+    """流式输出：每开始一个文件输出一行start，每完成一个文件输出一行result，最后输出一行summary"""
+    write_lock = threading.Lock()
+    success_count = 0
+
+    def process_and_emit(task: dict):
+        nonlocal success_count
+        notice = json.dumps({"type": "start", "input_path": task.get("input_path", "")}, ensure_ascii=False)
+        with write_lock:
+            sys.stdout.write(notice + "\n")
+            sys.stdout.flush()
+        result = process_task(task, config)
+        line = json.dumps({"type": "result", **result}, ensure_ascii=False)
+        with write_lock:
+            success_count += 1 if result["success"] else 0
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    with ThreadPoolExecutor(max_workers=config.workers) as executor:
+        for _ in executor.map(process_and_emit, files):
+            pass
+
+    summary = {
+        "type": "summary",
+        "total_files": len(files),
+        "success_count": success_count,
+        "failed_count": len(files) - success_count,
+        "total_time_ms": int((time.monotonic() - start) * 1000),
+    }
+    sys.stdout.write(json.dumps(summary, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+    return 0
+
+
+# ---------------------------------------------------------------------------
+# 服务模式
+# ---------------------------------------------------------------------------
+
+class FakeSession:
+    """会话状态，对应Go的Session结构"""
+
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.files = []
+        self.status = "created"
+        self.started_at = 0.0
+        self.processed_files = 0
+        self.success_count = 0
+        self.failed_count = 0
+        self.results = []
+        self.subscribers = []
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+
+    def summary(self) -> dict:
+        """会话统计信息（调用方需持有lock）"""
+        total_time = int((time.monotonic() - self.started_at) * 1000) if self.started_at else 0
+        return {
+            "session_id": self.id,
+            "status": self.status,
+            "total_files": len(self.files),
+            "processed_files": self.processed_files,
+            "success_count": self.success_count,
+            "failed_count": self.failed_count,
+            "total_time_ms": total_time,
+        }
+
+
+class Connection:
+    """单个客户端连接，串行化响应写入"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.write_lock = threading.Lock()
+
+    def write(self, response: dict) -> bool:
+        data = (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+        try:
+            with self.write_lock:
+                self.sock.sendall(data)
+            return True
+        except OSError:
+            return False
+
+
+class FakeService:
+    """NDJSON服务，消息类型与cmd/um/service.go一致"""
+
+    def __init__(self, path: str, config: FakeConfig):
+        self.path = path
+        self.config = config
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+        self.binary = binary_identity()
+        self.listener = None
+        self.stopped = threading.Event()
+
+    def serve(self) -> int:
+        """监听并处理连接，直到收到shutdown"""
+        if self.config.startup_delay:
+            time.sleep(self.config.startup_delay)
+
+        if os.path.exists(self.path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.settimeout(1.0)
+                probe.connect(self.path)
+                print(f"服务已在运行: {self.path}", file=sys.stderr)
+                return 1
+            except OSError:
+                os.remove(self.path)
+            finally:
+                probe.close()
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen(128)
+        log(f"服务启动成功 地址={self.path}")
+
+        while not self.stopped.is_set():
+            try:
+                sock, _ = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self.handle_connection, args=(sock,), daemon=True).start()
+
+        log("服务已停止")
+        return 0
+
+    def stop(self):
+        self.stopped.set()
+        if self.listener:
+            try:
+                self.listener.close()
+            finally:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+
+    def handle_connection(self, sock: socket.socket):
+        conn = Connection(sock)
+        try:
+            for line in sock.makefile("rb"):
+                try:
+                    msg = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # 与Go服务一样，每条消息独立处理，响应按完成顺序返回
+                threading.Thread(target=self.dispatch, args=(msg, conn), daemon=True).start()
+        except OSError:
+            pass
+        finally:
+            sock.close()
+
+    def dispatch(self, msg: dict, conn: Connection):
+        msg_id = msg.get("id", "")
+        data = msg.get("data") or {}
+        handler = getattr(self, "handle_" + str(msg.get("type")), None)
+        if handler is None:
+            response = self.error(msg_id, "未知消息类型")
+        else:
+            response = handler(msg_id, data, conn)
+        conn.write(response)
+        if msg.get("type") == "shutdown" and response.get("success"):
+            self.stop()
+
+    @staticmethod
+    def success(msg_id: str, response_type: str, data: dict) -> dict:
+        return {"id": msg_id, "type": response_type, "success": True, "data": data,
+                "timestamp": int(time.time())}
+
+    @staticmethod
+    def error(msg_id: str, message: str) -> dict:
+        return {"id": msg_id, "type": "error", "success": False, "data": None, "error": message,
+                "timestamp": int(time.time())}
+
+    def get_session(self, data: dict):
+        with self.lock:
+            return self.sessions.get(data.get("session_id"))
+
+    def handle_ping(self, msg_id, data, conn):
+        return self.success(msg_id, "pong", {"timestamp": int(time.time() * 1000)})
+
+    def handle_hello(self, msg_id, data, conn):
+        with self.lock:
+            session_count = len(self.sessions)
+        return self.success(msg_id, "hello", {
+            "version": self.config.version,
+            "go_version": "python" + sys.version.split()[0],
+            "pid": os.getpid(),
+            "binary": self.binary,
+            "started_at": int(self.started_at),
+            "sessions": session_count,
+            "supported_extensions": SUPPORTED_EXTENSIONS,
+            "capabilities": CAPABILITIES,
+        })
+
+    def handle_shutdown(self, msg_id, data, conn):
+        if not data.get("force"):
+            with self.lock:
+                busy = sum(1 for session in self.sessions.values() if session.status == "processing")
+            if busy:
+                return self.error(msg_id, f"有 {busy} 个会话正在处理，拒绝停止服务")
+        return self.success(msg_id, "shutting_down", {"pid": os.getpid()})
+
+    def handle_start_session(self, msg_id, data, conn):
+        session_id = f"session_{time.time_ns()}"
+        with self.lock:
+            self.sessions[session_id] = FakeSession(session_id)
+        return self.success(msg_id, "session_started", {"session_id": session_id})
+
+    def handle_add_files(self, msg_id, data, conn):
+        session = self.get_session(data)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        files = data.get("files")
+        if not isinstance(files, list):
+            return self.error(msg_id, "无效的文件列表格式")
+
+        valid = []
+        for task in files:
+            if not isinstance(task, dict) or not isinstance(task.get("input_path"), str):
+                continue
+            if self.config.check_input:
+                if not os.path.exists(task["input_path"]) or not match_extension(task["input_path"]):
+                    continue
+            valid.append(task)
+
+        with session.lock:
+            session.files.extend(valid)
+            total = len(session.files)
+        return self.success(msg_id, "files_added", {"added_count": len(valid), "total_files": total})
+
+    def handle_start_processing(self, msg_id, data, conn):
+        session = self.get_session(data)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        with session.lock:
+            if session.status == "processing":
+                return self.error(msg_id, "会话正在处理中")
+            if not session.files:
+                return self.error(msg_id, "没有文件需要处理")
+            session.status = "processing"
+            session.started_at = time.monotonic()
+            session.processed_files = session.success_count = session.failed_count = 0
+            session.results = []
+            session.stop_event.clear()
+            file_count = len(session.files)
+        threading.Thread(target=self.process_session, args=(session,), daemon=True).start()
+        return self.success(msg_id, "processing_started", {
+            "session_id": session.id, "file_count": file_count, "status": "processing"})
+
+    def handle_get_progress(self, msg_id, data, conn):
+        session = self.get_session(data)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        with session.lock:
+            total = len(session.files)
+            progress = 100.0 if session.status == "completed" else (
+                session.processed_files * 100.0 / total if total else 0.0)
+            return self.success(msg_id, "progress_update", {
+                "session_id": session.id,
+                "progress": progress,
+                "status": session.status,
+                "total_files": total,
+                "processed_files": session.processed_files,
+                "success_count": session.success_count,
+                "failed_count": session.failed_count,
+                "current_file": "",
+            })
+
+    def handle_get_results(self, msg_id, data, conn):
+        session = self.get_session(data)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        offset = max(0, int(data.get("offset") or 0))
+        limit = int(data.get("limit") or DEFAULT_RESULTS_PAGE_SIZE)
+        limit = min(limit if limit > 0 else DEFAULT_RESULTS_PAGE_SIZE, MAX_RESULTS_PAGE_SIZE)
+        with session.lock:
+            total = len(session.results)
+            offset = min(offset, total)
+            end = min(offset + limit, total)
+            return self.success(msg_id, "results", {
+                "session_id": session.id,
+                "status": session.status,
+                "offset": offset,
+                "next_offset": end,
+                "total": total,
+                "has_more": end < total,
+                "finished": session.status in TERMINAL_STATUSES,
+                "results": session.results[offset:end],
+            })
+
+    def handle_stop_processing(self, msg_id, data, conn):
+        session = self.get_session(data)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        with session.lock:
+            if session.status != "processing":
+                return self.error(msg_id, "会话未在处理中")
+            session.status = "stopped"
+            session.stop_event.set()
+        return self.success(msg_id, "processing_stopped", {"session_id": session.id, "status": "stopped"})
+
+    def handle_end_session(self, msg_id, data, conn):
+        with self.lock:
+            session = self.sessions.pop(data.get("session_id"), None)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        with session.lock:
+            session.status = "ended"
+            session.stop_event.set()
+            session.subscribers = []
+        return self.success(msg_id, "session_ended", {"session_id": session.id, "status": "ended"})
+
+    def handle_subscribe(self, msg_id, data, conn):
+        session = self.get_session(data)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        with session.lock:
+            result = session.summary()
+            if session.status in TERMINAL_STATUSES:
+                result["finished"] = True
+                return self.success(msg_id, "subscribed", result)
+            session.subscribers.append((msg_id, conn))
+            result["finished"] = False
+        return self.success(msg_id, "subscribed", result)
+
+    def handle_unsubscribe(self, msg_id, data, conn):
+        session = self.get_session(data)
+        if session is None:
+            return self.error(msg_id, "会话不存在")
+        subscription_id = data.get("subscription_id")
+        with session.lock:
+            session.subscribers = [sub for sub in session.subscribers if sub[0] != subscription_id]
+        return self.success(msg_id, "unsubscribed", {
+            "session_id": session.id, "subscription_id": subscription_id})
+
+    def notify(self, session: FakeSession, subscribers: list, event_type: str, data: dict):
+        for subscription_id, conn in subscribers:
+            event = self.success(subscription_id, event_type, data)
+            if not conn.write(event):
+                with session.lock:
+                    session.subscribers = [sub for sub in session.subscribers if sub[0] != subscription_id]
+
+    def process_session(self, session: FakeSession):
+        with session.lock:
+            files = list(session.files)
+
+        def work(task):
+            if session.stop_event.is_set():
+                return
+            with session.lock:
+                subscribers = list(session.subscribers)
+            self.notify(session, subscribers, "file_started",
+                        {"session_id": session.id, "input_path": task.get("input_path", "")})
+            result = process_task(task, self.config)
+            with session.lock:
+                session.processed_files += 1
+                if result["success"]:
+                    session.success_count += 1
+                else:
+                    session.failed_count += 1
+                session.results.append(result)
+                event = dict(result, session_id=session.id,
+                             processed_files=session.processed_files, total_files=len(session.files))
+                event.setdefault("output_path", "")
+                event.setdefault("error", "")
+                subscribers = list(session.subscribers)
+            self.notify(session, subscribers, "file_completed", event)
+
+        with ThreadPoolExecutor(max_workers=self.config.workers) as executor:
+            list(executor.map(work, files))
+
+        with session.lock:
+            if session.status == "processing":
+                if session.success_count == len(files):
+                    session.status = "completed"
+                elif session.success_count > 0:
+                    session.status = "partial_success"
+                else:
+                    session.status = "error"
+            finished = session.summary()
+            subscribers = list(session.subscribers)
+        self.notify(session, subscribers, "session_finished", finished)
+
+
+# ---------------------------------------------------------------------------
+# 命令行入口
+# ---------------------------------------------------------------------------
+
+def run_single(args: list, config: FakeConfig) -> int:
+    """-i 输入文件 -o 输出目录 的单文件模式"""
+    input_path = args[args.index("-i") + 1] if "-i" in args else ""
+    output_dir = args[args.index("-o") + 1] if "-o" in args else ""
+    result = process_task({"input_path": input_path, "output_path": output_dir}, config)
+    if result["success"]:
+        log(f"successfully converted source={input_path} destination={result['output_path']}")
+        return 0
+    print(result["error"], file=sys.stderr)
+    return 1
+
+
+def main(argv: list) -> int:
+    config = FakeConfig()
+
+    if os.environ.get("FAKE_UM_IGNORE_TERM", "0") == "1" and hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    if "--version" in argv or "-v" in argv:
+        print(f"Unlock Music CLI version {config.version} (fake_um)")
+        return 0
+
+    if "--supported-ext" in argv:
+        for ext in sorted(ext.lstrip(".") for ext in SUPPORTED_EXTENSIONS):
+            print(f"{ext}: 1")
+        return 0
+
+    if "--service" in argv:
+        if os.name == "nt":
+            print("fake_um服务模式仅支持Unix域套接字", file=sys.stderr)
+            return 1
+        path = argv[argv.index("--service-pipe") + 1] if "--service-pipe" in argv else "/tmp/um_service.sock"
+        return FakeService(path, config).serve()
+
+    if "--batch" in argv:
+        return run_batch(config)
+
+    return run_single(argv, config)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
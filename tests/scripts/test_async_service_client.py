@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步服务客户端测试（使用fake_um.py，不需要um.exe和真实文件）
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.async_service_client import AsyncServiceClient  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+async def wait_ready(client: AsyncServiceClient, timeout: float) -> bool:
+    """等待fake_um开始监听并完成连接"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        if os.path.exists(client.service_path) and await client.connect(timeout=1.0):
+            return await client.ping()
+        await asyncio.sleep(0.1)
+    return False
+
+
+async def run_session(client: AsyncServiceClient, prefix: str, count: int) -> dict:
+    """在共享连接上独立跑完一个会话，返回事件统计和分页读取的结果"""
+    session_id = await client.create_session()
+    files = [{"input_path": f"/fake/{prefix}/{i}.ncm"} for i in range(count)]
+    await client.add_files(files, session_id=session_id)
+    subscription = await client.subscribe_progress(session_id)
+    await client.start_processing(session_id=session_id)
+
+    completed = []
+    summary = None
+    async for event in subscription:
+        if event['type'] == 'file_completed':
+            completed.append(event)
+        elif event['type'] == 'session_finished':
+            summary = event
+
+    results = [result async for result in client.iter_results(session_id, page_size=37)]
+    ended = await client.end_session(session_id)
+    return {
+        "session_id": session_id,
+        "completed": completed,
+        "summary": summary,
+        "results": results,
+        "ended": ended,
+    }
+
+
+async def test_concurrent_sessions(client: AsyncServiceClient) -> bool:
+    """测试同一连接上的两个并发会话、进度订阅和分页结果"""
+    print("=== 并发会话测试 ===")
+    ok = True
+    first, second = await asyncio.gather(
+        run_session(client, 'a', 300),
+        run_session(client, 'b', 200),
+    )
+
+    ok &= check(first['session_id'] != second['session_id'], "两个会话的ID不同")
+    for name, outcome, count in (('会话A', first, 300), ('会话B', second, 200)):
+        prefix = f"/fake/{'a' if outcome is first else 'b'}/"
+        ok &= check(len(outcome['completed']) == count,
+                    f"{name}收到全部file_completed事件 ({len(outcome['completed'])})")
+        ok &= check(outcome['summary'] is not None, f"{name}收到session_finished")
+
+        results = outcome['results']
+        paths = {result.get('input_path') for result in results}
+        ok &= check(len(results) == count and len(paths) == count,
+                    f"{name}分页读取全部结果且无重复 ({len(results)})")
+        ok &= check(all(path.startswith(prefix) for path in paths), f"{name}结果不混入另一个会话的文件")
+        failed = sum(1 for result in results if not result.get('success'))
+        ok &= check(outcome['summary'] is not None and outcome['summary'].get('failed_count') == failed,
+                    f"{name}session_finished的失败统计与结果一致 ({failed})")
+        ok &= check(outcome['ended'], f"{name}结束会话")
+
+    ok &= check(not client._pending and not client._subscriptions, "会话结束后没有残留的在途请求和订阅")
+    return ok
+
+
+async def test_cancellation(client: AsyncServiceClient) -> bool:
+    """测试取消正在等待的请求和订阅迭代后的清理"""
+    print("=== 取消清理测试 ===")
+    ok = True
+
+    # 取消等待响应中的请求，在途表中不留下对应的等待者
+    task = asyncio.ensure_future(client.ping())
+    await asyncio.sleep(0)
+    ok &= check(len(client._pending) == 1, "请求已登记到在途表")
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    ok &= check(not client._pending, "取消的请求从在途表中移除")
+
+    # 取消正在迭代订阅的任务，订阅被注销，迟到的推送不再投递
+    session_id = await client.create_session()
+    await client.add_files([{"input_path": f"/fake/c/{i}.ncm"} for i in range(400)], session_id=session_id)
+    subscription = await client.subscribe_progress(session_id)
+    received = []
+
+    async def consume():
+        async for event in subscription:
+            received.append(event)
+
+    consumer = asyncio.ensure_future(consume())
+    await client.start_processing(session_id=session_id)
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + 10
+    while not received and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+    consumer.cancel()
+    try:
+        await consumer
+    except asyncio.CancelledError:
+        pass
+    ok &= check(bool(received), f"取消前已收到推送事件 ({len(received)})")
+    ok &= check(subscription.subscription_id not in client._subscriptions, "取消迭代后订阅被注销")
+
+    # 剩余文件处理完后连接仍可用，且没有残留的等待者
+    final = None
+    async for progress in client.iter_progress(session_id, interval=0.05):
+        final = progress
+    ok &= check(final is not None and final.get('processed_files') == 400, "会话在取消订阅后继续处理完全部文件")
+    ok &= check(len(received) < 400, "取消后不再向订阅投递事件")
+    ok &= check(await client.ping(), "取消后连接仍可用")
+    ok &= check(await client.end_session(session_id), "结束会话")
+    ok &= check(not client._pending and not client._subscriptions, "没有残留的在途请求和订阅")
+    return ok
+
+
+async def run_tests(socket_path: str) -> bool:
+    env = dict(os.environ, FAKE_UM_FAILURE_RATE='0.1', FAKE_UM_LATENCY_MS='20', FAKE_UM_WORKERS='4')
+    process = subprocess.Popen([sys.executable, FAKE_UM_PATH, '--service', '--service-pipe', socket_path], env=env)
+    client = AsyncServiceClient(socket_path)
+    ok = True
+    try:
+        ok &= check(await wait_ready(client, 10), "连接服务成功")
+        ok &= await test_concurrent_sessions(client)
+        ok &= await test_cancellation(client)
+        await client._send_message("shutdown", {})
+    finally:
+        await client.disconnect()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return ok
+
+
+def main():
+    if os.name == 'nt':
+        print("fake_um服务模式仅支持Unix域套接字，跳过")
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='um_async_') as socket_dir:
+        ok = asyncio.run(run_tests(os.path.join(socket_dir, 'async.sock')))
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+um --batch流式输出和旧版完整JSON输出测试（使用fake_um.py，不需要um.exe）
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.processor import FileProcessor  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def run_batch(root: str, legacy: str = "") -> tuple:
+    """用fake_um批处理一组文件，legacy为FAKE_UM_LEGACY_BATCH的值"""
+    if legacy:
+        os.environ['FAKE_UM_LEGACY_BATCH'] = legacy
+    try:
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                                  throughput_path=os.path.join(root, 'throughput.json'))
+        file_list = [f"/fake/album/{i:03d}.ncm" for i in range(50)]
+        results = []
+        response = processor._run_batch_process(file_list, result_callback=results.append)
+    finally:
+        os.environ.pop('FAKE_UM_LEGACY_BATCH', None)
+    return file_list, results, response
+
+
+def test_stream(root: str) -> bool:
+    """流式输出逐个回调结果"""
+    print("=== 流式输出 ===")
+    file_list, results, response = run_batch(root)
+    ok = check(response.get('success') and response.get('success_count') == len(file_list), "全部成功")
+    ok &= check(sorted(r['input_path'] for r in results) == file_list, "每个文件回调一次")
+    return ok
+
+
+def test_legacy(root: str) -> bool:
+    """旧版um输出完整JSON"""
+    print("=== 旧版完整JSON输出 ===")
+    file_list, results, response = run_batch(root, "full")
+    ok = check(response.get('success_count') == len(file_list), "解析完整JSON响应")
+    ok &= check(sorted(r['input_path'] for r in results) == file_list, "每个文件回调一次")
+
+    for mode in ("truncated", "garbage"):
+        try:
+            file_list, results, response = run_batch(root, mode)
+        except ValueError as e:
+            ok &= check(False, f"{mode}: 解析异常未被处理 ({e})")
+            continue
+        ok &= check(response.get('success') is False and '解析批处理输出失败' in response.get('error', ''),
+                    f"{mode}: 返回错误响应而不是抛出异常")
+        ok &= check(response.get('unfinished_files') == file_list, f"{mode}: 列出没有结果的文件")
+        ok &= check(sorted(r['input_path'] for r in results) == file_list
+                    and not any(r.get('success') for r in results)
+                    and response.get('failed_count') == response.get('total_files') == len(file_list),
+                    f"{mode}: 没有结果的文件报告为失败，统计与结果一致")
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix='um_stream_') as root:
+        ok = test_stream(root)
+        ok &= test_legacy(root)
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量删除测试（按目录分组并行删除、合并进度、失败列表、取消，不需要um.exe）
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.file_deleter import FileDeleter  # noqa: E402
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def make_files(root: str, dirs: int, files_per_dir: int) -> list:
+    """创建dirs个目录，每个目录files_per_dir个.ncm文件"""
+    file_list = []
+    for d in range(dirs):
+        directory = os.path.join(root, f"album_{d:03d}")
+        os.makedirs(directory)
+        for i in range(files_per_dir):
+            file_path = os.path.join(directory, f"{i:04d} track.ncm")
+            open(file_path, 'wb').close()
+            file_list.append(file_path)
+    return file_list
+
+
+def test_delete(root: str) -> bool:
+    """删除成功、文件不存在和删除失败"""
+    print("=== 删除 ===")
+    tree = os.path.join(root, 'delete')
+    file_list = make_files(tree, dirs=20, files_per_dir=120)
+    # 同一目录超过一批的大小
+    file_list += make_files(os.path.join(tree, 'big'), dirs=1, files_per_dir=1200)
+    missing = os.path.join(tree, 'album_000', 'missing.ncm')
+    kept = os.path.join(tree, 'album_003', 'cover.jpg')
+    open(kept, 'wb').close()
+    not_a_dir = os.path.join(kept, 'child.ncm')
+    a_directory = os.path.join(tree, 'album_002')
+    file_list.insert(5, missing)
+    file_list.insert(300, not_a_dir)
+    file_list.append(a_directory)
+
+    progress = []
+    deleter = FileDeleter()
+    start = time.perf_counter()
+    deleted, failed, failed_files = deleter.delete_files(file_list, lambda text, value: progress.append(value))
+    elapsed = time.perf_counter() - start
+
+    regular = [path for path in file_list if path not in (missing, not_a_dir, a_directory)]
+    ok = check(deleted == len(regular) and not any(os.path.exists(path) for path in regular),
+               f"删除全部文件 ({deleted} 个, {elapsed:.2f}秒)")
+    ok &= check(failed == 2 and failed_files == [not_a_dir, a_directory], f"失败列表保持原顺序 {failed_files}")
+    ok &= check(os.path.exists(kept) and os.path.isdir(a_directory), "不影响列表以外的文件和目录")
+    ok &= check(progress and progress == sorted(progress) and progress[-1] == 100,
+                f"进度合并回调 ({len(progress)} 次，共 {len(file_list)} 个文件)")
+    ok &= check(not deleter.is_busy(), "删除结束后不再忙碌")
+
+    relative = os.path.join(root, 'relative')
+    os.makedirs(relative)
+    open(os.path.join(relative, 'a.ncm'), 'wb').close()
+    cwd = os.getcwd()
+    os.chdir(relative)
+    try:
+        ok &= check(FileDeleter().delete_files(['a.ncm', 'b.ncm']) == (1, 0, []), "相对路径和不存在的文件")
+    finally:
+        os.chdir(cwd)
+    return ok
+
+
+class CancellingDeleter(FileDeleter):
+    """删除完第一批后请求取消"""
+
+    def _delete_batch(self, directory, file_paths):
+        super()._delete_batch(directory, file_paths)
+        self.cancel_operation()
+
+
+def test_cancel(root: str) -> bool:
+    """取消后不再删除剩余的文件"""
+    print("=== 取消 ===")
+    file_list = make_files(os.path.join(root, 'cancel'), dirs=50, files_per_dir=20)
+    deleter = CancellingDeleter()
+    deleted, failed, failed_files = deleter.delete_files(file_list)
+    remaining = sum(1 for path in file_list if os.path.exists(path))
+    ok = check(0 < deleted < len(file_list) and failed == 0, f"取消前已删除 {deleted} 个文件")
+    ok &= check(remaining == len(file_list) - deleted, f"剩余 {remaining} 个文件未删除")
+
+    # 下一次删除重新开始
+    deleted, _, _ = FileDeleter().delete_files([path for path in file_list if os.path.exists(path)])
+    ok &= check(deleted == remaining, "再次删除时删除剩余的文件")
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix='um_delete_') as root:
+        ok = test_delete(root)
+        ok &= test_cancel(root)
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
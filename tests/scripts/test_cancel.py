@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+停止转换测试：停止后um进程立即结束，未处理的文件留给继续转换（使用fake_um.py，不需要um.exe和真实加密文件）
+"""
+
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.constants import PROCESS_TERMINATE_GRACE_SECONDS  # noqa: E402
+from core.journal import BatchJournal  # noqa: E402
+from core.processor import FileProcessor  # noqa: E402
+from core.service_supervisor import ServiceSupervisor  # noqa: E402
+from core.thread_manager import ThreadManager  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def wait_for(predicate, timeout: float) -> bool:
+    """轮询等待条件成立"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+def running_processes(processor: FileProcessor) -> list:
+    """当前登记的um进程"""
+    with processor._processes_lock:
+        return list(processor._processes)
+
+
+def test_batch_stop(root: str) -> bool:
+    """通过ThreadManager停止批处理：所有分片的um进程立即结束，日志保留未处理的文件"""
+    print("=== 停止批处理 ===")
+    os.environ['FAKE_UM_LATENCY_MS'] = '50'
+    os.environ['FAKE_UM_WORKERS'] = '2'
+    try:
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                                  throughput_path=os.path.join(root, 'throughput.json'))
+        journal = BatchJournal(os.path.join(root, 'journal.jsonl'))
+        manager = ThreadManager(journal=journal)
+        file_list = [f"/fake/album/track_{i:04d}.ncm" for i in range(2000)]
+        manager.start_batch_processing(file_list, os.path.join(root, 'output'), processor, queue.Queue())
+
+        ok = check(wait_for(lambda: running_processes(processor), 30), "批处理进程已启动")
+        time.sleep(0.5)
+        processes = running_processes(processor)
+        start = time.perf_counter()
+        manager.stop_all()
+        exited = wait_for(lambda: all(process.poll() is not None for process in processes), 10)
+        elapsed = time.perf_counter() - start
+    finally:
+        del os.environ['FAKE_UM_LATENCY_MS']
+        del os.environ['FAKE_UM_WORKERS']
+
+    ok &= check(exited and elapsed < PROCESS_TERMINATE_GRACE_SECONDS,
+                f"{len(processes)} 个um进程在停止后立即结束 ({elapsed:.2f}秒)")
+    ok &= check(wait_for(lambda: not running_processes(processor), 10), "进程登记已清空")
+
+    run = None
+    if wait_for(lambda: journal._file is None, 10):
+        run = journal.load_unfinished()
+    ok &= check(run is not None and 0 < len(run['files']) < len(file_list),
+                f"未处理的文件留在日志中 ({len(run['files']) if run else 0}/{len(file_list)})")
+    return ok
+
+
+def test_kill_after_grace(root: str) -> bool:
+    """不响应退出请求的um进程在宽限时间后被强制结束"""
+    print("=== 强制结束 ===")
+    os.environ['FAKE_UM_LATENCY_MS'] = '10000'
+    os.environ['FAKE_UM_IGNORE_TERM'] = '1'
+    try:
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                                  throughput_path=os.path.join(root, 'throughput.json'))
+        outcome = []
+
+        # process_file会检查输入文件，先创建一个空文件
+        input_file = os.path.join(root, 'slow.ncm')
+        open(input_file, 'wb').close()
+        worker = threading.Thread(
+            target=lambda: outcome.append(processor.process_file(input_file, os.path.join(root, 'out'))))
+        worker.start()
+        ok = check(wait_for(lambda: running_processes(processor), 10), "单文件进程已启动")
+        time.sleep(1.0)  # 等待fake_um设置好忽略SIGTERM
+        start = time.perf_counter()
+        processor.cancel()
+        worker.join(timeout=PROCESS_TERMINATE_GRACE_SECONDS + 5)
+        elapsed = time.perf_counter() - start
+    finally:
+        del os.environ['FAKE_UM_LATENCY_MS']
+        del os.environ['FAKE_UM_IGNORE_TERM']
+
+    ok &= check(not worker.is_alive() and elapsed >= PROCESS_TERMINATE_GRACE_SECONDS - 0.5,
+                f"宽限时间后强制结束 ({elapsed:.2f}秒)")
+    ok &= check(outcome and outcome[0][0] is False and outcome[0][1] == "处理已取消", "结果报告为已取消")
+
+    outcome.clear()
+    processor.reset_cancel()
+    ok &= check(processor.process_file(input_file, os.path.join(root, 'out'))[0], "清除停止标志后可以继续处理")
+    return ok
+
+
+def test_service_stop(root: str) -> bool:
+    """服务模式停止：发送stop_processing，立即返回，不回退到传统模式"""
+    print("=== 停止服务模式处理 ===")
+    os.environ['FAKE_UM_LATENCY_MS'] = '50'
+    os.environ['FAKE_UM_WORKERS'] = '2'
+    processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                              throughput_path=os.path.join(root, 'throughput.json'))
+    supervisor = ServiceSupervisor(FAKE_UM_PATH, instance_count=1, base_path=os.path.join(root, 'um_test.sock'))
+    supervisor.start()
+    processor.service_supervisor = supervisor
+    ok = True
+    try:
+        ok &= check(processor.wait_for_service(30), "服务实例启动")
+        file_list = [f"/fake/album/{i}.mflac" for i in range(2000)]
+        results = []
+        outcome = []
+        worker = threading.Thread(target=lambda: outcome.append(
+            processor.process_files_batch(file_list, result_callback=results.append)))
+        worker.start()
+        time.sleep(1.0)
+        start = time.perf_counter()
+        processor.cancel()
+        worker.join(timeout=10)
+        elapsed = time.perf_counter() - start
+        ok &= check(not worker.is_alive() and elapsed < 3, f"停止后立即返回 ({elapsed:.2f}秒)")
+        response = outcome[0] if outcome else {}
+        ok &= check(response.get('success') is False and response.get('error') == "处理已取消", "结果报告为已取消")
+        ok &= check(0 < len(results) < len(file_list), f"只有已完成的文件有结果 ({len(results)}/{len(file_list)})")
+        ok &= check(all(result.get('success') for result in results), "未处理的文件没有被报告为失败")
+        ok &= check(not running_processes(processor), "没有回退到传统模式")
+        ok &= check(processor.service_available, "服务实例仍然可用")
+    finally:
+        del os.environ['FAKE_UM_LATENCY_MS']
+        del os.environ['FAKE_UM_WORKERS']
+        supervisor.stop()
+        for instance in supervisor.instances:
+            if instance.process is not None:
+                instance.process.kill()
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix='um_cancel_') as root:
+        ok = test_batch_stop(root)
+        ok &= test_kill_after_grace(root)
+        if os.name != 'nt':
+            ok &= test_service_stop(root)
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
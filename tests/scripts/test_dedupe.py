@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重复文件合并测试（使用fake_um.py，不需要um.exe和真实加密文件）
+"""
+
+import os
+import sys
+import tempfile
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.dedupe import group_duplicates  # noqa: E402
+from core.processor import FileProcessor  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def write_file(path: str, data: bytes) -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def main():
+    # 让fake_um写出输出文件，副本需要复用真实存在的输出
+    os.environ['FAKE_UM_WRITE_OUTPUT'] = '1'
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='um_dedupe_') as root:
+        song = os.urandom(300 * 1024)
+        other = bytearray(song)
+        other[150 * 1024] ^= 0xFF  # 大小、头尾都相同，只有中间不同
+
+        copies = [write_file(os.path.join(root, f"disk{i}", "song.ncm"), song) for i in range(4)]
+        different = write_file(os.path.join(root, "disk4", "song.ncm"), bytes(other))
+        renamed = write_file(os.path.join(root, "disk5", "renamed.ncm"), song)
+        unique = [write_file(os.path.join(root, "disk0", f"track_{i}.ncm"), os.urandom(2048)) for i in range(5)]
+        file_list = copies + [different, renamed] + unique
+
+        print("=== 分组 ===")
+        to_process, duplicates = group_duplicates(file_list)
+        ok &= check(duplicates == {copies[0]: copies[1:]}, "只有内容和文件名都相同的文件被合并")
+        ok &= check(len(to_process) == len(file_list) - 3, f"需要解密 {len(to_process)} 个文件")
+
+        print("=== 批处理 ===")
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False)
+        results = []
+        response = processor.process_files_batch(file_list, use_source_dir=True, result_callback=results.append)
+        ok &= check(response.get('success_count') == len(file_list), "全部文件成功")
+        ok &= check(response.get('deduplicated_count') == 3, "3个副本复用了输出")
+        ok &= check(sorted(r['input_path'] for r in results) == sorted(file_list), "每个文件回调一次")
+
+        outputs = [os.path.join(os.path.dirname(path), "song.flac") for path in copies]
+        ok &= check(all(os.path.isfile(path) for path in outputs), "每个副本目录下都有输出文件")
+        ok &= check(all(open(path, 'rb').read() == song for path in outputs), "副本输出内容正确")
+        ok &= check(len({os.stat(path).st_ino for path in outputs}) == 1, "副本输出为硬链接")
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多段扩展名匹配测试（使用fake_um.py，不需要um.exe）
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.constants import DEFAULT_SUPPORTED_EXTENSIONS  # noqa: E402
+from core.ext_matcher import ExtensionMatcher  # noqa: E402
+from core.file_deleter import FileDeleter  # noqa: E402
+from core.processor import FileProcessor  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+MATCH_CASES = [
+    ("song.ncm", ".ncm"),
+    ("SONG.NCM", ".ncm"),
+    ("周杰伦 - 晴天.kgm.flac", ".kgm.flac"),
+    ("a.b.c.VPR.FLAC", ".vpr.flac"),
+    ("live.kgm", ".kgm"),
+    ("track.flac", ""),
+    ("Mr. Big - To Be With You.mflac0", ".mflac0"),
+    ("/music/album.kgm/cover", ""),
+    ("/music/album.ncm/readme.txt", ""),
+    ("noextension", ""),
+    (".ncm", ".ncm"),
+    ("", ""),
+]
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def test_matcher() -> bool:
+    """测试后缀匹配规则"""
+    print("=== 后缀匹配 ===")
+    matcher = ExtensionMatcher(DEFAULT_SUPPORTED_EXTENSIONS + ['kgm.flac', '.VPR.FLAC'])
+    ok = True
+    for name, expected in MATCH_CASES:
+        actual = matcher.match(name)
+        ok &= check(actual == expected, f"{name!r} -> {expected!r}" + ("" if actual == expected else f" (实际 {actual!r})"))
+    ok &= check(ExtensionMatcher([]).match("song.ncm") == "", "空扩展名列表不匹配任何文件")
+    return ok
+
+
+def test_callers(root: str) -> bool:
+    """FileProcessor和FileDeleter识别多段扩展名"""
+    print("=== 调用方 ===")
+    processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False,
+                              throughput_path=os.path.join(root, 'throughput.json'))
+    ok = check(processor.is_supported_file("/music/a.kgm.flac"), "is_supported_file识别.kgm.flac")
+    ok &= check(not processor.is_supported_file("/music/a.flac"), "普通.flac不支持")
+    ok &= check(processor.get_output_filename("/music/a.kgm.flac").startswith("a."), "输出文件名去掉完整的多段扩展名")
+
+    tree = os.path.join(root, 'tree')
+    os.makedirs(os.path.join(tree, 'sub.ncm'))
+    names = ['a.ncm', 'b.KGM.FLAC', 'c.flac', os.path.join('sub.ncm', 'd.vpr.flac'), os.path.join('sub.ncm', 'e.txt')]
+    for name in names:
+        open(os.path.join(tree, name), 'wb').close()
+    success, files, _ = FileDeleter().scan_files(tree, ['.ncm', '.kgm.flac', '.vpr.flac'])
+    found = sorted(os.path.relpath(path, tree) for path in files)
+    expected = sorted(['a.ncm', 'b.KGM.FLAC', os.path.join('sub.ncm', 'd.vpr.flac')])
+    ok &= check(success and found == expected, f"FileDeleter扫描识别多段扩展名 {found}")
+    return ok
+
+
+def bench() -> bool:
+    """粗略测量匹配速度"""
+    print("=== 速度 ===")
+    matcher = ExtensionMatcher(DEFAULT_SUPPORTED_EXTENSIONS)
+    names = [f"Artist feat. Someone - Track {i:06d} (Live ver.).{'ncm' if i % 3 else 'jpg'}" for i in range(500_000)]
+    start = time.perf_counter()
+    matched = sum(1 for name in names if matcher.match(name))
+    elapsed = time.perf_counter() - start
+    print(f"  50万个文件名: {elapsed:.2f}秒（{elapsed / len(names) * 1e6:.2f}微秒/个）")
+    return check(matched == sum(1 for i in range(500_000) if i % 3), "匹配结果正确")
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix='um_ext_') as root:
+        ok = test_matcher()
+        ok &= test_callers(root)
+        ok &= bench()
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批处理日志（中断后继续转换）测试（使用fake_um.py，不需要um.exe和真实加密文件）
+"""
+
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.journal import BatchJournal  # noqa: E402
+from core.processor import FileProcessor  # noqa: E402
+from core.thread_manager import ThreadManager  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+# 在子进程中开始批处理，由父进程中途强制结束，模拟程序崩溃
+CRASH_SCRIPT = """
+import queue, sys, time
+sys.path.insert(0, {gui_path!r})
+from core.journal import BatchJournal
+from core.processor import FileProcessor
+from core.thread_manager import ThreadManager
+processor = FileProcessor({fake_um!r}, use_service_mode=False, use_dedupe=False)
+manager = ThreadManager(journal=BatchJournal({journal!r}))
+manager.start_batch_processing({files!r}, {output_dir!r}, processor, queue.Queue(), naming_format='original')
+time.sleep(60)
+"""
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def run_batch(manager: ThreadManager, processor: FileProcessor, file_list: list, output_dir: str) -> list:
+    """通过ThreadManager批处理并等待完成，返回GUI收到的消息"""
+    messages = queue.Queue()
+    manager.start_batch_processing(file_list, output_dir, processor, messages, naming_format='original')
+    received = []
+    while True:
+        message = messages.get(timeout=60)
+        received.append(message)
+        if message['type'] in ('batch_complete', 'batch_error'):
+            return received
+
+
+def main():
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='um_journal_') as root:
+        journal_path = os.path.join(root, 'journal.jsonl')
+        output_dir = os.path.join(root, 'output')
+        file_list = [f"/fake/album/track_{i:03d}.ncm" for i in range(300)]
+
+        print("=== 日志格式 ===")
+        journal = BatchJournal(journal_path)
+        journal.begin(file_list[:3], output_dir, False, 'original')
+        journal.record({"input_path": file_list[0], "success": True})
+        journal.record({"input_path": file_list[1], "success": False})
+        journal.close()
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"type": "result", "input_pa')  # 崩溃时写了一半的行
+        run = journal.load_unfinished()
+        ok &= check(run is not None and run['files'] == file_list[2:3], "失败的文件视为已完成，忽略写了一半的行")
+        ok &= check(run is not None and run['output_dir'] == output_dir and run['naming_format'] == 'original',
+                    "恢复输出设置")
+
+        print("=== 中途崩溃 ===")
+        env = dict(os.environ, FAKE_UM_LATENCY_MS='20', FAKE_UM_WORKERS='2')
+        script = CRASH_SCRIPT.format(gui_path=os.path.join(project_root, 'music_unlock_gui'), fake_um=FAKE_UM_PATH,
+                                     journal=journal_path, files=file_list, output_dir=output_dir)
+        child = subprocess.Popen([sys.executable, '-c', script], env=env,
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(2.0)
+        child.kill()
+        child.wait()
+        run = journal.load_unfinished()
+        remaining = run['files'] if run else []
+        ok &= check(0 < len(remaining) < len(file_list), f"崩溃后还有 {len(remaining)} 个文件未完成")
+        ok &= check(run is not None and run['total_files'] == len(file_list), "记录了文件总数")
+
+        print("=== 继续转换 ===")
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False)
+        manager = ThreadManager(journal=BatchJournal(journal_path))
+        messages = run_batch(manager, processor, remaining, run['output_dir'])
+        handled = [message['file_path'] for message in messages if message['type'] in ('success', 'error')]
+        ok &= check(sorted(handled) == sorted(remaining), "只提交未完成的文件")
+        ok &= check(messages[-1]['type'] == 'batch_complete', "批处理完成")
+        ok &= check(journal.load_unfinished() is None, "正常结束后没有可继续的任务")
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转换记录（增量转换）测试（使用fake_um.py，不需要um.exe和真实加密文件）
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.processor import FileProcessor  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def create_library(root: str, count: int) -> list:
+    """创建虚拟的加密文件"""
+    file_list = []
+    for i in range(count):
+        file_path = os.path.join(root, f"track_{i:03d}.ncm")
+        with open(file_path, 'wb') as f:
+            f.write(os.urandom(1024 + i))
+        file_list.append(file_path)
+    return file_list
+
+
+def main():
+    # 让fake_um写出输出文件，模拟真实转换后的状态
+    os.environ['FAKE_UM_WRITE_OUTPUT'] = '1'
+    ok = True
+    with tempfile.TemporaryDirectory(prefix='um_manifest_') as root:
+        library = os.path.join(root, 'library')
+        output_dir = os.path.join(root, 'output')
+        os.makedirs(library)
+        os.makedirs(output_dir)
+        file_list = create_library(library, 50)
+
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_manifest=True,
+                                  manifest_path=os.path.join(root, 'manifest.db'), use_dedupe=False)
+
+        print("=== 首次转换 ===")
+        response = processor.process_files_batch(file_list, output_dir)
+        ok &= check(response.get('success_count') == len(file_list), "全部文件交给um转换")
+        ok &= check(response.get('skipped_count') == 0, "没有跳过的文件")
+
+        print("=== 重复转换 ===")
+        start = time.perf_counter()
+        response = processor.process_files_batch(file_list, output_dir)
+        ok &= check(response.get('skipped_count') == len(file_list),
+                    f"全部文件跳过 ({(time.perf_counter() - start) * 1000:.1f}ms)")
+        ok &= check(response.get('success_count') == len(file_list), "跳过的文件计为成功")
+
+        print("=== 文件变化后 ===")
+        with open(file_list[0], 'ab') as f:
+            f.write(b'changed')
+        os.utime(file_list[1], ns=(time.time_ns(), time.time_ns() + 10**9))
+        os.remove(response['results'][2]['output_path'])
+        callbacks = []
+        response = processor.process_files_batch(file_list, output_dir, result_callback=callbacks.append)
+        ok &= check(response.get('skipped_count') == len(file_list) - 2,
+                    "内容变化和输出被删除的文件重新转换，只有修改时间变化的文件跳过")
+        ok &= check(len(callbacks) == len(file_list), "每个文件回调一次（包括跳过的文件）")
+
+        print("=== 命名格式变化后 ===")
+        response = processor.process_files_batch(file_list, output_dir, naming_format='original')
+        ok &= check(response.get('skipped_count') == 0, "命名格式不同时全部重新转换")
+
+        processor.manifest.close()
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失败分类和临时性I/O错误自动重试测试（使用fake_um.py，不需要um.exe和真实加密文件）
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+import core.processor as processor_module  # noqa: E402
+from core.failures import (  # noqa: E402
+    FAILURE_TRANSIENT_IO, FAILURE_PERMISSION, FAILURE_NOT_FOUND, FAILURE_UNSUPPORTED,
+    FAILURE_DECODER, FAILURE_TIMEOUT, FAILURE_UNKNOWN, classify_failure
+)
+from core.processor import FileProcessor  # noqa: E402
+from fake_um import should_fail  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+FAILURE_RATE = 0.1
+
+CLASSIFY_CASES = [
+    ("读取音频数据失败: read //nas/music/a.ncm: input/output error", FAILURE_TRANSIENT_IO),
+    ("打开文件失败: open \\\\nas\\a.ncm: The specified network name is no longer available.", FAILURE_TRANSIENT_IO),
+    ("打开文件失败: open \\\\nas\\a.ncm: The network path was not found.", FAILURE_TRANSIENT_IO),
+    ("打开文件失败: open /music/a.ncm: permission denied", FAILURE_PERMISSION),
+    ("创建输出文件失败: open D:\\out\\a.flac: Access is denied.", FAILURE_PERMISSION),
+    ("输入文件不存在: /music/a.ncm", FAILURE_NOT_FOUND),
+    ("处理超时（超过60秒），已终止", FAILURE_TIMEOUT),
+    ("不支持的文件格式: .mp3", FAILURE_UNSUPPORTED),
+    ("没有找到合适的解码器", FAILURE_DECODER),
+    ("模拟解密失败: a.ncm", FAILURE_DECODER),
+    ("something odd happened", FAILURE_UNKNOWN),
+    ("", FAILURE_UNKNOWN),
+]
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def test_classify() -> bool:
+    """测试错误信息分类"""
+    print("=== 失败分类 ===")
+    ok = True
+    for error, expected in CLASSIFY_CASES:
+        actual = classify_failure(error)
+        ok &= check(actual == expected, f"{expected:<12} {error[:50]!r}" + ("" if actual == expected else f" -> {actual}"))
+    return ok
+
+
+def run_flaky_batch(root: str, name: str, flaky_count: int) -> tuple:
+    """批处理一组文件，其中路径包含flaky的文件前flaky_count次返回I/O错误"""
+    flaky_dir = os.path.join(root, name)
+    os.makedirs(flaky_dir)
+    os.environ.update(FAKE_UM_FLAKY_MATCH='flaky', FAKE_UM_FLAKY_COUNT=str(flaky_count),
+                      FAKE_UM_FLAKY_DIR=flaky_dir, FAKE_UM_FAILURE_RATE=str(FAILURE_RATE))
+    try:
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                                  throughput_path=os.path.join(root, 'throughput.json'))
+        # 模拟I/O错误的文件不能同时是模拟解码失败的文件
+        flaky = [path for path in (f"/nas/album/flaky_{i}.ncm" for i in range(20))
+                 if not should_fail(path, FAILURE_RATE)][:5]
+        file_list = [f"/nas/album/track_{i:03d}.ncm" for i in range(100)] + flaky
+        results = []
+        start = time.perf_counter()
+        response = processor.process_files_batch(file_list, result_callback=results.append)
+        elapsed = time.perf_counter() - start
+    finally:
+        for key in ('FAKE_UM_FLAKY_MATCH', 'FAKE_UM_FLAKY_COUNT', 'FAKE_UM_FLAKY_DIR', 'FAKE_UM_FAILURE_RATE'):
+            del os.environ[key]
+    return file_list, results, response, elapsed
+
+
+def test_retry_succeeds(root: str) -> bool:
+    """临时性I/O错误的文件重试后成功，其他失败不重试"""
+    print("=== 重试后成功 ===")
+    file_list, results, response, elapsed = run_flaky_batch(root, 'recover', 2)
+
+    ok = check(sorted(r['input_path'] for r in results) == sorted(file_list), "每个文件只回调一次最终结果")
+    flaky = [r for r in results if 'flaky' in r['input_path']]
+    ok &= check(all(r.get('success') for r in flaky), "临时性I/O错误的文件第2次重试后成功")
+    failed = [r for r in results if not r.get('success')]
+    ok &= check(failed and all(r.get('failure_kind') == FAILURE_DECODER for r in failed),
+                f"解码失败的文件标注失败类型且不重试 ({len(failed)} 个)")
+    ok &= check(response.get('retried_count') == 2 * len(flaky), f"只重试临时性失败的文件 ({response.get('retried_count')})")
+    ok &= check(response.get('success_count') + response.get('failed_count') == len(file_list)
+                and response.get('failed_count') == len(failed), "统计按最终结果计算")
+    ok &= check(elapsed >= processor_module.RETRY_BASE_DELAY_SECONDS * 3, f"重试间隔指数退避 ({elapsed:.2f}秒)")
+    return ok
+
+
+def test_retry_exhausted(root: str) -> bool:
+    """重试次数用完后报告为临时性I/O失败"""
+    print("=== 重试次数用完 ===")
+    file_list, results, response, _ = run_flaky_batch(root, 'exhausted', 10)
+
+    ok = check(sorted(r['input_path'] for r in results) == sorted(file_list), "每个文件只回调一次最终结果")
+    flaky = [r for r in results if 'flaky' in r['input_path']]
+    ok &= check(all(not r.get('success') and r.get('failure_kind') == FAILURE_TRANSIENT_IO for r in flaky),
+                "仍然失败的文件报告为临时性I/O错误")
+    ok &= check(response.get('retried_count') == processor_module.RETRY_MAX_ATTEMPTS * len(flaky),
+                f"最多重试 {processor_module.RETRY_MAX_ATTEMPTS} 次")
+    return ok
+
+
+def test_cancel_during_backoff(root: str) -> bool:
+    """等待重试时停止处理，等待重试的文件不计入失败数"""
+    print("=== 等待重试时停止 ===")
+    flaky_dir = os.path.join(root, 'cancel')
+    os.makedirs(flaky_dir)
+    os.environ.update(FAKE_UM_FLAKY_MATCH='flaky', FAKE_UM_FLAKY_COUNT='10', FAKE_UM_FLAKY_DIR=flaky_dir)
+    base_delay = processor_module.RETRY_BASE_DELAY_SECONDS
+    processor_module.RETRY_BASE_DELAY_SECONDS = 30.0
+    try:
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                                  throughput_path=os.path.join(root, 'throughput.json'))
+        normal = [f"/nas/album/track_{i:03d}.ncm" for i in range(50)]
+        file_list = normal + [f"/nas/album/flaky_{i}.ncm" for i in range(5)]
+        results = []
+
+        def on_result(result):
+            results.append(result)
+            # 其余文件都有结果后，整批结束进入重试等待，此时停止处理
+            if len(results) == len(normal):
+                threading.Timer(0.2, processor.cancel).start()
+
+        start = time.perf_counter()
+        response = processor.process_files_batch(file_list, result_callback=on_result)
+        elapsed = time.perf_counter() - start
+    finally:
+        processor_module.RETRY_BASE_DELAY_SECONDS = base_delay
+        for key in ('FAKE_UM_FLAKY_MATCH', 'FAKE_UM_FLAKY_COUNT', 'FAKE_UM_FLAKY_DIR'):
+            del os.environ[key]
+
+    ok = check(elapsed < 10, f"停止后立即结束等待 ({elapsed:.2f}秒)")
+    ok &= check(sorted(r['input_path'] for r in results) == normal, "等待重试的文件没有回调结果")
+    ok &= check(response.get('cancelled_count') == 5 and response.get('success') is False,
+                f"等待重试的文件记为已取消 ({response.get('cancelled_count')})")
+    ok &= check(response.get('success_count') + response.get('failed_count') == len(results) == response.get('total_files'),
+                f"统计与回调的结果一致 (成功 {response.get('success_count')}, 失败 {response.get('failed_count')})")
+    return ok
+
+
+def main():
+    # 缩短等待时间，保持指数退避的比例
+    processor_module.RETRY_BASE_DELAY_SECONDS = 0.2
+    processor_module.RETRY_MAX_DELAY_SECONDS = 0.5
+    with tempfile.TemporaryDirectory(prefix='um_retry_') as root:
+        ok = test_classify()
+        ok &= test_retry_succeeds(root)
+        ok &= test_retry_exhausted(root)
+        ok &= test_cancel_during_backoff(root)
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并行目录扫描器和扫描缓存测试（临时目录树，不需要um.exe）
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.constants import DEFAULT_SUPPORTED_EXTENSIONS  # noqa: E402
+from core.ext_matcher import ExtensionMatcher  # noqa: E402
+from core.file_deleter import FileDeleter  # noqa: E402
+from core.scan_cache import ScanCache  # noqa: E402
+from core.scanner import DirectoryScanner  # noqa: E402
+
+MATCHER = ExtensionMatcher(DEFAULT_SUPPORTED_EXTENSIONS)
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def make_tree(root: str, artists: int = 20, albums: int = 10, tracks: int = 12) -> None:
+    """创建 艺术家/专辑/曲目 结构的目录树，混入封面和歌词文件"""
+    for a in range(artists):
+        for b in range(albums):
+            album = os.path.join(root, f"artist_{a:02d}", f"album_{b:02d}")
+            os.makedirs(album)
+            for t in range(tracks):
+                ext = ('ncm', 'kgm', 'qmcflac', 'kgm.flac')[t % 4]
+                open(os.path.join(album, f"{t:02d} track.{ext}"), 'wb').close()
+            open(os.path.join(album, "cover.jpg"), 'wb').close()
+            open(os.path.join(album, "lyrics.lrc"), 'wb').close()
+
+
+def walk_expected(root: str) -> list:
+    """os.walk得到的参考结果"""
+    return sorted(os.path.join(d, name) for d, _, names in os.walk(root) for name in names if MATCHER.matches(name))
+
+
+def test_scan(root: str) -> bool:
+    """扫描结果与os.walk一致，按批返回"""
+    print("=== 扫描结果 ===")
+    scanner = DirectoryScanner(MATCHER.matches, chunk_size=100)
+    chunks = [chunk for chunk in scanner.scan(root)]
+    found = [path for chunk in chunks for path in chunk]
+    expected = walk_expected(root)
+
+    ok = check(sorted(found) == expected, f"结果与os.walk一致 ({len(found)} 个文件)")
+    ok &= check(len(found) == len(set(found)), "没有重复的文件")
+    ok &= check(all(len(chunk) <= 100 for chunk in chunks) and len([c for c in chunks if c]) >= len(found) // 100,
+                f"按批返回，每批不超过chunk_size ({len([c for c in chunks if c])} 批)")
+    ok &= check(scanner.dirs_scanned == 1 + 20 + 20 * 10, f"扫描目录数正确 ({scanner.dirs_scanned})")
+    ok &= check(scanner.files_seen == 20 * 10 * 14 and scanner.files_matched == len(found),
+                f"文件计数正确 ({scanner.files_seen} 个文件, 匹配 {scanner.files_matched} 个)")
+    ok &= check(scanner.files_per_second > 0 and not scanner.cancelled,
+                f"每秒文件数 {scanner.files_per_second:.0f}")
+    return ok
+
+
+def test_progress(root: str) -> bool:
+    """按目录树分支估计的进度"""
+    print("=== 进度估计 ===")
+    # 两个顶层目录大小差别很大：一个只有一层，一个有很多子目录
+    tree = os.path.join(root, 'uneven')
+    os.makedirs(os.path.join(tree, 'small'))
+    for i in range(30):
+        os.makedirs(os.path.join(tree, 'large', f"album_{i:02d}"))
+    scanner = DirectoryScanner(MATCHER.matches, max_workers=1, chunk_interval=0)
+    values = [scanner.progress for _ in scanner.scan(tree)]
+    ok = check(values == sorted(values) and all(0 <= value <= 1 for value in values), "进度单调递增且在0到1之间")
+    ok &= check(scanner.progress == 1.0, "完成时进度为1")
+
+    scanner = DirectoryScanner(MATCHER.matches, collect_sizes=True)
+    files = [f for chunk in scanner.scan(os.path.join(root, 'tree')) for f in chunk]
+    ok &= check(len(scanner.sizes) == len(files) and all(size == 0 for size in scanner.sizes.values()),
+                f"记录匹配文件的大小 ({len(scanner.sizes)} 个)")
+    return ok
+
+
+def test_edge_cases(root: str) -> bool:
+    """空目录、不存在的目录和符号链接"""
+    print("=== 边界情况 ===")
+    empty = os.path.join(root, 'empty')
+    os.makedirs(empty)
+    ok = check([f for chunk in DirectoryScanner(MATCHER.matches).scan(empty) for f in chunk] == [], "空目录没有结果")
+
+    scanner = DirectoryScanner(MATCHER.matches)
+    missing = [f for chunk in scanner.scan(os.path.join(root, 'missing')) for f in chunk]
+    ok &= check(missing == [] and scanner.errors == 1, "不存在的目录记录错误后结束")
+
+    if hasattr(os, 'symlink'):
+        linked = os.path.join(root, 'linked')
+        os.makedirs(linked)
+        open(os.path.join(linked, 'a.ncm'), 'wb').close()
+        try:
+            os.symlink(os.path.join(root, 'tree'), os.path.join(linked, 'loop'))
+        except OSError:
+            pass
+        else:
+            found = [f for chunk in DirectoryScanner(MATCHER.matches).scan(linked) for f in chunk]
+            ok &= check(found == [os.path.join(linked, 'a.ncm')], "不进入符号链接指向的目录")
+    return ok
+
+
+def test_cancel(root: str) -> bool:
+    """取消扫描和提前停止迭代"""
+    print("=== 取消 ===")
+    scanner = DirectoryScanner(MATCHER.matches, max_workers=2, chunk_size=10)
+    found = []
+    for chunk in scanner.scan(root):
+        found.extend(chunk)
+        if found:
+            scanner.cancel()
+    ok = check(scanner.cancelled and len(found) < len(walk_expected(root)),
+               f"取消后停止扫描 ({len(found)} 个文件)")
+
+    scanner = DirectoryScanner(MATCHER.matches)
+    scanner.cancel()
+    ok &= check([f for chunk in scanner.scan(root) for f in chunk] == [], "开始前取消不返回任何文件")
+
+    scanner = DirectoryScanner(MATCHER.matches, chunk_size=10)
+    iterator = scanner.scan(root)
+    next(iterator)
+    iterator.close()
+    ok &= check(scanner.cancelled, "提前停止迭代时取消剩余任务")
+    return ok
+
+
+def test_file_deleter(root: str) -> bool:
+    """FileDeleter扫描进行中按批回调"""
+    print("=== FileDeleter ===")
+    deleter = FileDeleter()
+    streamed = []
+    streamed_sizes = []
+    progress = []
+
+    def on_files(chunk, sizes):
+        streamed.extend(chunk)
+        streamed_sizes.extend(sizes)
+
+    success, files, error = deleter.scan_files(root, ['.ncm', '.kgm.flac'],
+                                               progress_callback=lambda text, value: progress.append(value),
+                                               files_callback=on_files)
+    expected = sorted(os.path.join(d, name) for d, _, names in os.walk(root)
+                      for name in names if name.endswith(('.ncm', '.kgm.flac')))
+    ok = check(success and sorted(files) == expected, f"扫描结果正确 ({len(files)} 个文件)")
+    ok &= check(sorted(streamed) == expected, "按批回调的文件与最终结果一致")
+    ok &= check(streamed_sizes == [os.path.getsize(path) for path in streamed]
+                and all(deleter.file_sizes[path] == os.path.getsize(path) for path in files),
+                "扫描时读取的文件大小正确")
+    ok &= check(progress and progress == sorted(progress) and progress[-1] == 100,
+                f"进度单调递增并在完成时为100% ({len(progress)} 次更新)")
+
+    # 在另一个线程取消
+    deleter = FileDeleter()
+    cancel_sent = threading.Event()
+
+    def on_files_cancel(chunk, sizes):
+        if not cancel_sent.is_set():
+            cancel_sent.set()
+            threading.Thread(target=deleter.cancel_operation).start()
+
+    success, files, _ = deleter.scan_files(root, ['.ncm', '.kgm.flac', '.kgm', '.qmcflac'], files_callback=on_files_cancel)
+    ok &= check(success and cancel_sent.is_set() and not deleter.is_busy(), f"取消后扫描结束 ({len(files)} 个文件)")
+    return ok
+
+
+def age_directories(root: str) -> None:
+    """把目录修改时间调到一小时前（刚修改的目录不会被缓存）"""
+    old = time.time() - 3600
+    for directory, _, _ in os.walk(root):
+        os.utime(directory, (old, old))
+
+
+def cached_scan(root: str, cache: ScanCache) -> tuple:
+    scanner = DirectoryScanner(MATCHER.matches, cache=cache)
+    return sorted(f for chunk in scanner.scan(root) for f in chunk), scanner
+
+
+def test_cache(root: str) -> bool:
+    """扫描缓存只重新读取修改时间变化的目录"""
+    print("=== 扫描缓存 ===")
+    tree = os.path.join(root, 'cached')
+    make_tree(tree, artists=5, albums=4, tracks=6)
+    age_directories(tree)
+    cache = ScanCache(os.path.join(root, 'scan_cache.db'))
+
+    found, scanner = cached_scan(tree, cache)
+    ok = check(found == walk_expected(tree) and scanner.dirs_cached == 0, f"首次扫描读取全部目录 ({len(found)} 个文件)")
+    found, scanner = cached_scan(tree, cache)
+    ok &= check(found == walk_expected(tree) and scanner.dirs_cached == scanner.dirs_scanned == 26,
+                f"再次扫描全部使用缓存 ({scanner.dirs_cached} 个目录)")
+
+    album = os.path.join(tree, 'artist_01', 'album_02')
+    open(os.path.join(album, 'new.ncm'), 'wb').close()
+    os.remove(os.path.join(album, '00 track.ncm'))
+    os.utime(album, (time.time() - 60, time.time() - 60))
+    found, scanner = cached_scan(tree, cache)
+    ok &= check(found == walk_expected(tree) and scanner.dirs_cached == 25, "新增和删除的文件只重新读取所在目录")
+
+    removed = os.path.join(tree, 'artist_02')
+    for directory, _, names in os.walk(removed, topdown=False):
+        for name in names:
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+    os.utime(tree, (time.time() - 60, time.time() - 60))
+    found, scanner = cached_scan(tree, cache)
+    ok &= check(found == walk_expected(tree) and not any(removed in f for f in found), "删除的子目录不再出现")
+    ok &= check(not any(path.startswith(os.path.normcase(removed)) for path in cache.load(tree)),
+                "完整扫描后删除不存在的目录的缓存")
+
+    # 刚修改的目录不缓存
+    open(os.path.join(album, 'newer.ncm'), 'wb').close()
+    _, scanner = cached_scan(tree, cache)
+    _, scanner = cached_scan(tree, cache)
+    ok &= check(scanner.dirs_cached == scanner.dirs_scanned - 1, "刚修改的目录每次都重新读取")
+    ok &= check(len(cache.load(album)) == 1 and len(cache.load(tree)) == 21, "按根目录读取缓存")
+    cache.close()
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix='um_scan_') as root:
+        tree = os.path.join(root, 'tree')
+        make_tree(tree)
+        ok = test_scan(tree)
+        ok &= test_edge_cases(root)
+        ok &= test_progress(root)
+        ok &= test_cancel(tree)
+        ok &= test_file_deleter(tree)
+        ok &= test_cache(root)
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
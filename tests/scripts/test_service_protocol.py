@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+服务协议回归测试（使用fake_um.py，不需要um.exe和真实文件）
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.processor import FileProcessor  # noqa: E402
+from core.service_client import ServiceClient  # noqa: E402
+from core.service_supervisor import ServiceSupervisor  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def test_service_client(socket_path: str) -> bool:
+    """测试ServiceClient的会话、推送事件和分页结果"""
+    print("=== ServiceClient协议测试 ===")
+    env = dict(os.environ, FAKE_UM_FAILURE_RATE='0.1', FAKE_UM_STARTUP_DELAY_MS='200')
+    process = subprocess.Popen([sys.executable, FAKE_UM_PATH, '--service', '--service-pipe', socket_path], env=env)
+    client = ServiceClient(socket_path)
+    ok = True
+    try:
+        ok &= check(client.wait_until_ready(10), "就绪探测成功")
+        info = client.hello()
+        ok &= check(bool(info) and 'get_results' in info.get('capabilities', []), "hello握手返回协议能力")
+
+        files = [{"input_path": f"/fake/{i}.ncm"} for i in range(5000)]
+        session_id = client.create_session()
+        ok &= check(client.add_files(files, session_id=session_id), "分块添加5000个文件")
+        subscription = client.subscribe_progress(session_id)
+        ok &= check(client.start_processing(session_id=session_id), "开始处理")
+
+        completed = 0
+        summary = None
+        for event in subscription.events(heartbeat=1.0):
+            if event['type'] == 'file_completed':
+                completed += 1
+            elif event['type'] == 'session_finished':
+                summary = event
+        ok &= check(completed == len(files), f"收到全部file_completed事件 ({completed})")
+        ok &= check(summary is not None and summary.get('failed_count', 0) > 0, "session_finished包含失败统计")
+
+        results = list(client.iter_results(session_id, page_size=700))
+        ok &= check(len(results) == len(files), f"分页读取全部结果 ({len(results)})")
+
+        # 超时的请求不留在在途表中，迟到的响应不影响后续请求
+        never_answered = Future()
+        client._pending['never-answered'] = never_answered
+        client._wait_response(never_answered, timeout=0.05)
+        ok &= check('never-answered' not in client._pending, "超时的请求从在途表中移除")
+        for _ in range(20):
+            client.ping(timeout=0)
+        time.sleep(0.2)
+        ok &= check(not client._pending and client.ping(), "迟到的响应不影响后续请求")
+        ok &= check(client.end_session(session_id), "结束会话")
+        ok &= check(client.shutdown(), "请求服务退出")
+    finally:
+        client.disconnect()
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return ok
+
+
+def test_processor_fallback(socket_dir: str) -> bool:
+    """测试服务模式批处理及实例崩溃后的回退与重启"""
+    print("=== FileProcessor服务模式测试 ===")
+    processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False)
+    supervisor = ServiceSupervisor(FAKE_UM_PATH, instance_count=2,
+                                   base_path=os.path.join(socket_dir, 'um_test.sock'))
+    supervisor.start()
+    processor.service_supervisor = supervisor
+    ok = True
+    try:
+        ok &= check(processor.wait_for_service(30), "服务实例启动")
+        file_list = [f"/fake/album/{i}.mflac" for i in range(300)]
+        results = []
+        response = processor.process_files_batch(file_list, result_callback=results.append)
+        ok &= check(response.get('success_count') == len(file_list), "服务模式全部成功")
+        ok &= check(len(results) == len(file_list), "每个文件回调一次")
+
+        # 结束一个实例的进程，批处理应回退并由监管器重启该实例
+        supervisor.instances[1].process.kill()
+        supervisor.instances[1].process.wait()
+        results = []
+        response = processor.process_files_batch(file_list, result_callback=results.append)
+        ok &= check(response.get('success_count') == len(file_list), "实例崩溃时剩余文件回退处理")
+        ok &= check(len({r['input_path'] for r in results}) == len(file_list), "回退后每个文件都有结果")
+
+        deadline = time.time() + 15
+        while time.time() < deadline and not all(instance.healthy for instance in supervisor.instances):
+            time.sleep(0.2)
+        ok &= check(all(instance.healthy for instance in supervisor.instances), "崩溃实例已重启")
+    finally:
+        supervisor.stop()
+        for instance in supervisor.instances:
+            if instance.client.connect(timeout=1.0, quiet=True):
+                instance.client.shutdown(force=True)
+    return ok
+
+
+def main():
+    if os.name == 'nt':
+        print("fake_um服务模式仅支持Unix域套接字，跳过")
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='um_proto_') as socket_dir:
+        ok = test_service_client(os.path.join(socket_dir, 'client.sock'))
+        ok &= test_processor_fallback(socket_dir)
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
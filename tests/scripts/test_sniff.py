@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+输出格式预测测试（使用构造的加密文件，不需要um.exe）
+"""
+
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core import sniff  # noqa: E402
+
+FLAC = b"fLaC" + bytes(300)
+OGG = b"OggS" + bytes(300)
+M4A = struct.pack(">I", 24) + b"ftypM4A " + bytes(4) + b"M4A isom" + bytes(300)
+
+# 以下参考数据抄自Go实现（algo/qmc/cipher_static.go、algo/kgm/kgm_header.go、algo/kgm/kgm_v3.go），
+# 不使用core.sniff中的表，两边不一致时解密测试会失败
+QMC_STATIC_BOX = bytes([
+    0x77, 0x48, 0x32, 0x73, 0xDE, 0xF2, 0xC0, 0xC8,  # 0x00
+    0x95, 0xEC, 0x30, 0xB2, 0x51, 0xC3, 0xE1, 0xA0,  # 0x08
+    0x9E, 0xE6, 0x9D, 0xCF, 0xFA, 0x7F, 0x14, 0xD1,  # 0x10
+    0xCE, 0xB8, 0xDC, 0xC3, 0x4A, 0x67, 0x93, 0xD6,  # 0x18
+    0x28, 0xC2, 0x91, 0x70, 0xCA, 0x8D, 0xA2, 0xA4,  # 0x20
+    0xF0, 0x08, 0x61, 0x90, 0x7E, 0x6F, 0xA2, 0xE0,  # 0x28
+    0xEB, 0xAE, 0x3E, 0xB6, 0x67, 0xC7, 0x92, 0xF4,  # 0x30
+    0x91, 0xB5, 0xF6, 0x6C, 0x5E, 0x84, 0x40, 0xF7,  # 0x38
+    0xF3, 0x1B, 0x02, 0x7F, 0xD5, 0xAB, 0x41, 0x89,  # 0x40
+    0x28, 0xF4, 0x25, 0xCC, 0x52, 0x11, 0xAD, 0x43,  # 0x48
+    0x68, 0xA6, 0x41, 0x8B, 0x84, 0xB5, 0xFF, 0x2C,  # 0x50
+    0x92, 0x4A, 0x26, 0xD8, 0x47, 0x6A, 0x7C, 0x95,  # 0x58
+    0x61, 0xCC, 0xE6, 0xCB, 0xBB, 0x3F, 0x47, 0x58,  # 0x60
+    0x89, 0x75, 0xC3, 0x75, 0xA1, 0xD9, 0xAF, 0xCC,  # 0x68
+    0x08, 0x73, 0x17, 0xDC, 0xAA, 0x9A, 0xA2, 0x16,  # 0x70
+    0x41, 0xD8, 0xA2, 0x06, 0xC6, 0x8B, 0xFC, 0x66,  # 0x78
+    0x34, 0x9F, 0xCF, 0x18, 0x23, 0xA0, 0x0A, 0x74,  # 0x80
+    0xE7, 0x2B, 0x27, 0x70, 0x92, 0xE9, 0xAF, 0x37,  # 0x88
+    0xE6, 0x8C, 0xA7, 0xBC, 0x62, 0x65, 0x9C, 0xC2,  # 0x90
+    0x08, 0xC9, 0x88, 0xB3, 0xF3, 0x43, 0xAC, 0x74,  # 0x98
+    0x2C, 0x0F, 0xD4, 0xAF, 0xA1, 0xC3, 0x01, 0x64,  # 0xA0
+    0x95, 0x4E, 0x48, 0x9F, 0xF4, 0x35, 0x78, 0x95,  # 0xA8
+    0x7A, 0x39, 0xD6, 0x6A, 0xA0, 0x6D, 0x40, 0xE8,  # 0xB0
+    0x4F, 0xA8, 0xEF, 0x11, 0x1D, 0xF3, 0x1B, 0x3F,  # 0xB8
+    0x3F, 0x07, 0xDD, 0x6F, 0x5B, 0x19, 0x30, 0x19,  # 0xC0
+    0xFB, 0xEF, 0x0E, 0x37, 0xF0, 0x0E, 0xCD, 0x16,  # 0xC8
+    0x49, 0xFE, 0x53, 0x47, 0x13, 0x1A, 0xBD, 0xA4,  # 0xD0
+    0xF1, 0x40, 0x19, 0x60, 0x0E, 0xED, 0x68, 0x09,  # 0xD8
+    0x06, 0x5F, 0x4D, 0xCF, 0x3D, 0x1A, 0xFE, 0x20,  # 0xE0
+    0x77, 0xE4, 0xD9, 0xDA, 0xF9, 0xA4, 0x2B, 0x76,  # 0xE8
+    0x1C, 0x71, 0xDB, 0x00, 0xBC, 0xFD, 0x0C, 0x6C,  # 0xF0
+    0xA5, 0x47, 0xF7, 0xF6, 0x00, 0x79, 0x4A, 0x11,  # 0xF8
+])
+KGM_HEADER = bytes([0x7C, 0xD5, 0x32, 0xEB, 0x86, 0x02, 0x7F, 0x4B, 0xA8, 0xAF, 0xA6, 0x8E, 0x0F, 0xFF, 0x99, 0x14])
+VPR_HEADER = bytes([0x05, 0x28, 0xBC, 0x96, 0xE9, 0xE4, 0x5A, 0x43, 0x91, 0xAA, 0xBD, 0xD0, 0x7A, 0xF5, 0x36, 0x31])
+KGM_V3_SLOT1_KEY = bytes([0x6C, 0x2C, 0x2F, 0x27])
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def write(root: str, name: str, data: bytes) -> str:
+    path = os.path.join(root, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def make_kwm(audio: bytes) -> bytes:
+    header = bytearray(0x400)
+    header[:0x10] = b"yeelion-kuwo-tme"
+    header[0x18:0x20] = struct.pack("<Q", 123456789)
+    header[0x30:0x38] = b"320flac\x00"
+    key_str = b"123456789" * 4
+    mask = bytes(a ^ b for a, b in zip(b"MoOtOiTvINGwd2E6n0E1i7L5t2IoOoNk", key_str[:32]))
+    return bytes(header) + bytes(b ^ mask[i & 0x1F] for i, b in enumerate(audio))
+
+
+def make_xm(audio: bytes) -> bytes:
+    header = b"ifmtFLAC\xfe\xfe\xfe\xfe" + bytes([2, 0, 0, 0x5A])
+    return header + bytes(b ^ 0x5A if i >= 2 else b for i, b in enumerate(audio))
+
+
+def make_qmc_static(audio: bytes) -> bytes:
+    encrypted = bytes(b ^ QMC_STATIC_BOX[((i % 0x7FFF if i > 0x7FFF else i) ** 2 + 27) & 0xFF]
+                      for i, b in enumerate(audio))
+    return encrypted + b"\xff\xff\xff\xff"
+
+
+def kugou_md5(data: bytes) -> bytes:
+    digest = hashlib.md5(data).digest()
+    return bytes(digest[14 - i + j] for i in range(0, 16, 2) for j in range(2))
+
+
+def make_kgm_v3(audio: bytes, magic: bytes = KGM_HEADER) -> bytes:
+    key = bytes(range(16))
+    slot_box = kugou_md5(KGM_V3_SLOT1_KEY)
+    file_box = kugou_md5(key) + b"\x6b"
+    header = magic + struct.pack("<III", 0x3C, 3, 1) + bytes(16) + key
+    encrypted = bytearray()
+    for i, b in enumerate(audio):
+        t = b ^ (i ^ i >> 8 ^ i >> 16 ^ i >> 24) & 0xFF ^ slot_box[i % 16]
+        t ^= (t << 4) & 0xFF
+        encrypted.append(t ^ file_box[i % 17])
+    return header + bytes(encrypted)
+
+
+def main():
+    ok = True
+
+    print("=== 文件头识别 ===")
+    ok &= check(sniff.audio_extension(FLAC) == ".flac", "FLAC")
+    ok &= check(sniff.audio_extension(OGG) == ".ogg", "OGG")
+    ok &= check(sniff.audio_extension(M4A) == ".m4a", "M4A")
+    ok &= check(sniff.audio_extension(b"ID3\x04" + bytes(12)) == ".mp3", "MP3（ID3v2）")
+    ok &= check(sniff.audio_extension(b"\x00\xff\xfb\x90\x00") == ".mp3", "MP3（帧同步）")
+    ok &= check(sniff.audio_extension(bytes(16)) is None, "无法识别")
+    ok &= check(sniff.audio_extension_with_smart_fallback(bytes(16), ".mflac0") == ".flac", "智能回退")
+
+    print("=== AES-128解密 ===")
+    plain = sniff.aes128_ecb_decrypt(bytes.fromhex("69c4e0d86a7b0430d8cdb78070b4c55a"), bytes(range(16)))
+    ok &= check(plain == bytes.fromhex("00112233445566778899aabbccddeeff"), "FIPS-197测试向量")
+
+    print("=== 加密文件头解密 ===")
+    with tempfile.TemporaryDirectory(prefix='um_sniff_') as root:
+        cases = [
+            ("song.kwm", ".kwm", make_kwm(FLAC), ".flac"),
+            ("song.xm", ".xm", make_xm(FLAC), ".flac"),
+            ("song.qmc0", ".qmc0", make_qmc_static(OGG), ".ogg"),
+            ("song.kgm", ".kgm", make_kgm_v3(FLAC), ".flac"),
+            ("song.vpr", ".vpr", make_kgm_v3(FLAC, VPR_HEADER), ".flac"),
+            ("song.tm2", ".tm2", b"QQMU" + M4A[4:], ".m4a"),
+            ("song.mflac", ".mflac", bytes(400) + struct.pack("<I", 16), ".flac"),
+            ("song.bkcwav", ".bkcwav", bytes(400) + struct.pack("<I", 16), ".wav"),
+        ]
+        for name, ext, data, expected in cases:
+            predicted = sniff.predict_output_extension(write(root, name, data), ext)
+            ok &= check(predicted == expected, f"{name} -> {predicted}")
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+处理速度模型和单文件超时测试（使用fake_um.py，不需要um.exe和真实加密文件）
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+# 添加项目路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(os.path.dirname(current_dir))
+sys.path.insert(0, os.path.join(project_root, 'music_unlock_gui'))
+
+from core.constants import BATCH_TIMEOUT_MAX_SECONDS, FILE_DEADLINE_MIN_SECONDS  # noqa: E402
+from core.processor import FileProcessor  # noqa: E402
+from core.service_supervisor import ServiceSupervisor  # noqa: E402
+from core.throughput import ThroughputModel  # noqa: E402
+
+FAKE_UM_PATH = os.path.join(current_dir, 'fake_um.py')
+MB = 1024 * 1024
+
+
+def check(condition: bool, message: str) -> bool:
+    print(f"{'✓' if condition else '✗'} {message}")
+    return condition
+
+
+def test_model(root: str) -> bool:
+    """测试EWMA统计、持久化和截止时间计算"""
+    print("=== 处理速度模型 ===")
+    ok = True
+    model_path = os.path.join(root, 'throughput.json')
+    model = ThroughputModel(model_path)
+    model.record('.flac', 100 * MB, 1.0)
+    model.record('.flac', 100 * MB, 2.0)
+    ok &= check(abs(model.rate('.flac') - 90 * MB) < 1, "移动平均按权重更新")
+    model.record('.ncm', 1024, 10.0)
+    ok &= check(model.rate('.ncm') == model.rate('*'), "小文件不参与统计，未知格式使用全部格式的平均值")
+
+    model.save()
+    reloaded = ThroughputModel(model_path)
+    ok &= check(reloaded.rate('.flac') == model.rate('.flac'), "保存后重新加载")
+
+    small = reloaded.file_deadline('.flac', MB)
+    large = reloaded.file_deadline('.flac', 2048 * MB)
+    ok &= check(small == FILE_DEADLINE_MIN_SECONDS and large > small, f"大文件截止时间更长 ({large:.0f}秒)")
+    ok &= check(reloaded.batch_deadline([('.flac', 10 * MB)] * 10000, 4) < BATCH_TIMEOUT_MAX_SECONDS,
+                "1万个文件的整批截止时间不再按文件数×300秒累加")
+    return ok
+
+
+def test_batch_watchdog(root: str) -> bool:
+    """卡住的文件被终止并报告为失败，其余文件换新进程继续处理"""
+    print("=== 批处理单文件超时 ===")
+    os.environ['FAKE_UM_HANG_MATCH'] = 'stuck'
+    os.environ['FAKE_UM_LATENCY_MS'] = '20'
+    try:
+        processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                                  throughput_path=os.path.join(root, 'batch.json'))
+        processor.throughput.file_deadline = lambda ext, size: 1.0
+        file_list = [f"/fake/album/{i}.ncm" for i in range(40)] + ["/fake/album/stuck.ncm"]
+        results = []
+        start = time.perf_counter()
+        response = processor.process_files_batch(file_list, result_callback=results.append)
+        elapsed = time.perf_counter() - start
+    finally:
+        del os.environ['FAKE_UM_HANG_MATCH']
+        del os.environ['FAKE_UM_LATENCY_MS']
+
+    ok = check(elapsed < 30, f"没有等待卡住的文件 ({elapsed:.1f}秒)")
+    ok &= check(response.get('success_count') == len(file_list) - 1, "其余文件全部成功")
+    failed = [result for result in results if not result.get('success')]
+    ok &= check(len(failed) == 1 and failed[0]['input_path'].endswith('stuck.ncm'), "卡住的文件报告为超时失败")
+    ok &= check(sorted(r['input_path'] for r in results) == sorted(file_list), "每个文件回调一次")
+
+    # 整批超时：每个文件都没有超过自己的截止时间，进程被结束后没有结果的文件报告为失败
+    os.environ['FAKE_UM_LATENCY_MS'] = '200'
+    os.environ['FAKE_UM_WORKERS'] = '2'
+    try:
+        processor._batch_timeout = lambda files, sizes: 1.0
+        file_list = [f"/fake/slow/{i}.ncm" for i in range(60)]
+        results = []
+        start = time.perf_counter()
+        response = processor.process_files_batch(file_list, result_callback=results.append)
+        elapsed = time.perf_counter() - start
+    finally:
+        del os.environ['FAKE_UM_LATENCY_MS']
+        del os.environ['FAKE_UM_WORKERS']
+
+    timed_out = [result for result in results if '批处理超时' in (result.get('error') or '')]
+    ok &= check(elapsed < 10, f"整批超时后没有等待剩余文件 ({elapsed:.1f}秒)")
+    ok &= check(bool(timed_out) and response.get('failed_count', 0) >= len(timed_out),
+                f"没有结果的文件报告为整批超时失败 ({len(timed_out)})")
+    ok &= check(sorted(r['input_path'] for r in results) == sorted(file_list)
+                and response.get('total_files') == len(file_list),
+                f"整批超时: 每个文件回调一次，统计包含全部文件 ({response.get('total_files')})")
+    return ok
+
+
+def service_pid(instance) -> int:
+    """服务实例的进程号"""
+    return instance.process.pid if instance.process is not None else (instance.info or {}).get('pid')
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.waitpid(pid, os.WNOHANG)
+    except ChildProcessError:
+        pass
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def wait_restarted(supervisor, old_pid: int, timeout: float = 20) -> bool:
+    """等待实例以新的进程重新可用"""
+    deadline = time.time() + timeout
+    instance = supervisor.instances[0]
+    while time.time() < deadline:
+        if instance.healthy and service_pid(instance) not in (None, old_pid):
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def start_hanging_service(processor, root: str, name: str):
+    """启动一个服务实例，路径包含stuck的文件在该服务进程中一直阻塞，之后回退的传统模式和重启的实例不阻塞"""
+    supervisor = ServiceSupervisor(FAKE_UM_PATH, instance_count=1, base_path=os.path.join(root, f'{name}.sock'))
+    processor.service_supervisor = supervisor
+    os.environ['FAKE_UM_HANG_MATCH'] = 'stuck'
+    try:
+        supervisor.start()
+        started = processor.wait_for_service(30)
+    finally:
+        del os.environ['FAKE_UM_HANG_MATCH']
+    return supervisor, service_pid(supervisor.instances[0]) if started else None
+
+
+def stop_service(supervisor):
+    supervisor.stop()
+    for instance in supervisor.instances:
+        if instance.process is not None:
+            instance.process.kill()
+            instance.process.wait()
+
+
+def test_service_watchdog(root: str) -> bool:
+    """服务模式下卡住的文件报告为失败，结束卡住的服务进程后剩余文件回退到传统模式"""
+    print("=== 服务模式单文件超时 ===")
+    processor = FileProcessor(FAKE_UM_PATH, use_service_mode=False, use_dedupe=False,
+                              throughput_path=os.path.join(root, 'service.json'))
+    # .mflac很快超时，.ncm的截止时间很长：超时时仍在处理的.ncm文件需要交给传统模式
+    processor.throughput.file_deadline = lambda ext, size: 1.0 if ext == '.mflac' else 600.0
+    file_list = [f"/fake/album/{i}.mflac" for i in range(100)] + ["/fake/album/stuck.mflac", "/fake/album/stuck.ncm"]
+
+    supervisor, old_pid = start_hanging_service(processor, root, 'straggler')
+    try:
+        ok = check(old_pid is not None, "服务实例启动")
+        results = []
+        response = processor.process_files_batch(file_list, result_callback=results.append)
+        ok &= check(response.get('success_count') == len(file_list) - 1, "其余文件（包括正在处理的文件）全部成功")
+        failed = [result for result in results if not result.get('success')]
+        ok &= check(len(failed) == 1 and failed[0]['input_path'].endswith('stuck.mflac'), "卡住的文件报告为超时失败")
+        ok &= check(sorted(r['input_path'] for r in results) == sorted(file_list), "每个文件回调一次")
+        ok &= check(not process_alive(old_pid), f"卡住的服务进程已结束 (pid {old_pid})")
+        ok &= check(wait_restarted(supervisor, old_pid),
+                    f"服务实例以新进程重启 (pid {old_pid} -> {service_pid(supervisor.instances[0])})")
+    finally:
+        stop_service(supervisor)
+
+    # 整批超时：同样结束服务进程，未完成的文件回退处理，统计包含全部文件
+    batch_timeout = processor._batch_timeout
+    processor._batch_timeout = lambda files, sizes: 2.0
+    supervisor, old_pid = start_hanging_service(processor, root, 'batch_timeout')
+    try:
+        # 只有截止时间很长的卡住文件，由整批超时结束
+        timeout_list = [path for path in file_list if not path.endswith('stuck.mflac')]
+        results = []
+        response = processor.process_files_batch(timeout_list, result_callback=results.append)
+        ok &= check(response.get('total_files') == response.get('success_count') == len(timeout_list)
+                    and sorted(r['input_path'] for r in results) == sorted(timeout_list),
+                    f"整批超时后未完成的文件回退处理，统计包含全部文件 ({response.get('total_files')})")
+        ok &= check(not process_alive(old_pid) and wait_restarted(supervisor, old_pid), "整批超时: 服务实例以新进程重启")
+    finally:
+        processor._batch_timeout = batch_timeout
+        stop_service(supervisor)
+
+    # 无法确认服务进程已结束时，正在处理的文件不交给传统模式重复处理
+    supervisor, old_pid = start_hanging_service(processor, root, 'unconfirmed')
+    supervisor._terminate = lambda instance: False
+    try:
+        results = []
+        response = processor.process_files_batch(file_list, result_callback=results.append)
+        in_flight = [r for r in results if r['input_path'].endswith('stuck.ncm')]
+        ok &= check(len(in_flight) == 1 and not in_flight[0].get('success') and '未重新处理' in in_flight[0]['error'],
+                    "无法确认结束时正在处理的文件报告为失败")
+        ok &= check(sorted(r['input_path'] for r in results) == sorted(file_list)
+                    and response.get('total_files') == len(file_list), "无法确认结束: 每个文件回调一次")
+        time.sleep(1.0)
+        ok &= check(not supervisor.instances[0].healthy and service_pid(supervisor.instances[0]) == old_pid,
+                    "无法确认结束的进程不会被健康检查重新复用")
+    finally:
+        stop_service(supervisor)
+    return ok
+
+
+def main():
+    with tempfile.TemporaryDirectory(prefix='um_throughput_') as root:
+        ok = test_model(root)
+        ok &= test_batch_watchdog(root)
+        if os.name != 'nt':
+            ok &= test_service_watchdog(root)
+
+    print("=== 全部通过 ===" if ok else "=== 存在失败 ===")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())